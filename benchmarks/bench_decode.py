@@ -0,0 +1,99 @@
+"""
+Compare the ways of decoding the Finnhub responses into models:
+
+- validate_model: `res.json()` then `Model.validate_model(**data)`, the path of the
+  api tests, which validates the payload and throws the model away.
+- model_validate: `res.json()` then `Model.model_validate(data)`.
+- validate_json: `TypeAdapter.validate_json(res.content)`, the path of
+  `request_model`, which validates the bytes without the intermediate dict.
+
+Usage:
+    python -m benchmarks.bench_decode --number 2000
+"""
+
+import argparse
+import json
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+from rich.console import Console
+from rich.table import Table
+
+from src.finnhub.synthetic_data import SyntheticData
+from src.utils.base_model import get_type_adapter
+from src.validate_models.get_company_news import CompanyNews, GetCompanyNewsResponse
+from src.validate_models.get_company_profile import GetCompanyProfileResponse
+from src.validate_models.get_quote import GetQuoteResponse
+from src.validate_models.get_symbol_lookup import GetSymbolLookupResponse
+
+PAYLOADS: dict[str, tuple[Any, Any]] = {
+    "quote": (GetQuoteResponse, SyntheticData.quote("AAPL")),
+    "profile": (GetCompanyProfileResponse, SyntheticData.company_profile("AAPL")),
+    "lookup": (GetSymbolLookupResponse, SyntheticData.symbol_lookup("apple")),
+    "news": (
+        list[CompanyNews],
+        SyntheticData.company_news("AAPL", "2025-04-01", "2025-04-30"),
+    ),
+}
+
+
+def get_decoders(model: Any, content: bytes) -> dict[str, Callable[[], Any]]:
+    if model == list[CompanyNews]:
+        # The api tests validate the news list by the root model
+        return {
+            "validate_model": lambda: GetCompanyNewsResponse(json.loads(content)),
+            "model_validate": lambda: (
+                GetCompanyNewsResponse.model_validate(json.loads(content)).root
+            ),
+            "validate_json": lambda: get_type_adapter(model).validate_json(content),
+        }
+    return {
+        "validate_model": lambda: model.validate_model(**json.loads(content)),
+        "model_validate": lambda: model.model_validate(json.loads(content)),
+        "validate_json": lambda: get_type_adapter(model).validate_json(content),
+    }
+
+
+def bench(number: int, repeat: int) -> list[dict[str, Any]]:
+    reports = []
+    for name, (model, payload) in PAYLOADS.items():
+        content = json.dumps(payload).encode()
+        for decoder_name, decode in get_decoders(model, content).items():
+            decode()
+            best = min(timeit.repeat(decode, number=number, repeat=repeat))
+            reports.append(
+                {
+                    "payload": name,
+                    "bytes": len(content),
+                    "decoder": decoder_name,
+                    "us_per_call": best / number * 1e6,
+                }
+            )
+    return reports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print JSON lines")
+    args = parser.parse_args()
+
+    reports = bench(args.number, args.repeat)
+    if args.json:
+        for report in reports:
+            print(json.dumps(report))
+        return
+    table = Table(title=f"Decode benchmark, best of {args.repeat}")
+    for column in reports[0]:
+        table.add_column(column)
+    for report in reports:
+        table.add_row(
+            *(f"{v:.1f}" if isinstance(v, float) else str(v) for v in report.values())
+        )
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    main()
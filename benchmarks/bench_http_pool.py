@@ -0,0 +1,134 @@
+"""
+Compare the connection pool settings of the Finnhub api clients against a local
+stand-in server, so the pool can be sized from data.
+
+Usage:
+    python -m benchmarks.bench_http_pool --requests 2000 --latency 0.01
+
+HTTP/2 is only negotiated over TLS, the local stand-in server is plain HTTP/1.1.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+from typing import Any
+
+from httpx import Limits
+from rich.console import Console
+from rich.table import Table
+
+from src.config import settings
+from src.finnhub.finnhub_api_client import AsyncFinnHubApiClient, FinnHubApiClient
+from src.finnhub.stand_in_server import StandInConfig, StandInServer
+
+POOL_CONFIGS = {
+    "no-keepalive-10": Limits(max_connections=10, max_keepalive_connections=0),
+    "pool-1": Limits(max_connections=1, max_keepalive_connections=1),
+    "pool-10": Limits(max_connections=10, max_keepalive_connections=10),
+    "pool-50": Limits(max_connections=50, max_keepalive_connections=20),
+    "pool-100": Limits(max_connections=100, max_keepalive_connections=100),
+}
+
+
+def summarize(name: str, latencies: list[float], elapsed: float) -> dict[str, Any]:
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "config": name,
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+    }
+
+
+def bench_sync(
+    name: str, limits: Limits, http2: bool, requests: int, concurrency: int
+) -> dict[str, Any]:
+    client = FinnHubApiClient(limits=limits, http2=http2)
+
+    def timed_quote(symbol: str) -> float:
+        start = time.perf_counter()
+        client.get_quote(symbol).raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = [
+        latency
+        for _, latency in client.imap_unordered(
+            timed_quote, (f"S{i}" for i in range(requests)), max_workers=concurrency
+        )
+        if isinstance(latency, float)
+    ]
+    elapsed = time.perf_counter() - start
+    client.close()
+    return summarize(f"sync/{name}", latencies, elapsed)
+
+
+async def bench_async(
+    name: str, limits: Limits, http2: bool, requests: int, concurrency: int
+) -> dict[str, Any]:
+    client = AsyncFinnHubApiClient(limits=limits, http2=http2)
+
+    async def timed_quote(symbol: str) -> float:
+        start = time.perf_counter()
+        (await client.get_quote(symbol)).raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = await client.gather(
+        (timed_quote(f"S{i}") for i in range(requests)),
+        max_concurrency=concurrency,
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - start
+    await client.aclose()
+    latencies = [result for result in results if isinstance(result, float)]
+    return summarize(f"async/{name}", latencies, elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--http2", action="store_true")
+    parser.add_argument("--json", action="store_true", help="Print JSON lines")
+    args = parser.parse_args()
+    # httpx logs every request in INFO level
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    reports = []
+    with StandInServer(StandInConfig(latency=args.latency)) as server:
+        settings.FINN_HUB_HOST = server.url
+        for name, limits in POOL_CONFIGS.items():
+            reports.append(
+                bench_sync(name, limits, args.http2, args.requests, args.concurrency)
+            )
+            reports.append(
+                asyncio.run(
+                    bench_async(
+                        name, limits, args.http2, args.requests, args.concurrency
+                    )
+                )
+            )
+
+    if args.json:
+        for report in reports:
+            print(json.dumps(report))
+        return
+    table = Table(title=f"Pool benchmark, concurrency={args.concurrency}")
+    for column in reports[0]:
+        table.add_column(column)
+    for report in reports:
+        table.add_row(
+            *(f"{v:.1f}" if isinstance(v, float) else str(v) for v in report.values())
+        )
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    main()
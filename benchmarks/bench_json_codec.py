@@ -0,0 +1,83 @@
+"""
+Report the decode and encode throughput of the JSON codecs on each Finnhub
+payload type. The orjson codec is skipped if orjson isn't installed.
+
+Usage:
+    python -m benchmarks.bench_json_codec --number 2000
+"""
+
+import argparse
+import json
+import timeit
+from functools import partial
+from typing import Any
+
+from rich.console import Console
+from rich.table import Table
+
+from benchmarks.bench_decode import PAYLOADS
+from src.constants import JsonCodecName
+from src.utils.json_codec import JsonCodec, get_json_codec
+
+
+def get_codecs() -> list[JsonCodec]:
+    codecs = [get_json_codec(JsonCodecName.STDLIB)]
+    # AUTO is orjson if it's installed
+    auto_codec = get_json_codec(JsonCodecName.AUTO)
+    if auto_codec.name == JsonCodecName.ORJSON:
+        codecs.append(auto_codec)
+    return codecs
+
+
+def bench(number: int, repeat: int) -> list[dict[str, Any]]:
+    reports = []
+    for name, (_, payload) in PAYLOADS.items():
+        content = json.dumps(payload).encode()
+        for codec in get_codecs():
+            decode = min(
+                timeit.repeat(
+                    partial(codec.loads, content), number=number, repeat=repeat
+                )
+            )
+            encode = min(
+                timeit.repeat(
+                    partial(codec.dumps, payload), number=number, repeat=repeat
+                )
+            )
+            reports.append(
+                {
+                    "payload": name,
+                    "bytes": len(content),
+                    "codec": str(codec.name),
+                    "decode_mb_per_s": len(content) * number / decode / 2**20,
+                    "decode_us_per_call": decode / number * 1e6,
+                    "encode_mb_per_s": len(content) * number / encode / 2**20,
+                }
+            )
+    return reports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print JSON lines")
+    args = parser.parse_args()
+
+    reports = bench(args.number, args.repeat)
+    if args.json:
+        for report in reports:
+            print(json.dumps(report))
+        return
+    table = Table(title=f"JSON codec benchmark, best of {args.repeat}")
+    for column in reports[0]:
+        table.add_column(column)
+    for report in reports:
+        table.add_row(
+            *(f"{v:.1f}" if isinstance(v, float) else str(v) for v in report.values())
+        )
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Measure the local symbol lookup of `SymbolIndex` over a synthetic universe, to
+compare with the round trip of the symbol lookup API.
+
+Usage:
+    python -m benchmarks.bench_symbol_index --symbols 20000 --number 2000
+"""
+
+import argparse
+import functools
+import itertools
+import json
+import string
+import time
+import timeit
+from typing import Any
+
+from rich.console import Console
+from rich.table import Table
+
+from src.finnhub.symbol_index import SymbolIndex
+from src.finnhub.synthetic_data import SyntheticData
+from src.validate_models.get_symbol_lookup import Description
+
+QUERIES = ["A", "AB", "ABC", "ABC.B1", "abc series 1", "zz"]
+
+
+def build_index(symbols: int) -> tuple[SymbolIndex, float]:
+    index = SymbolIndex()
+    prefixes = (
+        "".join(chars) for chars in itertools.product(string.ascii_uppercase, repeat=3)
+    )
+    started = time.perf_counter()
+    while len(index) < symbols:
+        payload = SyntheticData.symbol_lookup(next(prefixes), count=20)
+        index.update(Description.model_validate(item) for item in payload["result"])
+    # Build the sorted keys
+    index.lookup("A")
+    return index, time.perf_counter() - started
+
+
+def bench(symbols: int, number: int, repeat: int) -> list[dict[str, Any]]:
+    index, _ = build_index(symbols)
+    reports = []
+    for q in QUERIES:
+        for limit in (None, 10):
+            count = index.lookup(q, limit=limit).count
+            best = min(
+                timeit.repeat(
+                    functools.partial(index.lookup, q, limit=limit),
+                    number=number,
+                    repeat=repeat,
+                )
+            )
+            reports.append(
+                {
+                    "query": q,
+                    "limit": str(limit),
+                    "results": count,
+                    "us_per_lookup": best / number * 1e6,
+                }
+            )
+    return reports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=20000)
+    parser.add_argument("--number", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print JSON lines")
+    args = parser.parse_args()
+
+    reports = bench(args.symbols, args.number, args.repeat)
+    if args.json:
+        for report in reports:
+            print(json.dumps(report))
+        return
+    table = Table(
+        title=f"Symbol lookup of {args.symbols} symbols, best of {args.repeat}"
+    )
+    for column in reports[0]:
+        table.add_column(column)
+    for report in reports:
+        table.add_row(
+            *(f"{v:.1f}" if isinstance(v, float) else str(v) for v in report.values())
+        )
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    main()
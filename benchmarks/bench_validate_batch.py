@@ -0,0 +1,126 @@
+"""
+Compare the ways of validating a batch of payloads, e.g. the news items of a
+month or the results of the symbol lookups:
+
+- validate_model: `Model.validate_model(**payload)` for each payload, which
+  builds and throws away each model and formats a traceback for each error.
+- model_validate: `Model.model_validate(payload)` for each payload, catching the
+  `ValidationError`.
+- validate_many: `Model.validate_many(payloads)`, one call of the cached list
+  `TypeAdapter` which returns the models and the structured errors.
+
+Usage:
+    python -m benchmarks.bench_validate_batch --size 1000 --invalid 0.01
+"""
+
+import argparse
+import json
+import random
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+from pydantic import ValidationError
+from rich.console import Console
+from rich.table import Table
+
+from src.finnhub.synthetic_data import SyntheticData
+from src.utils.base_model import BaseModel
+from src.validate_models.get_company_news import CompanyNews
+from src.validate_models.get_symbol_lookup import Description
+
+
+def get_payloads(size: int, invalid: float, seed: int = 0) -> dict[str, Any]:
+    rnd = random.Random(seed)
+    news: list[dict[str, Any]] = []
+    while len(news) < size:
+        news.extend(SyntheticData.company_news("AAPL", "2025-01-01", "2025-12-31"))
+    descriptions: list[dict[str, Any]] = []
+    i = 0
+    while len(descriptions) < size:
+        descriptions.extend(SyntheticData.symbol_lookup(f"q{i}")["result"])
+        i += 1
+    payloads = {
+        "news": (CompanyNews, news[:size]),
+        "lookup": (Description, descriptions[:size]),
+    }
+    for _, items in payloads.values():
+        for j in rnd.sample(range(size), int(size * invalid)):
+            # A missing field, the most common error of the api responses
+            items[j] = {k: v for k, v in items[j].items() if k != "symbol"} | {
+                "headline": None
+            }
+    return payloads
+
+
+def get_validators(
+    model: type[BaseModel], payloads: list[dict[str, Any]]
+) -> dict[str, Callable[[], Any]]:
+    def validate_model() -> int:
+        return sum(model.validate_model(**payload)[0] for payload in payloads)
+
+    def model_validate() -> int:
+        errors = 0
+        for payload in payloads:
+            try:
+                model.model_validate(payload)
+            except ValidationError:
+                errors += 1
+        return errors
+
+    def validate_many() -> int:
+        return len(model.validate_many(payloads).invalid_indexes)
+
+    return {
+        "validate_model": validate_model,
+        "model_validate": model_validate,
+        "validate_many": validate_many,
+    }
+
+
+def bench(size: int, invalid: float, number: int, repeat: int) -> list[dict[str, Any]]:
+    reports = []
+    for name, (model, payloads) in get_payloads(size, invalid).items():
+        for validator_name, validate in get_validators(model, payloads).items():
+            errors = validate()
+            best = min(timeit.repeat(validate, number=number, repeat=repeat))
+            reports.append(
+                {
+                    "payload": name,
+                    "size": size,
+                    "errors": errors,
+                    "validator": validator_name,
+                    "us_per_item": best / number / size * 1e6,
+                }
+            )
+    return reports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument(
+        "--invalid", type=float, default=0.01, help="The ratio of invalid payloads"
+    )
+    parser.add_argument("--number", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print JSON lines")
+    args = parser.parse_args()
+
+    reports = bench(args.size, args.invalid, args.number, args.repeat)
+    if args.json:
+        for report in reports:
+            print(json.dumps(report))
+        return
+    table = Table(title=f"Batch validation benchmark, best of {args.repeat}")
+    for column in reports[0]:
+        table.add_column(column)
+    for report in reports:
+        table.add_row(
+            *(f"{v:.2f}" if isinstance(v, float) else str(v) for v in report.values())
+        )
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""
+Drive the Finnhub api clients at target request rates or concurrency, and report
+the per-route latency percentiles, error rates, CPU and memory of the process.
+
+Without `--host`, it starts the local stand-in server. The rates of `--rps` are
+run one after another, so the stage where the achieved RPS falls behind the
+target is where the process saturates. Without `--rps`, `--concurrency` workers
+send requests back to back.
+
+The latency of the open-loop stages is measured from the scheduled send time,
+so the time spent queuing in a saturated client is counted as well. The built-in
+stand-in shares the process and its GIL, for the ceiling of the client alone run
+`python -m src.finnhub.stand_in_server` in another process and pass `--host`.
+
+Usage:
+    python -m benchmarks.load_test --mode async --rps 100,200,400 --duration 10 \
+        --mix quote=8,company_profile=1,symbol_lookup=1 --output report.json
+    python -m benchmarks.load_test --baseline report.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from itertools import count
+from pathlib import Path
+from typing import Any
+
+from httpx import HTTPStatusError
+from rich.console import Console
+from rich.table import Table
+
+from src.config import settings
+from src.constants import ROOT_DIR
+from src.finnhub.finnhub_api_client import AsyncFinnHubApiClient, FinnHubApiClient
+from src.finnhub.stand_in_server import StandInConfig, StandInServer
+from src.utils.utils import HelperFuncs
+
+SYMBOLS = ["AAPL", "MSFT", "NVDA", "TSM", "GOOG", "META", "AMZN", "TSLA"]
+NEWS_WINDOW = ("2025-04-01", "2025-04-07")
+
+type Call = Callable[[FinnHubApiClient, str], Any]
+type AsyncCall = Callable[[AsyncFinnHubApiClient, str], Awaitable[Any]]
+
+CALLS: dict[str, Call] = {
+    "quote": lambda client, symbol: client.get_quote_model(symbol),
+    "company_profile": lambda client, symbol: client.get_company_profile_model(symbol),
+    "symbol_lookup": lambda client, symbol: client.get_symbol_lookup_model(symbol),
+    "company_news": lambda client, symbol: client.get_company_news_models(
+        symbol, *NEWS_WINDOW
+    ),
+}
+ASYNC_CALLS: dict[str, AsyncCall] = {
+    "quote": lambda client, symbol: client.get_quote_model(symbol),
+    "company_profile": lambda client, symbol: client.get_company_profile_model(symbol),
+    "symbol_lookup": lambda client, symbol: client.get_symbol_lookup_model(symbol),
+    "company_news": lambda client, symbol: client.get_company_news_models(
+        symbol, *NEWS_WINDOW
+    ),
+}
+
+
+class Recorder:
+    """
+    Collect the latency and the outcome of each request, thread-safe.
+    """
+
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = {}
+        self.outcomes: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, latency: float, outcome: str) -> None:
+        with self._lock:
+            self.latencies.setdefault(route, []).append(latency)
+            outcomes = self.outcomes.setdefault(route, {})
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    def summarize(self) -> dict[str, Any]:
+        routes = {}
+        for route, latencies in sorted(self.latencies.items()):
+            outcomes = self.outcomes[route]
+            errors = sum(n for outcome, n in outcomes.items() if outcome != "ok")
+            latencies = sorted(latencies)
+            quantiles = (
+                statistics.quantiles(latencies, n=100, method="inclusive")
+                if len(latencies) > 1
+                else latencies * 99
+            )
+            routes[route] = {
+                "requests": len(latencies),
+                "errors": errors,
+                "error_rate": errors / len(latencies),
+                "outcomes": dict(sorted(outcomes.items())),
+                "p50_ms": quantiles[49] * 1000,
+                "p95_ms": quantiles[94] * 1000,
+                "p99_ms": quantiles[98] * 1000,
+                "max_ms": latencies[-1] * 1000,
+            }
+        return routes
+
+
+def get_outcome(error: Exception | None) -> str:
+    if error is None:
+        return "ok"
+    if isinstance(error, HTTPStatusError):
+        return str(error.response.status_code)
+    return error.__class__.__name__
+
+
+def iter_routes(mix: dict[str, float]) -> Iterator[tuple[str, str]]:
+    """
+    Yield `(route, symbol)` round-robin by the weights of the mix, so the runs are
+    deterministic.
+    """
+    total = sum(mix.values())
+    credits = dict.fromkeys(mix, 0.0)
+    for i in count():
+        for route, weight in mix.items():
+            credits[route] += weight / total
+        route = max(credits, key=lambda name: credits[name])
+        credits[route] -= 1
+        yield route, SYMBOLS[i % len(SYMBOLS)]
+
+
+@contextmanager
+def measure_process() -> Iterator[dict[str, float]]:
+    """
+    Measure the CPU time of the process in the block, and the peak RSS of the
+    process so far. The peak RSS is the lifetime high-water mark of
+    `ru_maxrss`, so a stage only raises it above the earlier stages when it
+    uses more memory than all of them.
+    """
+    usage: dict[str, float] = {}
+    start = time.perf_counter()
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    yield usage
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    elapsed = time.perf_counter() - start
+    cpu_seconds = (after.ru_utime - before.ru_utime) + (
+        after.ru_stime - before.ru_stime
+    )
+    # ru_maxrss is KB on Linux, but bytes on macOS
+    peak_rss = after.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    usage.update(
+        elapsed_seconds=elapsed,
+        cpu_seconds=cpu_seconds,
+        cpu_percent=cpu_seconds / elapsed * 100,
+        process_peak_rss_mb=peak_rss / 2**20,
+    )
+
+
+def run_sync(
+    mix: dict[str, float], rps: float | None, duration: float, concurrency: int
+) -> Recorder:
+    client = FinnHubApiClient()
+    recorder = Recorder()
+    routes = iter_routes(mix)
+    routes_lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def send(route: str, symbol: str, scheduled_at: float) -> None:
+        error = None
+        try:
+            CALLS[route](client, symbol)
+        except Exception as e:
+            error = e
+        recorder.record(route, time.perf_counter() - scheduled_at, get_outcome(error))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        if rps is None:
+
+            def worker() -> None:
+                while time.perf_counter() < deadline:
+                    with routes_lock:
+                        route, symbol = next(routes)
+                    send(route, symbol, time.perf_counter())
+
+            for _ in range(concurrency):
+                executor.submit(worker)
+        else:
+            start = time.perf_counter()
+            for i in count():
+                scheduled_at = start + i / rps
+                if scheduled_at >= deadline:
+                    break
+                time.sleep(max(scheduled_at - time.perf_counter(), 0))
+                executor.submit(send, *next(routes), scheduled_at)
+    client.close()
+    return recorder
+
+
+async def run_async(
+    mix: dict[str, float], rps: float | None, duration: float, concurrency: int
+) -> Recorder:
+    client = AsyncFinnHubApiClient(max_concurrency=concurrency)
+    recorder = Recorder()
+    routes = iter_routes(mix)
+    semaphore = asyncio.Semaphore(concurrency)
+    deadline = time.perf_counter() + duration
+
+    async def send(route: str, symbol: str, scheduled_at: float) -> None:
+        error = None
+        try:
+            async with semaphore:
+                await ASYNC_CALLS[route](client, symbol)
+        except Exception as e:
+            error = e
+        recorder.record(route, time.perf_counter() - scheduled_at, get_outcome(error))
+
+    if rps is None:
+
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                await send(*next(routes), time.perf_counter())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    else:
+        tasks = []
+        start = time.perf_counter()
+        for i in count():
+            scheduled_at = start + i / rps
+            if scheduled_at >= deadline:
+                break
+            await asyncio.sleep(max(scheduled_at - time.perf_counter(), 0))
+            tasks.append(asyncio.create_task(send(*next(routes), scheduled_at)))
+        await asyncio.gather(*tasks)
+    await client.aclose()
+    return recorder
+
+
+def run_stage(
+    mode: str,
+    mix: dict[str, float],
+    rps: float | None,
+    duration: float,
+    concurrency: int,
+) -> dict[str, Any]:
+    with measure_process() as usage:
+        if mode == "sync":
+            recorder = run_sync(mix, rps, duration, concurrency)
+        else:
+            recorder = asyncio.run(run_async(mix, rps, duration, concurrency))
+    routes = recorder.summarize()
+    requests = sum(route["requests"] for route in routes.values())
+    errors = sum(route["errors"] for route in routes.values())
+    return {
+        "mode": mode,
+        "target_rps": rps,
+        "concurrency": concurrency,
+        "achieved_rps": requests / usage["elapsed_seconds"],
+        "requests": requests,
+        "error_rate": errors / requests if requests else 0,
+        "routes": routes,
+        **usage,
+    }
+
+
+def get_git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    mix = {}
+    for item in text.split(","):
+        route, _, weight = item.partition("=")
+        if route not in CALLS:
+            raise argparse.ArgumentTypeError(
+                f"Unknown route {route}, expect one of {list(CALLS)}"
+            )
+        mix[route] = float(weight or 1)
+    return mix
+
+
+def print_report(report: dict[str, Any], baseline: dict[str, Any] | None) -> None:
+    def get_key(stage: dict[str, Any]) -> tuple[Any, ...]:
+        return stage["mode"], stage["target_rps"], stage["concurrency"]
+
+    baseline_stages = {
+        get_key(stage): stage for stage in (baseline or {}).get("stages", [])
+    }
+    table = Table(title=f"Load test of {report['meta']['host']}")
+    for column in [
+        "mode",
+        "target_rps",
+        "achieved_rps",
+        "route",
+        "requests",
+        "error_rate",
+        "p50_ms",
+        "p95_ms",
+        "p99_ms",
+        "cpu_percent",
+        "process_peak_rss_mb",
+    ]:
+        table.add_column(column)
+    for stage in report["stages"]:
+        base = baseline_stages.get(get_key(stage), {})
+
+        def cell(value: float, base_value: float | None, digits: int = 1) -> str:
+            text = f"{value:.{digits}f}"
+            if base_value:
+                text += f" ({(value - base_value) / base_value:+.0%})"
+            return text
+
+        for route, result in stage["routes"].items():
+            base_route = base.get("routes", {}).get(route, {})
+            table.add_row(
+                stage["mode"],
+                f"{stage['target_rps']:g}" if stage["target_rps"] else "-",
+                cell(stage["achieved_rps"], base.get("achieved_rps")),
+                route,
+                str(result["requests"]),
+                f"{result['error_rate']:.2%}",
+                *(
+                    cell(result[key], base_route.get(key))
+                    for key in ("p50_ms", "p95_ms", "p99_ms")
+                ),
+                cell(stage["cpu_percent"], base.get("cpu_percent")),
+                cell(stage["process_peak_rss_mb"], base.get("process_peak_rss_mb")),
+            )
+    Console().print(table)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", help="Finnhub host, start the stand-in if unset")
+    parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+    parser.add_argument(
+        "--rps", help="Comma-separated target RPS of each stage, e.g. 50,100,200"
+    )
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds a stage")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("quote"))
+    parser.add_argument("--latency", type=float, default=0.02, help="Of the stand-in")
+    parser.add_argument("--error-rate", type=float, default=0, help="Of the stand-in")
+    parser.add_argument("--output", type=Path, help="Write the JSON report to it")
+    parser.add_argument("--baseline", type=Path, help="Compare with a JSON report")
+    args = parser.parse_args()
+    # httpx logs every request in INFO level
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    modes = ["sync", "async"] if args.mode == "both" else [args.mode]
+    rates = [float(rate) for rate in args.rps.split(",")] if args.rps else [None]
+    server = (
+        nullcontext()
+        if args.host
+        else StandInServer(
+            StandInConfig(latency=args.latency, error_rate=args.error_rate)
+        )
+    )
+    with server as stand_in:
+        settings.FINN_HUB_HOST = stand_in.url if stand_in else args.host
+        stages = [
+            run_stage(mode, args.mix, rps, args.duration, args.concurrency)
+            for mode in modes
+            for rps in rates
+        ]
+    report = {
+        "meta": {
+            "commit": get_git_commit(),
+            "started_at": HelperFuncs.get_current_utc_with_format(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "host": settings.FINN_HUB_HOST if args.host else "stand-in",
+            "mix": args.mix,
+            "duration": args.duration,
+        },
+        "stages": stages,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    print_report(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,16 +4,36 @@ from logging.config import dictConfig
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-from src.constants import ENV_DIR, ERR_LOGS_DIR, Envs, LogLevel
+from src.constants import ENV_DIR, ERR_LOGS_DIR, Envs, JsonCodecName, LogLevel
 
 
 class Settings(BaseSettings):
     ENV: Envs = Field(default=Envs.TEST)
     LOG_LEVEL: LogLevel = Field(default=LogLevel.INFO)
     FINN_HUB_API_KEY: str
+    # More keys to spread the requests over, a JSON list, e.g. ["key-1","key-2"]
+    FINN_HUB_API_KEYS: list[str] = Field(default_factory=list)
 
     TWITCH_HOST: str = Field(default="http://localhost")
     FINN_HUB_HOST: str
+    # The trades WebSocket feed, it needs the `websockets` package
+    FINN_HUB_WS_HOST: str = Field(default="wss://ws.finnhub.io")
+    # Client-side rate limits of each Finnhub API key, None means no limit
+    FINN_HUB_CALLS_PER_SECOND: float | None = Field(default=None)
+    FINN_HUB_CALLS_PER_MINUTE: float | None = Field(default=None)
+    # Validate this ratio of the responses of each route after the first
+    # `FINN_HUB_VALIDATION_WARMUP` ones and alert on the schema drift, None is off
+    FINN_HUB_VALIDATION_SAMPLE_RATE: float | None = Field(default=None)
+    FINN_HUB_VALIDATION_WARMUP: int = Field(default=100)
+
+    # Connection pool of the api clients, HTTP2 needs the `h2` package
+    HTTP_MAX_CONNECTIONS: int | None = Field(default=100)
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int | None = Field(default=20)
+    HTTP_KEEPALIVE_EXPIRY: float | None = Field(default=5)
+    HTTP2: bool = Field(default=False)
+
+    # The JSON codec of the api clients and config files, orjson is optional
+    JSON_CODEC: JsonCodecName = Field(default=JsonCodecName.STDLIB)
 
     model_config = SettingsConfigDict(
         env_file=ENV_DIR / ".env",
@@ -14,6 +14,11 @@ ERR_LOGS_DIR.mkdir(exist_ok=True)
 HTML_REPORTS_DIR = ROOT_DIR / "html_reports"
 HTML_REPORTS_DIR.mkdir(exist_ok=True)
 
+# It's created when the persistent cache is used
+CACHE_DIR = ROOT_DIR / "cache"
+
+CASSETTE_DIR = ROOT_DIR / "tests" / "cassettes"
+
 
 class Envs(StrEnum):
     DEV = "dev"
@@ -40,3 +45,70 @@ class DocumentReadyState(StrEnum):
     LOADING = "loading"
     INTERATIVE = "interative"
     COMPLETE = "complete"
+
+
+class CacheStatus(StrEnum):
+    FRESH = "fresh"
+    STALE = "stale"
+    EXPIRED = "expired"
+    MISS = "miss"
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class JsonCodecName(StrEnum):
+    STDLIB = "stdlib"
+    ORJSON = "orjson"
+    # orjson if it's installed, otherwise stdlib
+    AUTO = "auto"
+
+
+class MetricPhase(StrEnum):
+    # Open a new connection, including TLS handshake
+    CONNECT = "connect"
+    # From sending the request to receiving the response headers
+    TTFB = "ttfb"
+    # Read the response body
+    DOWNLOAD = "download"
+    # Parse the JSON body into Python objects
+    DECODE = "decode"
+    # Validate the body into models
+    VALIDATE = "validate"
+
+
+class LatencyDistribution(StrEnum):
+    CONSTANT = "constant"
+    UNIFORM = "uniform"
+    EXPONENTIAL = "exponential"
+    LOGNORMAL = "lognormal"
+
+
+class CassetteMode(StrEnum):
+    # Send the requests to the API without cassettes
+    LIVE = "live"
+    # Send the requests to the API and save them to the cassettes
+    RECORD = "record"
+    # Serve the requests from the cassettes without network
+    REPLAY = "replay"
+
+
+class CrawlFormat(StrEnum):
+    # A gzipped JSON line of each record
+    NDJSON = "ndjson"
+    # A gzipped JSON line of each batch, which holds a list of each field
+    COLUMNAR = "columnar"
+
+
+class DriftKind(StrEnum):
+    # A field which isn't in the responses of the warmup
+    NEW_FIELD = "new_field"
+    # A field of all responses of the warmup is missing
+    MISSING_FIELD = "missing_field"
+    # A field has a JSON type which isn't seen in the warmup
+    NEW_TYPE = "new_type"
+    # The response doesn't match the validation model
+    INVALID = "invalid"
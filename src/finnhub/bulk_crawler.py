@@ -0,0 +1,343 @@
+"""
+Crawl the quotes and company profiles of many symbols by a pool of worker
+processes, so the JSON decoding and the validation use all cores.
+
+The symbols are sharded over the workers, and each worker runs its own
+`FinnHubApiClient` (with the API key pool of the settings) under a rate budget
+shared by all workers. Each worker writes `<route>-part-<worker>` files of gzipped
+NDJSON records or columnar batches, and checkpoints them after every batch, so a
+crawl interrupted at any point resumes from the symbols which aren't written yet.
+
+Usage:
+    python -m src.finnhub.bulk_crawler symbols.txt --output-dir crawl \
+        --routes quote company_profile --workers 8 --calls-per-minute 300
+"""
+
+import argparse
+import gzip
+import logging
+import os
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any
+
+from pydantic import Field
+
+from src.config import settings
+from src.constants import CrawlFormat
+from src.finnhub.finnhub_api_client import FinnHubApiClient
+from src.utils.base_model import BaseModel
+from src.utils.json_codec import get_json_codec
+from src.utils.rate_limiter import RateLimiter, SharedRateBudget, SharedRateLimiter
+
+log = logging.getLogger(__name__)
+
+# The routes which can be crawled, and the client method of each one
+ROUTES: dict[str, Callable[[FinnHubApiClient, str], BaseModel]] = {
+    "quote": FinnHubApiClient.get_quote_model,
+    "company_profile": FinnHubApiClient.get_company_profile_model,
+}
+
+# The shared budget of the worker process, set by `_init_worker`
+_budget: SharedRateBudget | None = None
+
+
+class Checkpoint(BaseModel):
+    # The bytes of the complete batches in the part file
+    offset: int = 0
+    done: set[str] = Field(default_factory=set)
+
+
+class ShardTask(BaseModel):
+    worker: int
+    route: str
+    symbols: list[str]
+    output_dir: Path
+    format: CrawlFormat
+    host: str
+    batch_size: int
+    threads: int
+
+
+class ShardResult(BaseModel):
+    worker: int
+    route: str
+    written: int = 0
+    errors: int = 0
+    seconds: float = 0
+
+
+class CrawlReport(BaseModel):
+    symbols: int
+    # The symbols of each route done by the previous runs
+    resumed: dict[str, int] = Field(default_factory=dict)
+    written: dict[str, int] = Field(default_factory=dict)
+    errors: dict[str, int] = Field(default_factory=dict)
+    seconds: float = 0
+
+
+class PartWriter:
+    """
+    Append the batches to a part file as separate gzip members, and save the
+    checkpoint after each batch is synced. The bytes after the checkpoint offset,
+    e.g. a batch torn by a crash, are truncated when it's opened again.
+    """
+
+    def __init__(self, path: Path, format: CrawlFormat) -> None:
+        self.path = path
+        self.format = format
+        self.checkpoint_path = path.with_name(f"{path.name}.checkpoint.json")
+        self.checkpoint = Checkpoint()
+        if self.checkpoint_path.exists():
+            self.checkpoint = Checkpoint.model_validate_json(
+                self.checkpoint_path.read_bytes()
+            )
+        self._file = open(path, "ab")
+        self._file.truncate(self.checkpoint.offset)
+        self._codec = get_json_codec()
+
+    def encode(self, records: list[dict[str, Any]]) -> bytes:
+        dumps = self._codec.dumps
+        if self.format == CrawlFormat.COLUMNAR:
+            fields = list(dict.fromkeys(key for record in records for key in record))
+            batch = {
+                field: [record.get(field) for record in records] for field in fields
+            }
+            return dumps(batch) + b"\n"
+        return b"".join(dumps(record) + b"\n" for record in records)
+
+    def write_batch(
+        self, records: list[dict[str, Any]], symbols: Iterable[str]
+    ) -> None:
+        if records:
+            # mtime=0 keeps the output the same for the same records
+            self._file.write(gzip.compress(self.encode(records), mtime=0))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self.checkpoint.offset = self._file.tell()
+        self.checkpoint.done.update(symbols)
+        tmp_path = self.checkpoint_path.with_name(f".{self.checkpoint_path.name}.tmp")
+        tmp_path.write_text(self.checkpoint.model_dump_json())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def get_part_path(
+    output_dir: Path, route: str, worker: int, format: CrawlFormat
+) -> Path:
+    return output_dir / f"{route}-part-{worker:03d}.{format}.gz"
+
+
+def iter_records(path: Path) -> Iterator[dict[str, Any]]:
+    """
+    Read the records of a part file of any format.
+    """
+    codec = get_json_codec()
+    with gzip.open(path, "rb") as rf:
+        for line in rf:
+            item = codec.loads(line)
+            if path.name.endswith(f".{CrawlFormat.COLUMNAR}.gz"):
+                fields = list(item)
+                for values in zip(*item.values(), strict=True):
+                    yield dict(zip(fields, values, strict=True))
+            else:
+                yield item
+
+
+def load_done(output_dir: Path, route: str) -> set[str]:
+    """
+    The symbols of the route written by all previous workers.
+    """
+    done: set[str] = set()
+    for path in output_dir.glob(f"{route}-part-*.checkpoint.json"):
+        done |= Checkpoint.model_validate_json(path.read_bytes()).done
+    return done
+
+
+def _init_worker(budget: SharedRateBudget | None) -> None:
+    global _budget
+    _budget = budget
+
+
+def crawl_shard(task: ShardTask) -> ShardResult:
+    """
+    Crawl a shard in a worker process, the failed symbols aren't checkpointed so
+    they're retried by the next run.
+    """
+    started = time.perf_counter()
+    # The workers are spawned, so pass the host of the parent
+    settings.FINN_HUB_HOST = task.host
+    rate_limiter = SharedRateLimiter(_budget) if _budget else None
+    client = FinnHubApiClient(rate_limiter=rate_limiter)
+    fetch = ROUTES[task.route]
+    path = get_part_path(task.output_dir, task.route, task.worker, task.format)
+    writer = PartWriter(path, task.format)
+    result = ShardResult(worker=task.worker, route=task.route)
+    records: list[dict[str, Any]] = []
+    symbols: list[str] = []
+    try:
+        for symbol, model in client.imap_unordered(
+            lambda symbol: fetch(client, symbol), task.symbols, task.threads
+        ):
+            if isinstance(model, Exception):
+                result.errors += 1
+                log.warning(f"Failed to crawl {task.route} of {symbol}: {model!r}")
+                continue
+            records.append({"symbol": symbol, **model.model_dump(by_alias=True)})
+            symbols.append(symbol)
+            if len(records) >= task.batch_size:
+                writer.write_batch(records, symbols)
+                result.written += len(records)
+                records, symbols = [], []
+        writer.write_batch(records, symbols)
+        result.written += len(records)
+    finally:
+        writer.close()
+        client.close()
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+class BulkCrawler:
+    """
+    Crawl the routes of many symbols by a pool of worker processes.
+
+        crawler = BulkCrawler(Path("crawl"), workers=8, calls_per_minute=300)
+        report = crawler.run(symbols)
+        records = list(iter_records(Path("crawl/quote-part-000.ndjson.gz")))
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        routes: Iterable[str] = ("quote", "company_profile"),
+        format: CrawlFormat = CrawlFormat.NDJSON,
+        workers: int | None = None,
+        threads: int = 8,
+        batch_size: int = 500,
+        calls_per_second: float | None = None,
+        calls_per_minute: float | None = None,
+    ) -> None:
+        """
+        Args:
+            output_dir (Path): The directory of the part files and checkpoints.
+            routes (Iterable[str]): The routes of `ROUTES` to crawl.
+            format (CrawlFormat): NDJSON records or columnar batches.
+            workers (int | None): The worker processes, the number of CPUs by
+                default.
+            threads (int): The concurrent requests of each worker.
+            batch_size (int): The records of each batch and checkpoint.
+            calls_per_second (float | None): The budget shared by all workers.
+            calls_per_minute (float | None): The budget shared by all workers. If
+                neither of them is given, the `FINN_HUB_CALLS_PER_*` settings are
+                shared instead of being the budget of each worker.
+        """
+        self.routes = list(routes)
+        unknown = set(self.routes) - ROUTES.keys()
+        if unknown:
+            raise ValueError(f"Unknown routes {unknown}, choose from {list(ROUTES)}")
+        self.output_dir = output_dir
+        self.format = format
+        self.workers = workers or os.cpu_count() or 1
+        self.threads = threads
+        self.batch_size = batch_size
+        if calls_per_second is None and calls_per_minute is None:
+            calls_per_second = settings.FINN_HUB_CALLS_PER_SECOND
+            calls_per_minute = settings.FINN_HUB_CALLS_PER_MINUTE
+        self.rate_limits = RateLimiter.get_rate_limits(
+            calls_per_second, calls_per_minute
+        )
+
+    def get_shards(self, symbols: list[str]) -> list[list[str]]:
+        shards: list[list[str]] = [[] for _ in range(self.workers)]
+        for i, symbol in enumerate(symbols):
+            shards[i % self.workers].append(symbol)
+        return shards
+
+    def run(self, symbols: Iterable[str]) -> CrawlReport:
+        started = time.perf_counter()
+        symbols = list(dict.fromkeys(symbols))
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        report = CrawlReport(symbols=len(symbols))
+        tasks = []
+        for route in self.routes:
+            done = load_done(self.output_dir, route)
+            report.resumed[route] = len(done.intersection(symbols))
+            report.written[route] = report.errors[route] = 0
+            remaining = [symbol for symbol in symbols if symbol not in done]
+            for worker, shard in enumerate(self.get_shards(remaining)):
+                if not shard:
+                    continue
+                tasks.append(
+                    ShardTask(
+                        worker=worker,
+                        route=route,
+                        symbols=shard,
+                        output_dir=self.output_dir,
+                        format=self.format,
+                        host=settings.FINN_HUB_HOST,
+                        batch_size=self.batch_size,
+                        threads=self.threads,
+                    )
+                )
+        if tasks:
+            # Spawn the workers, forking a process with threads isn't safe
+            context = get_context("spawn")
+            budget = None
+            if self.rate_limits:
+                budget = SharedRateBudget(self.rate_limits, context)
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(tasks)),
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(budget,),
+            ) as executor:
+                for result in executor.map(crawl_shard, tasks):
+                    report.written[result.route] += result.written
+                    report.errors[result.route] += result.errors
+                    log.info(
+                        f"Worker {result.worker} wrote {result.written} "
+                        f"{result.route} in {result.seconds:.1f}s"
+                    )
+        report.seconds = time.perf_counter() - started
+        return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("symbols", type=Path, help="A file of a symbol per line")
+    parser.add_argument("--output-dir", type=Path, required=True)
+    parser.add_argument("--routes", nargs="+", default=list(ROUTES), choices=ROUTES)
+    parser.add_argument("--format", type=CrawlFormat, default=CrawlFormat.NDJSON)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--calls-per-second", type=float)
+    parser.add_argument("--calls-per-minute", type=float)
+    args = parser.parse_args()
+
+    symbols = [
+        line.strip() for line in args.symbols.read_text().splitlines() if line.strip()
+    ]
+    crawler = BulkCrawler(
+        args.output_dir,
+        routes=args.routes,
+        format=args.format,
+        workers=args.workers,
+        threads=args.threads,
+        batch_size=args.batch_size,
+        calls_per_second=args.calls_per_second,
+        calls_per_minute=args.calls_per_minute,
+    )
+    print(crawler.run(symbols).model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
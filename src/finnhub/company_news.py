@@ -0,0 +1,49 @@
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Iterator
+from operator import attrgetter
+
+from src.validate_models.get_company_news import CompanyNews
+
+get_datetime = attrgetter("datetime")
+
+
+class NewsDeduplicator:
+    """
+    Remember the seen news, a news is a duplicate if its id or url is seen.
+    """
+
+    def __init__(self) -> None:
+        self._ids: set[int] = set()
+        self._urls: set[str] = set()
+
+    def is_new(self, news: CompanyNews) -> bool:
+        if news.url in self._urls or (news.id is not None and news.id in self._ids):
+            return False
+        self._urls.add(news.url)
+        if news.id is not None:
+            self._ids.add(news.id)
+        return True
+
+
+def merge_news_windows(windows: Iterable[list[CompanyNews]]) -> Iterator[CompanyNews]:
+    """
+    Merge the news of the consecutive date windows in datetime order, and drop
+    the duplicates in the same pass. The windows have to be in date order.
+    """
+    deduplicator = NewsDeduplicator()
+    for window in windows:
+        for news in sorted(window, key=get_datetime):
+            if deduplicator.is_new(news):
+                yield news
+
+
+async def amerge_news_windows(
+    windows: AsyncIterable[list[CompanyNews]],
+) -> AsyncIterator[CompanyNews]:
+    """
+    The async version of `merge_news_windows`.
+    """
+    deduplicator = NewsDeduplicator()
+    async for window in windows:
+        for news in sorted(window, key=get_datetime):
+            if deduplicator.is_new(news):
+                yield news
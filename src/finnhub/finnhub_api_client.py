@@ -1,8 +1,24 @@
-from httpx import Response
+import asyncio
+from collections.abc import AsyncIterator, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from httpx import AsyncBaseTransport, BaseTransport, Limits, Response, Timeout
 
 from src.config import settings
-from src.utils.base_api_client import BaseApiClient
+from src.finnhub.company_news import amerge_news_windows, merge_news_windows
+from src.utils.api_key_pool import ApiKeyPool
+from src.utils.base_api_client import AsyncBaseApiClient, BaseApiClient
+from src.utils.json_stream import aiter_json_array, iter_json_array
+from src.utils.rate_limiter import RateLimiter
+from src.utils.type_alias import BulkResult
 from src.utils.url_router import UrlRouter
+from src.utils.utils import HelperFuncs
+from src.utils.validation_policy import ValidationPolicy
+from src.validate_models.get_company_news import CompanyNews
+from src.validate_models.get_company_profile import GetCompanyProfileResponse
+from src.validate_models.get_quote import GetQuoteResponse
+from src.validate_models.get_symbol_lookup import GetSymbolLookupResponse
 
 
 class FinnHubRouter(UrlRouter):
@@ -12,33 +28,105 @@ class FinnHubRouter(UrlRouter):
         "company_news": "/api/v1/company-news",
         "quote": "/api/v1/quote",
     }
+    # The suggested TTL seconds of `ResponseCache`, e.g.
+    # FinnHubApiClient(response_cache=ResponseCache(FinnHubRouter.CACHE_TTLS))
+    CACHE_TTLS = {
+        "symbol_lookup": 60 * 60,
+        "company_profile": 24 * 60 * 60,
+        "quote": 1,
+    }
+    # The suggested timeouts of `Resilience`, the company news can be large
+    ROUTE_TIMEOUTS = {
+        "symbol_lookup": Timeout(10, connect=5),
+        "company_profile": Timeout(10, connect=5),
+        "company_news": Timeout(30, connect=5),
+        "quote": Timeout(5, connect=3),
+    }
+
+    # The models of `ValidationPolicy`, which checks the schema of the responses
+    VALIDATE_MODELS = {
+        "symbol_lookup": GetSymbolLookupResponse,
+        "company_profile": GetCompanyProfileResponse,
+        "company_news": list[CompanyNews],
+        "quote": GetQuoteResponse,
+    }
 
     def __init__(self) -> None:
         super().__init__(host=settings.FINN_HUB_HOST)
 
+    @staticmethod
+    def get_rate_limiter(pause_per_key: bool = False) -> RateLimiter | None:
+        """
+        Build the rate limiter from `FINN_HUB_CALLS_PER_*` settings. A 429 pauses
+        only its key with `pause_per_key`, e.g. the keys of an API key pool.
+        """
+        return RateLimiter.from_calls(
+            per_second=settings.FINN_HUB_CALLS_PER_SECOND,
+            per_minute=settings.FINN_HUB_CALLS_PER_MINUTE,
+            pause_per_key=pause_per_key,
+        )
 
-class FinnHubApiClient(BaseApiClient):
-    def __init__(self) -> None:
-        super().__init__(url_router=FinnHubRouter())
-        self.auth_headers = {
+    @staticmethod
+    def get_api_key_pool() -> ApiKeyPool | None:
+        """
+        Build the pool of `FINN_HUB_API_KEY` and `FINN_HUB_API_KEYS`, return None if
+        there's only one key.
+        """
+        keys = [
+            key
+            for key in dict.fromkeys(
+                [settings.FINN_HUB_API_KEY, *settings.FINN_HUB_API_KEYS]
+            )
+            if key
+        ]
+        if len(keys) < 2:
+            return None
+        rate_limits = RateLimiter.get_rate_limits(
+            per_second=settings.FINN_HUB_CALLS_PER_SECOND,
+            per_minute=settings.FINN_HUB_CALLS_PER_MINUTE,
+        )
+        return ApiKeyPool(keys, rate_limits)
+
+    @staticmethod
+    def get_validation_policy() -> ValidationPolicy | None:
+        """
+        Build the validation policy from `FINN_HUB_VALIDATION_*` settings.
+        """
+        if settings.FINN_HUB_VALIDATION_SAMPLE_RATE is None:
+            return None
+        return ValidationPolicy(
+            FinnHubRouter.VALIDATE_MODELS,
+            sample_rate=settings.FINN_HUB_VALIDATION_SAMPLE_RATE,
+            warmup=settings.FINN_HUB_VALIDATION_WARMUP,
+        )
+
+    @staticmethod
+    def get_http_limits() -> Limits:
+        """
+        Build the connection pool limits from `HTTP_*` settings.
+        """
+        return Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        )
+
+    @staticmethod
+    def get_auth_headers() -> dict[str, str]:
+        return {
             "Content-Type": "application/json",
             "X-Finnhub-Token": settings.FINN_HUB_API_KEY,
         }
 
-    def get_symbol_lookup(self, q: str, exchange: str = "US") -> Response:
-        api_url = self.get_api_url("symbol_lookup")
-        query_parameters = {"q": q, "exchange": exchange}
-        return self.client.get(
-            api_url, params=query_parameters, headers=self.auth_headers
-        )
-
-    def get_company_profile(
-        self,
+    @staticmethod
+    def company_profile_params(
         symbol: str | None = None,
         isin: str | None = None,
         cusip: str | None = None,
-    ) -> Response:
-        api_url = self.get_api_url("company_profile")
+    ) -> dict[str, str]:
+        """
+        Only one of symbol, isin and cusip is sent, symbol has the highest priority.
+        """
         query_parameters = {}
         if cusip:
             query_parameters = {"cusip": cusip}
@@ -46,15 +134,64 @@ class FinnHubApiClient(BaseApiClient):
             query_parameters = {"isin": isin}
         if symbol:
             query_parameters = {"symbol": symbol}
-        return self.client.get(
-            api_url, params=query_parameters, headers=self.auth_headers
+        return query_parameters
+
+
+class FinnHubApiClient(BaseApiClient):
+    RATE_LIMIT_KEY_HEADER = "X-Finnhub-Token"
+
+    def __init__(
+        self,
+        transport: BaseTransport | None = None,
+        rate_limiter: RateLimiter | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Args:
+            transport (BaseTransport | None): The transport of `httpx.Client`.
+            rate_limiter (RateLimiter | None): Defaults to the limits in settings.
+            kwargs (Any): Other arguments of `BaseApiClient`, e.g. response_cache.
+                The pool `limits`, `http2`, `api_key_pool` and
+                `validation_policy` default to the settings.
+        """
+        kwargs.setdefault("limits", FinnHubRouter.get_http_limits())
+        kwargs.setdefault("http2", settings.HTTP2)
+        kwargs.setdefault("api_key_pool", FinnHubRouter.get_api_key_pool())
+        kwargs.setdefault("validation_policy", FinnHubRouter.get_validation_policy())
+        if rate_limiter is None:
+            # The keys of a pool have their own quotas, a 429 pauses only its key
+            rate_limiter = FinnHubRouter.get_rate_limiter(
+                pause_per_key=kwargs["api_key_pool"] is not None
+            )
+        super().__init__(
+            url_router=FinnHubRouter(),
+            transport=transport,
+            rate_limiter=rate_limiter,
+            **kwargs,
+        )
+        self.auth_headers = FinnHubRouter.get_auth_headers()
+
+    def get_symbol_lookup(self, q: str, exchange: str = "US") -> Response:
+        query_parameters = {"q": q, "exchange": exchange}
+        return self.request_api(
+            "symbol_lookup", params=query_parameters, headers=self.auth_headers
+        )
+
+    def get_company_profile(
+        self,
+        symbol: str | None = None,
+        isin: str | None = None,
+        cusip: str | None = None,
+    ) -> Response:
+        query_parameters = FinnHubRouter.company_profile_params(symbol, isin, cusip)
+        return self.request_api(
+            "company_profile", params=query_parameters, headers=self.auth_headers
         )
 
     def get_quote(self, symbol: str) -> Response:
-        api_url = self.get_api_url("quote")
         query_parameters = {"symbol": symbol}
-        return self.client.get(
-            api_url, params=query_parameters, headers=self.auth_headers
+        return self.request_api(
+            "quote", params=query_parameters, headers=self.auth_headers
         )
 
     def get_company_news(self, symbol: str, from_: str, to_: str) -> Response:
@@ -67,8 +204,298 @@ class FinnHubApiClient(BaseApiClient):
             from_ (str): From date YYYY-MM-DD.
             to_ (str): To date YYYY-MM-DD.
         """
-        api_url = self.get_api_url("company_news")
         query_parameters = {"symbol": symbol, "from": from_, "to": to_}
-        return self.client.get(
-            api_url, params=query_parameters, headers=self.auth_headers
+        return self.request_api(
+            "company_news", params=query_parameters, headers=self.auth_headers
         )
+
+    def iter_company_news(
+        self, symbol: str, from_: str, to_: str
+    ) -> Iterator[CompanyNews]:
+        """
+        The streaming version of `get_company_news`, it reads the response body
+        incrementally and yields the validated news one by one, so the memory
+        doesn't grow with the size of the response. Raise `httpx.HTTPStatusError`
+        if the status code isn't 2xx.
+
+        Args:
+            symbol (str): Company symbol.
+            from_ (str): From date YYYY-MM-DD.
+            to_ (str): To date YYYY-MM-DD.
+        """
+        query_parameters = {"symbol": symbol, "from": from_, "to": to_}
+        with self.stream_api(
+            "company_news", params=query_parameters, headers=self.auth_headers
+        ) as res:
+            res.raise_for_status()
+            for item in iter_json_array(res.iter_bytes()):
+                yield CompanyNews.model_validate(item)
+
+    def get_company_news_models(
+        self, symbol: str, from_: str, to_: str
+    ) -> list[CompanyNews]:
+        """
+        Get the company news as models, raise `httpx.HTTPStatusError` if the status
+        code isn't 2xx.
+        """
+        query_parameters = {"symbol": symbol, "from": from_, "to": to_}
+        return self.request_model(
+            "company_news",
+            list[CompanyNews],
+            params=query_parameters,
+            headers=self.auth_headers,
+        )
+
+    def iter_company_news_sharded(
+        self,
+        symbol: str,
+        from_: str,
+        to_: str,
+        window_days: int = 7,
+        max_workers: int = 4,
+    ) -> Iterator[CompanyNews]:
+        """
+        Split [from_, to_] into windows of `window_days` days, fetch the windows
+        concurrently, and yield the news in datetime order without duplicates.
+        The news of a window is yielded as soon as it and the windows before it
+        are fetched.
+
+        Args:
+            symbol (str): Company symbol.
+            from_ (str): From date YYYY-MM-DD.
+            to_ (str): To date YYYY-MM-DD.
+            window_days (int): The days of each window.
+            max_workers (int): The number of windows fetched concurrently.
+        """
+        windows = HelperFuncs.split_date_range(from_, to_, window_days)
+        executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=self.__class__.__name__
+        )
+        try:
+            results = executor.map(
+                lambda window: self.get_company_news_models(symbol, *window), windows
+            )
+            yield from merge_news_windows(results)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_symbol_lookup_model(
+        self, q: str, exchange: str = "US"
+    ) -> GetSymbolLookupResponse:
+        """
+        Search the symbols, raise `httpx.HTTPStatusError` if the status code isn't
+        2xx.
+        """
+        query_parameters = {"q": q, "exchange": exchange}
+        return self.request_model(
+            "symbol_lookup",
+            GetSymbolLookupResponse,
+            params=query_parameters,
+            headers=self.auth_headers,
+        )
+
+    def get_quote_model(self, symbol: str) -> GetQuoteResponse:
+        """
+        Get the quote of the symbol, raise `httpx.HTTPStatusError` if the status
+        code isn't 2xx.
+        """
+        query_parameters = {"symbol": symbol}
+        return self.request_model(
+            "quote",
+            GetQuoteResponse,
+            params=query_parameters,
+            headers=self.auth_headers,
+        )
+
+    def get_company_profile_model(self, symbol: str) -> GetCompanyProfileResponse:
+        """
+        Get the company profile of the symbol, raise `httpx.HTTPStatusError` if the
+        status code isn't 2xx.
+        """
+        query_parameters = FinnHubRouter.company_profile_params(symbol, None, None)
+        return self.request_model(
+            "company_profile",
+            GetCompanyProfileResponse,
+            params=query_parameters,
+            headers=self.auth_headers,
+        )
+
+    def get_quotes(
+        self, symbols: Iterable[str], max_workers: int = 16
+    ) -> Iterator[BulkResult[str, GetQuoteResponse]]:
+        """
+        Get quotes of many symbols concurrently, and yield `(symbol, quote)` in
+        completion order. A failed symbol, e.g. 401, 429, timeout or an invalid
+        payload, is yielded as `(symbol, exception)` and doesn't abort the batch.
+
+        Args:
+            symbols (Iterable[str]): Company symbols.
+            max_workers (int): The number of concurrent requests.
+        """
+        return self.imap_unordered(self.get_quote_model, symbols, max_workers)
+
+    def get_company_profiles(
+        self, symbols: Iterable[str], max_workers: int = 16
+    ) -> Iterator[BulkResult[str, GetCompanyProfileResponse]]:
+        """
+        Get company profiles of many symbols concurrently, see `get_quotes`.
+
+        Args:
+            symbols (Iterable[str]): Company symbols.
+            max_workers (int): The number of concurrent requests.
+        """
+        return self.imap_unordered(self.get_company_profile_model, symbols, max_workers)
+
+
+class AsyncFinnHubApiClient(AsyncBaseApiClient):
+    """
+    The asyncio version of `FinnHubApiClient`. Use `gather` to fan out many
+    lookups with a concurrency cap, e.g.
+
+        quotes = await client.gather(client.get_quote(s) for s in symbols)
+    """
+
+    RATE_LIMIT_KEY_HEADER = "X-Finnhub-Token"
+
+    def __init__(
+        self,
+        transport: AsyncBaseTransport | None = None,
+        max_concurrency: int = 10,
+        rate_limiter: RateLimiter | None = None,
+        **kwargs: Any,
+    ) -> None:
+        kwargs.setdefault("limits", FinnHubRouter.get_http_limits())
+        kwargs.setdefault("http2", settings.HTTP2)
+        kwargs.setdefault("api_key_pool", FinnHubRouter.get_api_key_pool())
+        kwargs.setdefault("validation_policy", FinnHubRouter.get_validation_policy())
+        if rate_limiter is None:
+            # The keys of a pool have their own quotas, a 429 pauses only its key
+            rate_limiter = FinnHubRouter.get_rate_limiter(
+                pause_per_key=kwargs["api_key_pool"] is not None
+            )
+        super().__init__(
+            url_router=FinnHubRouter(),
+            transport=transport,
+            max_concurrency=max_concurrency,
+            rate_limiter=rate_limiter,
+            **kwargs,
+        )
+        self.auth_headers = FinnHubRouter.get_auth_headers()
+
+    async def get_symbol_lookup(self, q: str, exchange: str = "US") -> Response:
+        query_parameters = {"q": q, "exchange": exchange}
+        return await self.request_api(
+            "symbol_lookup", params=query_parameters, headers=self.auth_headers
+        )
+
+    async def get_company_profile(
+        self,
+        symbol: str | None = None,
+        isin: str | None = None,
+        cusip: str | None = None,
+    ) -> Response:
+        query_parameters = FinnHubRouter.company_profile_params(symbol, isin, cusip)
+        return await self.request_api(
+            "company_profile", params=query_parameters, headers=self.auth_headers
+        )
+
+    async def get_quote(self, symbol: str) -> Response:
+        query_parameters = {"symbol": symbol}
+        return await self.request_api(
+            "quote", params=query_parameters, headers=self.auth_headers
+        )
+
+    async def get_company_news(self, symbol: str, from_: str, to_: str) -> Response:
+        """
+        List latest company news by symbol. See `FinnHubApiClient.get_company_news`.
+        """
+        query_parameters = {"symbol": symbol, "from": from_, "to": to_}
+        return await self.request_api(
+            "company_news", params=query_parameters, headers=self.auth_headers
+        )
+
+    async def iter_company_news(
+        self, symbol: str, from_: str, to_: str
+    ) -> AsyncIterator[CompanyNews]:
+        """
+        The streaming version of `get_company_news`.
+        See `FinnHubApiClient.iter_company_news`.
+        """
+        query_parameters = {"symbol": symbol, "from": from_, "to": to_}
+        async with self.stream_api(
+            "company_news", params=query_parameters, headers=self.auth_headers
+        ) as res:
+            res.raise_for_status()
+            async for item in aiter_json_array(res.aiter_bytes()):
+                yield CompanyNews.model_validate(item)
+
+    async def get_company_news_models(
+        self, symbol: str, from_: str, to_: str
+    ) -> list[CompanyNews]:
+        query_parameters = {"symbol": symbol, "from": from_, "to": to_}
+        return await self.request_model(
+            "company_news",
+            list[CompanyNews],
+            params=query_parameters,
+            headers=self.auth_headers,
+        )
+
+    async def get_symbol_lookup_model(
+        self, q: str, exchange: str = "US"
+    ) -> GetSymbolLookupResponse:
+        query_parameters = {"q": q, "exchange": exchange}
+        return await self.request_model(
+            "symbol_lookup",
+            GetSymbolLookupResponse,
+            params=query_parameters,
+            headers=self.auth_headers,
+        )
+
+    async def get_quote_model(self, symbol: str) -> GetQuoteResponse:
+        query_parameters = {"symbol": symbol}
+        return await self.request_model(
+            "quote",
+            GetQuoteResponse,
+            params=query_parameters,
+            headers=self.auth_headers,
+        )
+
+    async def get_company_profile_model(self, symbol: str) -> GetCompanyProfileResponse:
+        query_parameters = FinnHubRouter.company_profile_params(symbol, None, None)
+        return await self.request_model(
+            "company_profile",
+            GetCompanyProfileResponse,
+            params=query_parameters,
+            headers=self.auth_headers,
+        )
+
+    async def iter_company_news_sharded(
+        self,
+        symbol: str,
+        from_: str,
+        to_: str,
+        window_days: int = 7,
+        max_concurrency: int | None = None,
+    ) -> AsyncIterator[CompanyNews]:
+        """
+        See `FinnHubApiClient.iter_company_news_sharded`.
+        """
+        windows = HelperFuncs.split_date_range(from_, to_, window_days)
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def _fetch(window: tuple[str, str]) -> list[CompanyNews]:
+            async with semaphore:
+                return await self.get_company_news_models(symbol, *window)
+
+        tasks = [asyncio.create_task(_fetch(window)) for window in windows]
+
+        async def _results() -> AsyncIterator[list[CompanyNews]]:
+            for task in tasks:
+                yield await task
+
+        try:
+            async for news in amerge_news_windows(_results()):
+                yield news
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,248 @@
+import bisect
+import hashlib
+import itertools
+import logging
+import os
+from array import array
+from collections.abc import Iterable
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+
+from src.finnhub.company_news import get_datetime
+from src.finnhub.finnhub_api_client import FinnHubApiClient
+from src.utils.base_model import BaseModel, get_type_adapter
+from src.utils.bloom_filter import BloomFilter
+from src.utils.json_codec import get_json_codec
+from src.utils.utils import HelperFuncs
+from src.validate_models.get_company_news import CompanyNews
+
+log = logging.getLogger(__name__)
+
+
+def hash_key(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest())
+
+
+def get_news_hashes(news: CompanyNews) -> list[int]:
+    """
+    The hashes of the url and the id of the news, a news is seen if any of them
+    is seen like `NewsDeduplicator`.
+    """
+    hashes = [hash_key(f"url:{news.url}")]
+    if news.id is not None:
+        hashes.append(hash_key(f"id:{news.id}"))
+    return hashes
+
+
+class SeenIndex:
+    """
+    The persistent index of the seen news, 8 bytes of each url and id hash.
+
+    The saved hashes are a sorted array searched by bisect, and the hashes added
+    since the last `save` are a set. A Bloom filter of all hashes is checked
+    first, so most new news is told apart without searching the array. The filter
+    is saved before the array, so it's never behind the array after a crash.
+
+    It isn't thread-safe.
+    """
+
+    def __init__(
+        self, directory: Path, capacity: int = 1_000_000, error_rate: float = 0.001
+    ) -> None:
+        """
+        Args:
+            directory (Path): The directory of `seen.idx` and `seen.bloom`.
+            capacity (int): The hashes of the Bloom filter, it's rebuilt with
+                double capacity when it's full.
+            error_rate (float): The false positive rate of the Bloom filter.
+        """
+        self.index_path = directory / "seen.idx"
+        self.bloom_path = directory / "seen.bloom"
+        self.error_rate = error_rate
+        self._saved = array("Q")
+        if self.index_path.exists():
+            self._saved.frombytes(self.index_path.read_bytes())
+        self._pending: set[int] = set()
+        capacity = max(capacity, len(self._saved) * 2)
+        try:
+            self._bloom = BloomFilter.load(self.bloom_path)
+        except (FileNotFoundError, ValueError):
+            self._bloom = self._build_bloom(capacity)
+        else:
+            # A filter behind the index, e.g. it's deleted and the index isn't
+            if len(self._bloom) < len(self._saved):
+                self._bloom = self._build_bloom(capacity)
+
+    def __len__(self) -> int:
+        return len(self._saved) + len(self._pending)
+
+    def _build_bloom(self, capacity: int) -> BloomFilter:
+        bloom = BloomFilter(capacity, self.error_rate)
+        for value in itertools.chain(self._saved, self._pending):
+            bloom.add(value)
+        return bloom
+
+    def __contains__(self, value: int) -> bool:
+        if value not in self._bloom:
+            return False
+        if value in self._pending:
+            return True
+        i = bisect.bisect_left(self._saved, value)
+        return i < len(self._saved) and self._saved[i] == value
+
+    def is_new(self, news: CompanyNews) -> bool:
+        """
+        Return True and mark the news seen if its url and id aren't seen.
+        """
+        hashes = get_news_hashes(news)
+        if any(value in self for value in hashes):
+            return False
+        for value in hashes:
+            self._pending.add(value)
+            self._bloom.add(value)
+        return True
+
+    def save(self) -> None:
+        if not self._pending:
+            return
+        saved = array("Q", sorted(itertools.chain(self._saved, self._pending)))
+        self._saved, self._pending = saved, set()
+        if len(saved) > self._bloom.capacity:
+            self._bloom = self._build_bloom(len(saved) * 2)
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self._bloom.save(self.bloom_path)
+        tmp_path = self.index_path.with_name(f".{self.index_path.name}.tmp")
+        tmp_path.write_bytes(saved.tobytes())
+        os.replace(tmp_path, self.index_path)
+
+
+class NewsSyncStats(BaseModel):
+    symbols: int = 0
+    errors: int = 0
+    # The news of the responses, and the new ones of them
+    fetched: int = 0
+    new: int = 0
+
+
+class NewsSync:
+    """
+    Sync the company news incrementally. Each symbol keeps a high-water mark, the
+    latest `datetime` of its news, and each sync only requests the days from the
+    high-water mark to today. The news of all symbols are deduplicated by a
+    `SeenIndex`, so a sync returns only the news which aren't returned before,
+    e.g. a news related to several symbols is returned once.
+
+    `sync` only marks the returned news seen in memory, and `commit` saves the
+    high-water marks and the index after the caller has handled them. The news
+    which isn't committed, e.g. the process crashes or `rollback` is called, is
+    returned again by the next sync, so the delivery is at least once.
+
+        news_sync = NewsSync(client, Path("news_sync"))
+        news = news_sync.sync(["AAPL", "MSFT"])
+        store(news)
+        news_sync.commit()
+    """
+
+    def __init__(
+        self,
+        client: FinnHubApiClient,
+        directory: Path,
+        initial_days: int = 7,
+        max_workers: int = 4,
+        capacity: int = 1_000_000,
+        error_rate: float = 0.001,
+    ) -> None:
+        """
+        Args:
+            client (FinnHubApiClient): The api client.
+            directory (Path): The directory of the high-water marks and the index.
+            initial_days (int): The days requested of a symbol without high-water
+                mark, today included.
+            max_workers (int): The concurrent requests.
+            capacity (int): The capacity of the Bloom filter of the index.
+            error_rate (float): The false positive rate of the Bloom filter.
+        """
+        self.client = client
+        self.directory = directory
+        self.initial_days = initial_days
+        self.max_workers = max_workers
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.watermarks_path = directory / "watermarks.json"
+        self.stats = NewsSyncStats()
+        self.watermarks: dict[str, int] = {}
+        self.seen = SeenIndex(directory, capacity, error_rate)
+        self.rollback()
+
+    def rollback(self) -> None:
+        """
+        Drop the news and the high-water marks synced since the last commit, so
+        the next sync returns the news again.
+        """
+        self.watermarks = {}
+        if self.watermarks_path.exists():
+            self.watermarks = get_type_adapter(dict[str, int]).validate_json(
+                self.watermarks_path.read_bytes()
+            )
+        self.seen = SeenIndex(self.directory, self.capacity, self.error_rate)
+
+    def get_window(self, symbol: str, today: date) -> tuple[str, str]:
+        """
+        The dates of the request, the day of the high-water mark is requested
+        again for the news published later that day.
+        """
+        watermark = self.watermarks.get(symbol)
+        if watermark is None:
+            start = today - timedelta(days=self.initial_days - 1)
+        else:
+            start = min(datetime.fromtimestamp(watermark, UTC).date(), today)
+        return start.isoformat(), today.isoformat()
+
+    def sync(
+        self, symbols: Iterable[str], today: date | None = None
+    ) -> list[CompanyNews]:
+        """
+        Request the news of the symbols since their high-water marks, and return
+        the new news in datetime order. The failed symbols are logged and
+        requested from the same high-water marks by the next sync.
+
+        The news is marked seen in memory only, call `commit` after handling it.
+        """
+        today = today or HelperFuncs.get_current_utc().date()
+        symbols = list(dict.fromkeys(symbols))
+        windows = {symbol: self.get_window(symbol, today) for symbol in symbols}
+        stats = NewsSyncStats(symbols=len(symbols))
+        new_news: list[CompanyNews] = []
+        for symbol, result in self.client.imap_unordered(
+            lambda symbol: self.client.get_company_news_models(
+                symbol, *windows[symbol]
+            ),
+            symbols,
+            self.max_workers,
+        ):
+            if isinstance(result, Exception):
+                stats.errors += 1
+                log.warning(f"Failed to sync the news of {symbol}: {result!r}")
+                continue
+            stats.fetched += len(result)
+            new_news.extend(news for news in result if self.seen.is_new(news))
+            if result:
+                self.watermarks[symbol] = max(
+                    self.watermarks.get(symbol, 0), max(map(get_datetime, result))
+                )
+        new_news.sort(key=get_datetime)
+        stats.new = len(new_news)
+        self.stats = stats
+        return new_news
+
+    def commit(self) -> None:
+        """
+        Save the news returned by the syncs since the last commit as seen, and
+        their high-water marks.
+        """
+        # The index first, an old high-water mark only requests the seen news
+        self.seen.save()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.watermarks_path.with_name(f".{self.watermarks_path.name}.tmp")
+        tmp_path.write_bytes(get_json_codec().dumps(self.watermarks))
+        os.replace(tmp_path, self.watermarks_path)
@@ -0,0 +1,316 @@
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Iterable
+from datetime import datetime
+from datetime import time as dt_time
+from zoneinfo import ZoneInfo
+
+from pydantic import Field
+
+from src.finnhub.finnhub_api_client import AsyncFinnHubApiClient
+from src.utils.base_model import BaseModel
+from src.validate_models.get_quote import GetQuoteResponse
+
+log = logging.getLogger(__name__)
+
+
+class MarketHours(BaseModel):
+    """
+    The regular trading hours, the US market by default. Holidays aren't
+    considered.
+    """
+
+    timezone: str = "America/New_York"
+    open: dt_time = dt_time(9, 30)
+    close: dt_time = dt_time(16, 0)
+    # Monday is 0
+    weekdays: set[int] = Field(default_factory=lambda: {0, 1, 2, 3, 4})
+
+    def is_open(self, ts: float) -> bool:
+        local = datetime.fromtimestamp(ts, ZoneInfo(self.timezone))
+        return (
+            local.weekday() in self.weekdays
+            and self.open <= local.time().replace(tzinfo=None) < self.close
+        )
+
+
+US_MARKET_HOURS = MarketHours()
+
+
+class WatchlistItem(BaseModel):
+    symbol: str
+    # The share of the budget is proportional to it
+    priority: float = Field(default=1, gt=0)
+    # Poll it outside the market hours too, e.g. crypto or forex
+    always_open: bool = False
+
+
+class SymbolFreshness(BaseModel):
+    symbol: str
+    priority: float
+    is_open: bool
+    # The EWMA of the probability that `c` changed between two fetches
+    change_rate: float
+    fetches: int
+    changes: int
+    errors: int
+    # The planned seconds between two fetches under the budget, None if it's closed
+    target_interval: float | None
+    # The seconds since the last successful fetch, None if it's never fetched
+    staleness: float | None
+    max_staleness: float
+    last_fetched_at: float | None
+    last_changed_at: float | None
+
+
+class _SymbolState:
+    __slots__ = (
+        "item",
+        "change_rate",
+        "fetches",
+        "changes",
+        "errors",
+        "in_flight",
+        "last_polled_at",
+        "last_fetched_at",
+        "last_changed_at",
+        "max_staleness",
+        "quote",
+    )
+
+    def __init__(self, item: WatchlistItem, change_rate: float) -> None:
+        self.item = item
+        self.change_rate = change_rate
+        self.fetches = 0
+        self.changes = 0
+        self.errors = 0
+        self.in_flight = False
+        self.last_polled_at: float | None = None
+        self.last_fetched_at: float | None = None
+        self.last_changed_at: float | None = None
+        self.max_staleness = 0.0
+        self.quote: GetQuoteResponse | None = None
+
+
+class QuoteScheduler:
+    """
+    Poll the quotes of a watchlist within a requests per minute budget, and emit
+    only the changed quotes.
+
+    Each symbol gets a share of the budget proportional to
+    `priority * (change_rate + min_activity)`, where `change_rate` is the observed
+    probability that the current price `c` changed since the previous fetch. At
+    every slot of the budget, the open symbol with the largest weighted staleness,
+    `(now - last polled) * weight`, is fetched, so the fetches of each symbol are
+    spread evenly instead of bursting. The symbols never fetched go first by
+    priority. The symbols outside the market hours are skipped after their first
+    fetch, and their budget goes to the open ones.
+
+        scheduler = QuoteScheduler([WatchlistItem(symbol="AAPL", priority=3)], 60)
+        async for symbol, quote in scheduler.run(client):
+            ...
+    """
+
+    def __init__(
+        self,
+        watchlist: Iterable[WatchlistItem],
+        requests_per_minute: float,
+        market_hours: MarketHours | None = US_MARKET_HOURS,
+        min_activity: float = 0.05,
+        smoothing: float = 0.2,
+        initial_change_rate: float = 1.0,
+    ) -> None:
+        """
+        Args:
+            watchlist (Iterable[WatchlistItem]): The symbols and their priorities.
+            requests_per_minute (float): The budget of the quote requests.
+            market_hours (MarketHours | None): None means the market is always open.
+            min_activity (float): The floor of the change rate, so the illiquid
+                symbols are still polled now and then.
+            smoothing (float): The weight of the latest fetch in the change rate.
+            initial_change_rate (float): The change rate of the new symbols, high
+                by default so they're sampled before they're known to be quiet.
+        """
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive.")
+        self.requests_per_minute = requests_per_minute
+        self.market_hours = market_hours
+        self.min_activity = min_activity
+        self.smoothing = smoothing
+        self.initial_change_rate = initial_change_rate
+        self._states: dict[str, _SymbolState] = {}
+        for item in watchlist:
+            self.add(item)
+
+    @property
+    def interval(self) -> float:
+        """
+        The seconds between two requests under the budget.
+        """
+        return 60 / self.requests_per_minute
+
+    def add(self, item: WatchlistItem) -> None:
+        state = self._states.get(item.symbol)
+        if state is None:
+            self._states[item.symbol] = _SymbolState(item, self.initial_change_rate)
+        else:
+            state.item = item
+
+    def remove(self, symbol: str) -> None:
+        self._states.pop(symbol, None)
+
+    def get_quote(self, symbol: str) -> GetQuoteResponse | None:
+        return self._states[symbol].quote
+
+    def is_open(self, item: WatchlistItem, now: float) -> bool:
+        return (
+            item.always_open
+            or self.market_hours is None
+            or self.market_hours.is_open(now)
+        )
+
+    def get_weight(self, state: _SymbolState) -> float:
+        return state.item.priority * (state.change_rate + self.min_activity)
+
+    def next_symbol(self, now: float) -> str | None:
+        """
+        Choose the symbol of the next request and mark it in flight, return None if
+        no symbol needs a request now.
+        """
+        best: _SymbolState | None = None
+        best_key: tuple[bool, float] = (False, -1.0)
+        for state in self._states.values():
+            if state.in_flight:
+                continue
+            if state.last_polled_at is None:
+                # Fetch the new symbols first by priority, even if it's closed
+                key = (True, state.item.priority)
+            elif self.is_open(state.item, now):
+                key = (False, (now - state.last_polled_at) * self.get_weight(state))
+            else:
+                continue
+            if key > best_key:
+                best, best_key = state, key
+        if best is None:
+            return None
+        best.in_flight = True
+        best.last_polled_at = now
+        return best.item.symbol
+
+    def on_quote(self, symbol: str, quote: GetQuoteResponse, now: float) -> bool:
+        """
+        Record the fetched quote, and return whether its current price changed.
+        """
+        state = self._states.get(symbol)
+        if state is None:
+            return False
+        state.in_flight = False
+        if state.last_fetched_at is not None:
+            state.max_staleness = max(state.max_staleness, now - state.last_fetched_at)
+        previous = state.quote
+        changed = previous is None or previous.c != quote.c
+        if previous is not None:
+            state.change_rate += self.smoothing * (changed - state.change_rate)
+        state.fetches += 1
+        state.last_fetched_at = now
+        state.quote = quote
+        if changed:
+            state.changes += 1
+            state.last_changed_at = now
+        return changed
+
+    def on_error(self, symbol: str) -> None:
+        state = self._states.get(symbol)
+        if state is None:
+            return
+        state.in_flight = False
+        state.errors += 1
+
+    def get_target_intervals(self, now: float) -> dict[str, float]:
+        """
+        The planned seconds between two fetches of each open symbol.
+        """
+        weights = {
+            symbol: self.get_weight(state)
+            for symbol, state in self._states.items()
+            if self.is_open(state.item, now)
+        }
+        total = sum(weights.values())
+        return {
+            symbol: self.interval * total / weight for symbol, weight in weights.items()
+        }
+
+    def report(self, now: float | None = None) -> list[SymbolFreshness]:
+        """
+        The freshness of each symbol, the stalest first.
+        """
+        now = time.time() if now is None else now
+        target_intervals = self.get_target_intervals(now)
+        reports = []
+        for symbol, state in self._states.items():
+            staleness = None
+            if state.last_fetched_at is not None:
+                staleness = now - state.last_fetched_at
+            reports.append(
+                SymbolFreshness(
+                    symbol=symbol,
+                    priority=state.item.priority,
+                    is_open=symbol in target_intervals,
+                    change_rate=state.change_rate,
+                    fetches=state.fetches,
+                    changes=state.changes,
+                    errors=state.errors,
+                    target_interval=target_intervals.get(symbol),
+                    staleness=staleness,
+                    max_staleness=max(state.max_staleness, staleness or 0),
+                    last_fetched_at=state.last_fetched_at,
+                    last_changed_at=state.last_changed_at,
+                )
+            )
+        reports.sort(key=lambda r: float("inf") if r.staleness is None else r.staleness)
+        return reports[::-1]
+
+    async def run(
+        self, client: AsyncFinnHubApiClient
+    ) -> AsyncIterator[tuple[str, GetQuoteResponse]]:
+        """
+        Poll the quotes at the pace of the budget forever, and yield
+        `(symbol, quote)` when the current price of the symbol changed. A failed
+        request is logged and the symbol is polled again at its next turn.
+        """
+        queue: asyncio.Queue[tuple[str, GetQuoteResponse]] = asyncio.Queue()
+        tasks: set[asyncio.Task[None]] = set()
+
+        async def fetch(symbol: str) -> None:
+            try:
+                quote = await client.get_quote_model(symbol)
+            except Exception as e:
+                self.on_error(symbol)
+                log.warning(f"Failed to get the quote of {symbol}: {e!r}")
+                return
+            if self.on_quote(symbol, quote, time.time()):
+                queue.put_nowait((symbol, quote))
+
+        next_slot = time.monotonic()
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= next_slot:
+                    # Don't catch up the missed slots by a burst
+                    next_slot = max(next_slot + self.interval, now)
+                    symbol = self.next_symbol(time.time())
+                    if symbol is not None:
+                        task = asyncio.create_task(fetch(symbol))
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+                try:
+                    timeout = max(next_slot - time.monotonic(), 0)
+                    yield await asyncio.wait_for(queue.get(), timeout)
+                except TimeoutError:
+                    pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            for state in self._states.values():
+                state.in_flight = False
@@ -0,0 +1,414 @@
+"""
+A local stand-in of the Finnhub API for load tests and benchmarks. It serves the
+routes of `FinnHubRouter` with the payloads of `SyntheticData`, and injects
+latency, 401 on a bad token, 429 over the quotas, 5xx errors and timeouts.
+
+Usage:
+    python -m src.finnhub.stand_in_server --port 8080 --latency 0.05 \
+        --calls-per-minute 60 --error-rate 0.01
+
+Then point the clients at it by `FINN_HUB_HOST=http://127.0.0.1:8080`.
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import math
+import random
+import threading
+import time
+import zlib
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import TracebackType
+from typing import Any, Self, override
+from urllib.parse import parse_qs, urlsplit
+
+from pydantic import Field
+
+from src.config import settings
+from src.constants import LatencyDistribution
+from src.finnhub.finnhub_api_client import FinnHubRouter
+from src.finnhub.synthetic_data import SyntheticData
+from src.utils.base_model import BaseModel
+
+log = logging.getLogger(__name__)
+
+# Responses smaller than it aren't compressed, like most CDNs
+GZIP_MIN_SIZE = 1024
+
+
+class StandInConfig(BaseModel):
+    """
+    The behavior of the stand-in server, it can be changed while it's running.
+    """
+
+    # The valid tokens of the `X-Finnhub-Token` header or the `token` parameter
+    api_keys: set[str] = Field(default_factory=lambda: {settings.FINN_HUB_API_KEY})
+    # The median latency in seconds, and the overrides by route name
+    latency: float = Field(default=0, ge=0)
+    route_latency: dict[str, float] = Field(default_factory=dict)
+    latency_distribution: LatencyDistribution = Field(
+        default=LatencyDistribution.CONSTANT
+    )
+    # The shape of the lognormal distribution, the larger the longer tail
+    latency_sigma: float = Field(default=0.5, gt=0)
+    # The quotas of each token, None means no limit
+    calls_per_second: int | None = Field(default=None, gt=0)
+    calls_per_minute: int | None = Field(default=None, gt=0)
+    # The probability of an injected 5xx response
+    error_rate: float = Field(default=0, ge=0, le=1)
+    error_statuses: list[int] = Field(default_factory=lambda: [500, 502, 503])
+    # The probability of holding the request for `timeout_seconds` without response
+    timeout_rate: float = Field(default=0, ge=0, le=1)
+    timeout_seconds: float = Field(default=30, ge=0)
+    # The news of each day in the company news
+    news_per_day: int = Field(default=5, ge=0)
+    seed: int | None = Field(default=None)
+
+
+class StandInStats(BaseModel):
+    requests: int = 0
+    unauthorized: int = 0
+    rate_limited: int = 0
+    server_errors: int = 0
+    timeouts: int = 0
+    not_modified: int = 0
+    routes: dict[str, int] = Field(default_factory=dict)
+
+
+class QuotaWindow:
+    """
+    A fixed window counter of each token, like the Finnhub quotas.
+    """
+
+    def __init__(self, calls: int, period: float) -> None:
+        self.calls = calls
+        self.period = period
+        self._windows: dict[str, tuple[float, int]] = {}
+
+    def hit(self, key: str, now: float) -> tuple[int, float]:
+        """
+        Count a call, and return the remaining calls (negative if it's over the
+        quota) and the seconds until the window is reset.
+        """
+        start = now - now % self.period
+        window_start, count = self._windows.get(key, (start, 0))
+        if window_start != start:
+            count = 0
+        count += 1
+        self._windows[key] = (start, count)
+        return self.calls - count, start + self.period - now
+
+
+class StandInServer:
+    """
+    Run the stand-in server in a background thread, use it as a context manager:
+
+        with StandInServer(StandInConfig(latency=0.05)) as server:
+            settings.FINN_HUB_HOST = server.url
+    """
+
+    def __init__(
+        self,
+        config: StandInConfig | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.config = config or StandInConfig()
+        self.stats = StandInStats()
+        self.routes = {path: name for name, path in FinnHubRouter.ROUTER.items()}
+        self._random = random.Random(self.config.seed)
+        self._quotas: dict[float, QuotaWindow] = {}
+        self._lock = threading.Lock()
+        self._server = _HTTPServer((host, port), _Handler)
+        self._server.stand_in = self
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.socket.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> Self:
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            # Stop quickly, `shutdown` waits for the next poll
+            kwargs={"poll_interval": 0.05},
+            name=self.__class__.__name__,
+            daemon=True,
+        )
+        self._thread.start()
+        log.info(f"The Finnhub stand-in server is running on {self.url}")
+        return self
+
+    def serve_forever(self) -> None:
+        """
+        Serve in the current thread until `KeyboardInterrupt`.
+        """
+        log.info(f"The Finnhub stand-in server is running on {self.url}")
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> Self:
+        return self.start()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.stop()
+
+    def get_latency(self, route: str) -> float:
+        config = self.config
+        median = config.route_latency.get(route, config.latency)
+        if median <= 0:
+            return 0
+        with self._lock:
+            match config.latency_distribution:
+                case LatencyDistribution.UNIFORM:
+                    return self._random.uniform(0, 2 * median)
+                case LatencyDistribution.EXPONENTIAL:
+                    # The median of the exponential distribution is mean * ln2
+                    return self._random.expovariate(math.log(2) / median)
+                case LatencyDistribution.LOGNORMAL:
+                    return self._random.lognormvariate(
+                        math.log(median), config.latency_sigma
+                    )
+                case _:
+                    return median
+
+    def choose_error_status(self) -> int:
+        with self._lock:
+            return self._random.choice(self.config.error_statuses)
+
+    def roll(self, probability: float) -> bool:
+        if probability <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < probability
+
+    def check_quotas(self, token: str) -> tuple[dict[str, str], float | None]:
+        """
+        Count the call of the token, and return the rate limit headers and the
+        seconds to retry after if it's over any quota.
+        """
+        quotas = [
+            (self.config.calls_per_second, 1),
+            (self.config.calls_per_minute, 60),
+        ]
+        headers: dict[str, str] = {}
+        retry_after = None
+        now = time.time()
+        with self._lock:
+            for calls, period in quotas:
+                if calls is None:
+                    continue
+                window = self._quotas.get(period)
+                if window is None or window.calls != calls:
+                    window = self._quotas[period] = QuotaWindow(calls, period)
+                remaining, reset_in = window.hit(token, now)
+                if not headers or remaining < int(headers["X-Ratelimit-Remaining"]):
+                    headers = {
+                        "X-Ratelimit-Limit": str(calls),
+                        "X-Ratelimit-Remaining": str(max(remaining, 0)),
+                        "X-Ratelimit-Reset": str(math.ceil(now + reset_in)),
+                    }
+                if remaining < 0:
+                    retry_after = max(retry_after or 0, reset_in)
+        return headers, retry_after
+
+    def count(self, field: str | None = None, route: str | None = None) -> None:
+        with self._lock:
+            if field:
+                setattr(self.stats, field, getattr(self.stats, field) + 1)
+            else:
+                self.stats.requests += 1
+            if route:
+                self.stats.routes[route] = self.stats.routes.get(route, 0) + 1
+
+    def get_payload(self, route: str, params: dict[str, str]) -> tuple[int, Any]:
+        """
+        Return the status code and the payload of the route.
+        """
+        match route:
+            case "symbol_lookup":
+                if not params.get("q"):
+                    return HTTPStatus.UNPROCESSABLE_ENTITY, {"error": "Missing q"}
+                return HTTPStatus.OK, SyntheticData.symbol_lookup(params["q"])
+            case "company_profile":
+                symbol = (
+                    params.get("symbol") or params.get("isin") or params.get("cusip")
+                )
+                if not symbol:
+                    return HTTPStatus.OK, {}
+                return HTTPStatus.OK, SyntheticData.company_profile(symbol)
+            case "company_news":
+                try:
+                    symbol, from_, to_ = params["symbol"], params["from"], params["to"]
+                    datetime.strptime(from_, "%Y-%m-%d")
+                    datetime.strptime(to_, "%Y-%m-%d")
+                except (KeyError, ValueError):
+                    return HTTPStatus.UNPROCESSABLE_ENTITY, {
+                        "error": "Wrong symbol or date format, e.g. 2025-04-01"
+                    }
+                news = SyntheticData.company_news(
+                    symbol, from_, to_, self.config.news_per_day
+                )
+                return HTTPStatus.OK, news
+            case "quote":
+                if not params.get("symbol"):
+                    return HTTPStatus.UNPROCESSABLE_ENTITY, {"error": "Missing symbol"}
+                return HTTPStatus.OK, SyntheticData.quote(
+                    params["symbol"], int(time.time())
+                )
+        return HTTPStatus.NOT_FOUND, {"error": "Not found"}
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    # The default backlog 5 makes the burst of new connections wait for SYN
+    # retransmission, it dominates the tail latency
+    request_queue_size = 1024
+    daemon_threads = True
+    stand_in: StandInServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: _HTTPServer
+
+    def do_GET(self) -> None:
+        stand_in = self.server.stand_in
+        config = stand_in.config
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        route = stand_in.routes.get(url.path.rstrip("/"))
+        stand_in.count(route=route)
+        if route is None:
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+            return
+
+        token = self.headers.get("X-Finnhub-Token", params.get("token"))
+        if token not in config.api_keys:
+            stand_in.count("unauthorized")
+            self.send_json(HTTPStatus.UNAUTHORIZED, {"error": "Invalid API key"})
+            return
+        rate_limit_headers, retry_after = stand_in.check_quotas(token)
+        if retry_after is not None:
+            stand_in.count("rate_limited")
+            self.send_json(
+                HTTPStatus.TOO_MANY_REQUESTS,
+                {"error": "API limit reached. Please try again later."},
+                {**rate_limit_headers, "Retry-After": str(math.ceil(retry_after))},
+            )
+            return
+
+        time.sleep(stand_in.get_latency(route))
+        if stand_in.roll(config.timeout_rate):
+            stand_in.count("timeouts")
+            # Hold the request, then drop the connection without any response
+            time.sleep(config.timeout_seconds)
+            self.close_connection = True
+            return
+        if stand_in.roll(config.error_rate):
+            stand_in.count("server_errors")
+            self.send_json(
+                stand_in.choose_error_status(), {"error": "Internal server error"}
+            )
+            return
+
+        status, payload = stand_in.get_payload(route, params)
+        self.send_json(status, payload, rate_limit_headers, conditional=True)
+
+    def send_json(
+        self,
+        status: int,
+        payload: Any,
+        headers: dict[str, str] | None = None,
+        conditional: bool = False,
+    ) -> None:
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        etag = f'"{zlib.crc32(body):08x}"'
+        if conditional and self.headers.get("If-None-Match") == etag:
+            self.server.stand_in.count("not_modified")
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        if conditional:
+            self.send_header("ETag", etag)
+        if len(body) >= GZIP_MIN_SIZE and "gzip" in self.headers.get(
+            "Accept-Encoding", ""
+        ):
+            body = gzip.compress(body, compresslevel=5)
+            self.send_header("Content-Encoding", "gzip")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    @override
+    def log_message(self, format: str, *args: Any) -> None:
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(format % args)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--api-key", action="append", dest="api_keys")
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument(
+        "--latency-distribution",
+        type=LatencyDistribution,
+        default=LatencyDistribution.CONSTANT,
+    )
+    parser.add_argument("--calls-per-second", type=int)
+    parser.add_argument("--calls-per-minute", type=int)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--timeout-rate", type=float, default=0)
+    parser.add_argument("--timeout-seconds", type=float, default=30)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = StandInConfig(
+        latency=args.latency,
+        latency_distribution=args.latency_distribution,
+        calls_per_second=args.calls_per_second,
+        calls_per_minute=args.calls_per_minute,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        timeout_seconds=args.timeout_seconds,
+        seed=args.seed,
+    )
+    if args.api_keys:
+        config.api_keys = set(args.api_keys)
+    server = StandInServer(config, args.host, args.port)
+    print(f"FINN_HUB_HOST={server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
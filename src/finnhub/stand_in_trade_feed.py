@@ -0,0 +1,253 @@
+"""
+A local stand-in of the Finnhub trades WebSocket feed for tests and benchmarks.
+It accepts the subscribe/unsubscribe messages of Finnhub, and publishes random
+walk trades of the subscribed symbols in batches. It needs the optional
+`websockets` package.
+
+Usage:
+    python -m src.finnhub.stand_in_trade_feed --port 8081 --interval 0.1 \
+        --trades-per-message 20
+
+Then point the stream at it by `FINN_HUB_WS_HOST=ws://127.0.0.1:8081`.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from http import HTTPStatus
+from types import TracebackType
+from typing import Any, Self
+from urllib.parse import parse_qs, urlsplit
+
+from pydantic import Field
+
+from src.config import settings
+from src.finnhub.synthetic_data import SyntheticData
+from src.utils.base_model import BaseModel
+
+log = logging.getLogger(__name__)
+
+CONDITIONS = ["1", "12", "24", "37"]
+
+
+class StandInTradeFeedConfig(BaseModel):
+    """
+    The behavior of the stand-in feed, it can be changed while it's running.
+    """
+
+    # The valid tokens of the `token` parameter
+    api_keys: set[str] = Field(default_factory=lambda: {settings.FINN_HUB_API_KEY})
+    # The seconds between the messages of each connection
+    interval: float = Field(default=0.1, gt=0)
+    # The trades of each subscribed symbol in a message
+    trades_per_message: int = Field(default=5, ge=1)
+    # The seconds between the pings, None means no ping
+    ping_interval: float | None = Field(default=None, gt=0)
+    seed: int | None = Field(default=None)
+
+
+class StandInTradeFeedStats(BaseModel):
+    connections: int = 0
+    unauthorized: int = 0
+    subscribes: int = 0
+    unsubscribes: int = 0
+    messages: int = 0
+    trades: int = 0
+
+
+class StandInTradeFeed:
+    """
+    Run the stand-in feed in the current event loop, use it as an async context
+    manager:
+
+        async with StandInTradeFeed() as feed:
+            stream = FinnHubTradesStream(["AAPL"], url=feed.url)
+    """
+
+    def __init__(
+        self,
+        config: StandInTradeFeedConfig | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        from websockets.asyncio.server import serve
+
+        self._serve = serve
+        self.config = config or StandInTradeFeedConfig()
+        self.stats = StandInTradeFeedStats()
+        self.host = host
+        self.port = port
+        self._random = random.Random(self.config.seed)
+        self._prices: dict[str, float] = {}
+        self._server: Any = None
+        # The subscribed symbols of each connection
+        self._subscriptions: dict[Any, set[str]] = {}
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self) -> Self:
+        self._server = await self._serve(
+            self._handle,
+            self.host,
+            self.port,
+            process_request=self._authorize,
+            ping_interval=None,
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        log.info(f"The Finnhub stand-in trade feed is running on {self.url}")
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def __aenter__(self) -> Self:
+        return await self.start()
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.stop()
+
+    async def drop_connections(self) -> None:
+        """
+        Close all the connections like a restart of the feed, to test the
+        reconnection of the clients.
+        """
+        for connection in list(self._subscriptions):
+            await connection.close(1012, "Service restart")
+
+    def get_subscriptions(self) -> set[str]:
+        return set().union(*self._subscriptions.values())
+
+    def make_trades(self, symbol: str) -> list[dict[str, Any]]:
+        price = self._prices.get(symbol)
+        if price is None:
+            price = SyntheticData.quote(symbol)["c"]
+        now = int(time.time() * 1000)
+        trades = []
+        for _ in range(self.config.trades_per_message):
+            price = max(round(price * self._random.gauss(1, 0.0005), 4), 0.01)
+            trades.append(
+                {
+                    "c": self._random.sample(CONDITIONS, self._random.randint(0, 2)),
+                    "p": price,
+                    "s": symbol,
+                    "t": now,
+                    "v": self._random.randint(1, 500),
+                }
+            )
+        self._prices[symbol] = price
+        return trades
+
+    def _authorize(self, connection: Any, request: Any) -> Any:
+        params = parse_qs(urlsplit(request.path).query)
+        token = params.get("token", [""])[-1]
+        if token not in self.config.api_keys:
+            self.stats.unauthorized += 1
+            return connection.respond(HTTPStatus.UNAUTHORIZED, "Invalid API key\n")
+        return None
+
+    async def _handle(self, connection: Any) -> None:
+        from websockets.exceptions import ConnectionClosed
+
+        self.stats.connections += 1
+        symbols = self._subscriptions[connection] = set()
+        publisher = asyncio.create_task(self._publish(connection, symbols))
+        try:
+            async for message in connection:
+                try:
+                    payload = json.loads(message)
+                    type_, symbol = payload["type"], payload["symbol"]
+                except (ValueError, KeyError, TypeError):
+                    await connection.send(
+                        json.dumps({"type": "error", "msg": "Invalid message"})
+                    )
+                    continue
+                if type_ == "subscribe":
+                    self.stats.subscribes += 1
+                    symbols.add(symbol)
+                elif type_ == "unsubscribe":
+                    self.stats.unsubscribes += 1
+                    symbols.discard(symbol)
+        except ConnectionClosed:
+            pass
+        finally:
+            publisher.cancel()
+            del self._subscriptions[connection]
+
+    async def _publish(self, connection: Any, symbols: set[str]) -> None:
+        from websockets.exceptions import ConnectionClosed
+
+        last_ping = time.monotonic()
+        try:
+            while True:
+                await asyncio.sleep(self.config.interval)
+                ping_interval = self.config.ping_interval
+                if ping_interval and time.monotonic() - last_ping >= ping_interval:
+                    last_ping = time.monotonic()
+                    await connection.send('{"type":"ping"}')
+                if not symbols:
+                    continue
+                data = [
+                    trade
+                    for symbol in sorted(symbols)
+                    for trade in self.make_trades(symbol)
+                ]
+                await connection.send(
+                    json.dumps({"data": data, "type": "trade"}, separators=(",", ":"))
+                )
+                self.stats.messages += 1
+                self.stats.trades += len(data)
+        except ConnectionClosed:
+            pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--api-key", action="append", dest="api_keys")
+    parser.add_argument("--interval", type=float, default=0.1)
+    parser.add_argument("--trades-per-message", type=int, default=5)
+    parser.add_argument("--ping-interval", type=float)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = StandInTradeFeedConfig(
+        interval=args.interval,
+        trades_per_message=args.trades_per_message,
+        ping_interval=args.ping_interval,
+        seed=args.seed,
+    )
+    if args.api_keys:
+        config.api_keys = set(args.api_keys)
+    feed = StandInTradeFeed(config, args.host, args.port)
+    print(f"FINN_HUB_WS_HOST={feed.url}")
+    try:
+        asyncio.run(feed.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import bisect
+import heapq
+import logging
+import os
+from collections.abc import Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+from src.finnhub.finnhub_api_client import FinnHubApiClient
+from src.utils.base_model import get_type_adapter
+from src.utils.json_codec import get_json_codec
+from src.validate_models.get_symbol_lookup import Description, GetSymbolLookupResponse
+
+log = logging.getLogger(__name__)
+
+# It sorts after any key with the same prefix
+MAX_CHAR = "\U0010ffff"
+
+
+class _SortedKeys:
+    """
+    The sorted `(key, entry id)` pairs, the entries of a key prefix are a range
+    found by binary search.
+    """
+
+    def __init__(self, pairs: Iterable[tuple[str, int]]) -> None:
+        self.pairs = sorted(set(pairs))
+
+    def get_range(self, prefix: str) -> tuple[int, int]:
+        lo = bisect.bisect_left(self.pairs, (prefix,))
+        hi = bisect.bisect_left(self.pairs, (prefix + MAX_CHAR,), lo)
+        return lo, hi
+
+    def search(self, prefix: str) -> set[int]:
+        lo, hi = self.get_range(prefix)
+        return {entry_id for _, entry_id in self.pairs[lo:hi]}
+
+
+class _Entry(NamedTuple):
+    description: Description
+    # The upper case keys
+    symbol: str
+    display_symbol: str
+    name: str
+    words: tuple[str, ...]
+
+
+class _ExchangeIndex:
+    def __init__(self, descriptions: Iterable[Description]) -> None:
+        self.entries: list[_Entry] = []
+        for description in descriptions:
+            words = tuple(description.description.upper().split())
+            self.entries.append(
+                _Entry(
+                    description,
+                    description.symbol.upper(),
+                    description.display_symbol.upper(),
+                    " ".join(words),
+                    words,
+                )
+            )
+        # The primary listings and the shorter symbols first, so the entry id
+        # breaks the ties of the ranks
+        self.entries.sort(
+            key=lambda entry: (
+                "." in entry.display_symbol,
+                len(entry.display_symbol),
+                entry.display_symbol,
+            )
+        )
+        self.symbols = _SortedKeys(
+            (key, i)
+            for i, entry in enumerate(self.entries)
+            for key in (entry.symbol, entry.display_symbol)
+        )
+        self.words = _SortedKeys(
+            (word, i) for i, entry in enumerate(self.entries) for word in entry.words
+        )
+
+    def search_words(self, words: list[str]) -> set[int]:
+        """
+        The entries which have a word of each prefix, the candidates are taken
+        from the rarest prefix and checked against the others.
+        """
+        ranges = [(self.words.get_range(word), word) for word in dict.fromkeys(words)]
+        ranges.sort(key=lambda item: item[0][1] - item[0][0])
+        (lo, hi), _ = ranges[0]
+        others = [word for _, word in ranges[1:]]
+        if not others:
+            return {entry_id for _, entry_id in self.words.pairs[lo:hi]}
+        return {
+            entry_id
+            for _, entry_id in self.words.pairs[lo:hi]
+            if all(
+                any(word.startswith(other) for word in self.entries[entry_id].words)
+                for other in others
+            )
+        }
+
+
+class SymbolIndex:
+    """
+    A local index of the symbols of each exchange, which answers the symbol lookup
+    like `FinnHubApiClient.get_symbol_lookup_model` without requests.
+
+    The query matches the prefixes of `symbol` and `displaySymbol`, or the word
+    prefixes of `description`, case-insensitively. The results are ranked like the
+    API: the exact symbol, the exact description, the symbol prefixes, the
+    description prefixes, then the other description matches, and the primary
+    listings (without `.` in `displaySymbol`) and the shorter symbols go first in
+    each rank.
+
+    The sorted keys are rebuilt lazily by the next lookup after the entries of the
+    exchange are changed, so the refreshes can be batched.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[str, dict[str, Description]] = {}
+        self._indexes: dict[str, _ExchangeIndex] = {}
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    @property
+    def exchanges(self) -> list[str]:
+        return list(self._entries)
+
+    def update(self, descriptions: Iterable[Description], exchange: str = "US") -> int:
+        """
+        Add or replace the symbols, and return the number of the changed ones.
+        """
+        entries = self._entries.setdefault(exchange, {})
+        changed = 0
+        for description in descriptions:
+            if entries.get(description.symbol) != description:
+                entries[description.symbol] = description
+                changed += 1
+        if changed:
+            self._indexes.pop(exchange, None)
+        return changed
+
+    def remove(self, symbols: Iterable[str], exchange: str = "US") -> int:
+        entries = self._entries.get(exchange, {})
+        removed = sum(entries.pop(symbol, None) is not None for symbol in symbols)
+        if removed:
+            self._indexes.pop(exchange, None)
+        return removed
+
+    def get_index(self, exchange: str) -> _ExchangeIndex:
+        index = self._indexes.get(exchange)
+        if index is None:
+            entries = self._entries.get(exchange, {}).values()
+            index = self._indexes[exchange] = _ExchangeIndex(entries)
+        return index
+
+    def lookup(
+        self, q: str, exchange: str = "US", limit: int | None = None
+    ) -> GetSymbolLookupResponse:
+        """
+        Search the symbols, the local version of the symbol lookup API.
+
+        Args:
+            q (str): The symbol, name, ISIN or CUSIP prefix.
+            exchange (str): The exchange code.
+            limit (int | None): The maximum results, None means all of them.
+        """
+        query = " ".join(q.upper().split())
+        if not query:
+            return GetSymbolLookupResponse(count=0, result=[])
+        index = self.get_index(exchange)
+        matched = index.symbols.search(query) | index.search_words(query.split())
+
+        def get_rank(entry_id: int) -> tuple[int, int]:
+            entry = index.entries[entry_id]
+            if query in (entry.symbol, entry.display_symbol):
+                rank = 0
+            elif entry.name == query:
+                rank = 1
+            elif entry.symbol.startswith(query) or entry.display_symbol.startswith(
+                query
+            ):
+                rank = 2
+            elif entry.name.startswith(query):
+                rank = 3
+            else:
+                rank = 4
+            return rank, entry_id
+
+        if limit is None:
+            entry_ids = sorted(matched, key=get_rank)
+        else:
+            entry_ids = heapq.nsmallest(limit, matched, key=get_rank)
+        result = [index.entries[entry_id].description for entry_id in entry_ids]
+        return GetSymbolLookupResponse(count=len(result), result=result)
+
+    def refresh(
+        self,
+        client: FinnHubApiClient,
+        queries: Iterable[str],
+        exchange: str = "US",
+        max_workers: int = 4,
+    ) -> int:
+        """
+        Look up the queries by the API concurrently and merge the results, return
+        the number of the changed symbols. The failed queries are logged and
+        skipped.
+        """
+        changed = 0
+        for q, result in client.imap_unordered(
+            lambda q: client.get_symbol_lookup_model(q, exchange), queries, max_workers
+        ):
+            if isinstance(result, Exception):
+                log.warning(f"Failed to look up {q!r}: {result!r}")
+                continue
+            changed += self.update(result.result, exchange)
+        return changed
+
+    def load(self, path: Path, exchange: str = "US") -> int:
+        """
+        Load the symbols of a JSON list, e.g. a snapshot saved by `save` or the
+        response of the stock symbol API of Finnhub, return the number of the
+        changed symbols.
+        """
+        descriptions = get_type_adapter(list[Description]).validate_python(
+            get_json_codec().loads(path.read_bytes())
+        )
+        return self.update(descriptions, exchange)
+
+    def save(self, path: Path, exchange: str = "US") -> None:
+        entries = [
+            entry.model_dump(by_alias=True)
+            for entry in self._entries.get(exchange, {}).values()
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_bytes(get_json_codec().dumps(entries))
+        os.replace(tmp_path, path)
+        log.info(f"Saved {len(entries)} symbols of {exchange} to {path}")
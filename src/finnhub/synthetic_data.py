@@ -0,0 +1,111 @@
+import operator
+import random
+import zlib
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+EXCHANGES = ["NASDAQ NMS - GLOBAL MARKET", "NEW YORK STOCK EXCHANGE, INC."]
+INDUSTRIES = ["Technology", "Semiconductors", "Media", "Retail", "Banking"]
+NEWS_SOURCES = ["Yahoo", "MarketWatch", "SeekingAlpha", "Reuters"]
+
+
+class SyntheticData:
+    """
+    Realistic and deterministic Finnhub payloads for benchmarks and the local
+    stand-in server. The same arguments always build the same payload.
+    """
+
+    @staticmethod
+    def get_random(*seeds: Any) -> random.Random:
+        return random.Random(zlib.crc32(repr(seeds).encode()))
+
+    @staticmethod
+    def quote(symbol: str, ts: int = 1744300800) -> dict[str, Any]:
+        rnd = SyntheticData.get_random("quote", symbol, ts)
+        previous_close = round(rnd.uniform(5, 900), 2)
+        open_ = round(previous_close * rnd.uniform(0.97, 1.03), 2)
+        current = round(open_ * rnd.uniform(0.95, 1.05), 2)
+        high = round(max(open_, current) * rnd.uniform(1, 1.02), 2)
+        low = round(min(open_, current) * rnd.uniform(0.98, 1), 2)
+        return {
+            "c": current,
+            "d": round(current - previous_close, 2),
+            "dp": round((current - previous_close) / previous_close * 100, 4),
+            "h": high,
+            "l": low,
+            "o": open_,
+            "pc": previous_close,
+            "t": ts,
+        }
+
+    @staticmethod
+    def company_profile(symbol: str) -> dict[str, Any]:
+        rnd = SyntheticData.get_random("company_profile", symbol)
+        name = f"{symbol.title()} Holdings Inc"
+        return {
+            "country": "US",
+            "currency": "USD",
+            "estimateCurrency": "USD",
+            "exchange": rnd.choice(EXCHANGES),
+            "finnhubIndustry": rnd.choice(INDUSTRIES),
+            "ipo": f"{rnd.randint(1980, 2020)}-{rnd.randint(1, 12):02d}-01",
+            "logo": f"https://static2.finnhub.io/file/logo/{symbol}.png",
+            "marketCapitalization": round(rnd.uniform(1e2, 3e6), 4),
+            "name": name,
+            "phone": f"1{rnd.randint(2000000000, 9999999999)}",
+            "shareOutstanding": round(rnd.uniform(1, 20000), 4),
+            "ticker": symbol,
+            "weburl": f"https://www.{symbol.lower()}.com/",
+        }
+
+    @staticmethod
+    def symbol_lookup(q: str, count: int = 20) -> dict[str, Any]:
+        rnd = SyntheticData.get_random("symbol_lookup", q)
+        base = q.upper()
+        result = []
+        for i in range(count):
+            symbol = base if i == 0 else f"{base}.{chr(65 + i % 26)}{i}"
+            result.append(
+                {
+                    "description": f"{base} INC" if i == 0 else f"{base} SERIES {i}",
+                    "displaySymbol": symbol,
+                    "symbol": symbol,
+                    "type": rnd.choice(["Common Stock", "ADR", "ETP"]),
+                }
+            )
+        return {"count": len(result), "result": result}
+
+    @staticmethod
+    def company_news(
+        symbol: str, from_: str, to_: str, per_day: int = 5
+    ) -> list[dict[str, Any]]:
+        """
+        `per_day` news of each day in [from_, to_], in descending datetime order
+        like Finnhub.
+        """
+        date_format = "%Y-%m-%d"
+        start = datetime.strptime(from_, date_format).replace(tzinfo=UTC)
+        end = datetime.strptime(to_, date_format).replace(tzinfo=UTC)
+        news = []
+        day = start
+        while day <= end:
+            rnd = SyntheticData.get_random("company_news", symbol, day.date())
+            for i in range(per_day):
+                ts = int(day.timestamp()) + rnd.randint(0, 86399)
+                news_id = zlib.crc32(f"{symbol}-{ts}-{i}".encode())
+                news.append(
+                    {
+                        "category": "company",
+                        "datetime": ts,
+                        "headline": f"{symbol} headline {news_id} " + "x" * 40,
+                        "id": news_id,
+                        "image": f"https://images.example.com/{news_id}.jpg",
+                        "related": symbol,
+                        "source": rnd.choice(NEWS_SOURCES),
+                        "summary": f"{symbol} summary {news_id} " + "y" * 300,
+                        "url": f"https://finnhub.io/api/news?id={news_id}",
+                    }
+                )
+            day += timedelta(days=1)
+        news.sort(key=operator.itemgetter("datetime"), reverse=True)
+        return news
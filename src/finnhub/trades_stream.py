@@ -0,0 +1,272 @@
+import asyncio
+import inspect
+import logging
+import random
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from types import TracebackType
+from typing import Any, NamedTuple, Self
+from urllib.parse import urlencode
+
+from src.config import settings
+from src.utils.base_model import BaseModel
+from src.utils.json_codec import JsonCodec, get_json_codec
+
+log = logging.getLogger(__name__)
+
+type TradesCallback = Callable[[list[Trade]], Awaitable[Any] | Any]
+
+
+class Trade(NamedTuple):
+    """
+    A trade of the Finnhub feed. It's a tuple instead of a model because the feed
+    pushes thousands of them per second, and they don't need validation per field.
+    """
+
+    symbol: str
+    price: float
+    volume: float
+    # Unix milliseconds
+    timestamp: int
+    conditions: tuple[str, ...] = ()
+
+
+class TradesStreamStats(BaseModel):
+    connections: int = 0
+    reconnects: int = 0
+    messages: int = 0
+    trades: int = 0
+    # The batches dropped because the iterator didn't keep up
+    dropped_batches: int = 0
+    decode_errors: int = 0
+    server_errors: int = 0
+
+
+def decode_trades(payload: Any) -> list[Trade]:
+    """
+    Decode the trades of a `{"type": "trade", "data": [...]}` message at once.
+    """
+    return [
+        Trade(item["s"], item["p"], item["v"], item["t"], tuple(item.get("c") or ()))
+        for item in payload["data"]
+    ]
+
+
+class FinnHubTradesStream:
+    """
+    The trades of the Finnhub WebSocket feed, it needs the optional `websockets`
+    package, install it by `pip install websockets`.
+
+    The stream reconnects with a jittered backoff when the connection is lost,
+    and subscribes the symbols again. The trades of each message are delivered as
+    a batch, by the callbacks or the async iterator:
+
+        async with FinnHubTradesStream(["AAPL", "MSFT"]) as stream:
+            stream.add_callback(print)
+            async for trades in stream:
+                ...
+
+    The iterator coalesces the batches queued since the last iteration, and
+    drops the oldest batch when `max_queue` batches are waiting.
+    """
+
+    def __init__(
+        self,
+        symbols: Iterable[str] = (),
+        url: str | None = None,
+        token: str | None = None,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 30,
+        max_queue: int = 1000,
+        json_codec: JsonCodec | None = None,
+        **connect_kwargs: Any,
+    ) -> None:
+        """
+        Args:
+            symbols (Iterable[str]): The symbols to subscribe on connect.
+            url (str | None): The feed, defaults to `settings.FINN_HUB_WS_HOST`.
+            token (str | None): The API key, defaults to `settings.FINN_HUB_API_KEY`.
+            reconnect_delay (float): The first delay in seconds before reconnecting,
+                it's doubled after each failure up to `max_reconnect_delay`.
+            max_reconnect_delay (float): The maximum delay in seconds.
+            max_queue (int): The maximum batches waiting for the iterator.
+            json_codec (JsonCodec | None): Decode the messages, defaults to the
+                codec of `settings.JSON_CODEC`.
+            connect_kwargs: Passed to `websockets.asyncio.client.connect`, e.g.
+                `open_timeout` or `ping_interval`.
+        """
+        from websockets.asyncio.client import connect
+
+        self._connect = connect
+        token = settings.FINN_HUB_API_KEY if token is None else token
+        url = url or settings.FINN_HUB_WS_HOST
+        self.url = f"{url}?{urlencode({'token': token})}"
+        self.symbols: set[str] = set(symbols)
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.json_codec = json_codec or get_json_codec()
+        self.connect_kwargs = connect_kwargs
+        self.stats = TradesStreamStats()
+        self._callbacks: list[TradesCallback] = []
+        self._queue: asyncio.Queue[list[Trade]] = asyncio.Queue(max_queue)
+        self._connection: Any = None
+        self._connected = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._closed = False
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    async def wait_connected(self, timeout: float | None = None) -> None:
+        await asyncio.wait_for(self._connected.wait(), timeout)
+
+    def add_callback(self, callback: TradesCallback) -> None:
+        """
+        Call `callback` with the trades of each message, it can be a coroutine
+        function. The exceptions of the callbacks are logged and ignored.
+        """
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback: TradesCallback) -> None:
+        self._callbacks.remove(callback)
+
+    async def subscribe(self, *symbols: str) -> None:
+        new_symbols = [symbol for symbol in symbols if symbol not in self.symbols]
+        self.symbols.update(new_symbols)
+        await self._send_all("subscribe", new_symbols)
+
+    async def unsubscribe(self, *symbols: str) -> None:
+        old_symbols = [symbol for symbol in symbols if symbol in self.symbols]
+        self.symbols.difference_update(old_symbols)
+        await self._send_all("unsubscribe", old_symbols)
+
+    async def _send_all(self, type_: str, symbols: Iterable[str]) -> None:
+        connection = self._connection
+        if connection is None:
+            # They're sent when it's connected
+            return
+        from websockets.exceptions import ConnectionClosed
+
+        try:
+            for symbol in symbols:
+                message = self.json_codec.dumps({"type": type_, "symbol": symbol})
+                await connection.send(message.decode())
+        except ConnectionClosed:
+            # The reconnection subscribes `self.symbols` again
+            log.warning(f"The connection is closed while sending {type_}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._closed = False
+            self._task = asyncio.create_task(self.run(), name=self.__class__.__name__)
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._connection is not None:
+            await self._connection.close()
+        if self._task is not None:
+            self._task.cancel()
+            # The error which stopped it is raised by the iterator already
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def __aenter__(self) -> Self:
+        self.start()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.close()
+
+    async def run(self) -> None:
+        """
+        Receive the trades until `close`, `start` runs it in a task.
+        """
+        from websockets.exceptions import ConnectionClosed, InvalidStatus
+
+        delay = self.reconnect_delay
+        while not self._closed:
+            try:
+                async with self._connect(self.url, **self.connect_kwargs) as connection:
+                    self._connection = connection
+                    self.stats.connections += 1
+                    delay = self.reconnect_delay
+                    await self._send_all("subscribe", sorted(self.symbols))
+                    self._connected.set()
+                    async for message in connection:
+                        await self._on_message(message)
+            except InvalidStatus as e:
+                if e.response.status_code == 401:
+                    raise PermissionError("Invalid Finnhub API key") from e
+                log.warning(f"The feed rejected the connection: {e}")
+            except (OSError, TimeoutError, ConnectionClosed) as e:
+                log.warning(f"The trades feed is disconnected: {e!r}")
+            finally:
+                self._connection = None
+                self._connected.clear()
+            if self._closed:
+                break
+            self.stats.reconnects += 1
+            # The jitter keeps the clients from reconnecting at the same time
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _on_message(self, message: str | bytes) -> None:
+        self.stats.messages += 1
+        try:
+            payload = self.json_codec.loads(message)
+            type_ = payload.get("type")
+            if type_ != "trade":
+                if type_ == "error":
+                    self.stats.server_errors += 1
+                    log.error(f"The trades feed sent an error: {payload.get('msg')}")
+                # Ignore the pings
+                return
+            trades = decode_trades(payload)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.stats.decode_errors += 1
+            log.warning(f"Failed to decode the message {message!r}: {e!r}")
+            return
+        if not trades:
+            return
+        self.stats.trades += len(trades)
+        for callback in self._callbacks:
+            try:
+                result = callback(trades)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                log.exception(f"The trades callback {callback!r} failed")
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.stats.dropped_batches += 1
+        self._queue.put_nowait(trades)
+
+    async def __aiter__(self) -> AsyncIterator[list[Trade]]:
+        """
+        Yield the trades until it's closed, and raise the error which stops it,
+        e.g. `PermissionError` of an invalid API key.
+        """
+        self.start()
+        while True:
+            task = self._task
+            if task is None:
+                return
+            get = asyncio.ensure_future(self._queue.get())
+            await asyncio.wait({get, task}, return_when=asyncio.FIRST_COMPLETED)
+            if not get.done():
+                get.cancel()
+                if not task.cancelled():
+                    task.result()
+                return
+            trades = get.result()
+            if not self._queue.empty():
+                # Copy it, the callbacks got the same list
+                trades = trades.copy()
+                while not self._queue.empty():
+                    trades.extend(self._queue.get_nowait())
+            yield trades
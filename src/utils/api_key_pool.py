@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import Iterable
+from http import HTTPStatus
+
+from httpx import Response
+
+from src.utils.base_model import BaseModel
+from src.utils.rate_limiter import RateLimit, RateLimiter, TokenBucket
+
+log = logging.getLogger(__name__)
+
+
+class NoUsableApiKeyError(Exception):
+    """
+    Raised without sending the request, when all API keys are quarantined after
+    401 or the first key is released after the max wait.
+    """
+
+    def __init__(self, message: str, retry_in: float) -> None:
+        super().__init__(message)
+        self.retry_in = retry_in
+
+
+class ApiKeyUsage(BaseModel):
+    # The masked key, the full key isn't exposed
+    key: str
+    requests: int = 0
+    unauthorized: int = 0
+    too_many_requests: int = 0
+    quarantines: int = 0
+    # The seconds until the key is available again, 0 if it's available
+    quarantined_for: float = 0
+    # The estimated calls left in the current windows, None if it's unknown
+    remaining: float | None = None
+
+
+def mask_key(key: str) -> str:
+    if len(key) <= 8:
+        return "*" * len(key)
+    return f"{key[:4]}...{key[-2:]}"
+
+
+class _KeyState:
+    def __init__(self, key: str, rate_limits: list[RateLimit], now: float) -> None:
+        self.key = key
+        self.buckets = [TokenBucket(limit, now) for limit in rate_limits]
+        self.usage = ApiKeyUsage(key=mask_key(key))
+        self.quarantined_until = 0.0
+        # The status of the latest quarantine, 401 or 429
+        self.quarantine_status: HTTPStatus | None = None
+        # The remaining calls reported by the `X-Ratelimit-*` headers
+        self.server_remaining: float | None = None
+        self.server_reset_at = 0.0
+
+    def get_remaining(self, now: float) -> float:
+        remaining = min(
+            (bucket.peek(now) for bucket in self.buckets), default=float("inf")
+        )
+        if self.server_remaining is not None and now < self.server_reset_at:
+            remaining = min(remaining, self.server_remaining)
+        return remaining
+
+
+class ApiKeyPool:
+    """
+    Spread the requests over several API keys, each key has its own quotas.
+
+    A request takes the available key with the most remaining budget, which is
+    estimated by the token buckets of `rate_limits` per key and corrected by the
+    `X-Ratelimit-Remaining` and `X-Ratelimit-Reset` headers of the responses. A
+    key is quarantined after 401 for `unauthorized_seconds`, and after 429 for its
+    `Retry-After` or `quarantine_seconds`. When all keys are quarantined, the
+    request waits for the first one released after 429, and raises
+    `NoUsableApiKeyError` if all keys are unauthorized or the wait is longer than
+    `max_wait`, instead of blocking the callers for the quarantine.
+
+    It's thread-safe and shared by the sync and async api clients like
+    `RateLimiter`.
+    """
+
+    def __init__(
+        self,
+        keys: Iterable[str],
+        rate_limits: list[RateLimit] | None = None,
+        quarantine_seconds: float = 60,
+        unauthorized_seconds: float = 60 * 60,
+        max_wait: float = 60,
+    ) -> None:
+        """
+        Args:
+            keys (Iterable[str]): The API keys, the duplicated ones are ignored.
+            rate_limits (list[RateLimit] | None): The quotas of each key, None
+                means they're only known from the responses.
+            quarantine_seconds (float): The quarantine after 429 without
+                `Retry-After`.
+            unauthorized_seconds (float): The quarantine after 401.
+            max_wait (float): The longest wait for a key when all keys are
+                quarantined.
+        """
+        now = time.monotonic()
+        self._states = {
+            key: _KeyState(key, rate_limits or [], now) for key in dict.fromkeys(keys)
+        }
+        if not self._states:
+            raise ValueError("At least one API key is required.")
+        self.quarantine_seconds = quarantine_seconds
+        self.unauthorized_seconds = unauthorized_seconds
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def reserve(self) -> tuple[str, float]:
+        """
+        Choose the key of a request, and return it with the seconds to wait before
+        sending the request. Raise `NoUsableApiKeyError` if no key can be used
+        within `max_wait`.
+        """
+        with self._lock:
+            now = time.monotonic()
+            states = self._states.values()
+            available = [state for state in states if state.quarantined_until <= now]
+            if available:
+                state = max(
+                    available,
+                    key=lambda s: (s.get_remaining(now), -s.usage.requests),
+                )
+                delay = 0.0
+            else:
+                state = self._get_first_released(now)
+                delay = state.quarantined_until - now
+            for bucket in state.buckets:
+                bucket.reserve(1, now)
+            if state.server_remaining is not None:
+                state.server_remaining -= 1
+            state.usage.requests += 1
+        return state.key, delay
+
+    def _get_first_released(self, now: float) -> _KeyState:
+        """
+        The key released first after 429, when all keys are quarantined. The
+        caller holds the lock.
+        """
+        limited = [
+            state
+            for state in self._states.values()
+            if state.quarantine_status != HTTPStatus.UNAUTHORIZED
+        ]
+        if not limited:
+            retry_in = min(s.quarantined_until for s in self._states.values()) - now
+            raise NoUsableApiKeyError(
+                f"All {len(self._states)} API keys are unauthorized, check the keys",
+                retry_in,
+            )
+        state = min(limited, key=lambda s: s.quarantined_until)
+        retry_in = state.quarantined_until - now
+        if retry_in > self.max_wait:
+            raise NoUsableApiKeyError(
+                f"All {len(self._states)} API keys are quarantined, the first one "
+                f"is released in {retry_in:.1f}s",
+                retry_in,
+            )
+        return state
+
+    def acquire(self) -> str:
+        key, delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return key
+
+    async def acquire_async(self) -> str:
+        key, delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return key
+
+    def on_response(self, key: str, response: Response) -> None:
+        """
+        Update the budget of the key by the rate limit headers, and quarantine it
+        if the response is 401 or 429.
+        """
+        state = self._states.get(key)
+        if state is None:
+            return
+        headers = response.headers
+        with self._lock:
+            now = time.monotonic()
+            try:
+                remaining = float(headers["X-Ratelimit-Remaining"])
+                reset_in = float(headers["X-Ratelimit-Reset"]) - time.time()
+            except (KeyError, ValueError):
+                pass
+            else:
+                state.server_remaining = remaining
+                state.server_reset_at = now + max(reset_in, 0)
+
+            match response.status_code:
+                case HTTPStatus.UNAUTHORIZED:
+                    state.usage.unauthorized += 1
+                    quarantine = self.unauthorized_seconds
+                    state.quarantine_status = HTTPStatus.UNAUTHORIZED
+                case HTTPStatus.TOO_MANY_REQUESTS:
+                    state.usage.too_many_requests += 1
+                    retry_after = RateLimiter.parse_retry_after(
+                        headers.get("Retry-After")
+                    )
+                    quarantine = (
+                        self.quarantine_seconds if retry_after is None else retry_after
+                    )
+                    state.quarantine_status = HTTPStatus.TOO_MANY_REQUESTS
+                case _:
+                    return
+            state.quarantined_until = max(state.quarantined_until, now + quarantine)
+            state.usage.quarantines += 1
+        log.warning(
+            f"Quarantine the API key {state.usage.key} for {quarantine} seconds "
+            f"after {response.status_code}"
+        )
+
+    def get_usage(self) -> list[ApiKeyUsage]:
+        """
+        The usage of each key, in the order of the keys.
+        """
+        with self._lock:
+            now = time.monotonic()
+            usages = []
+            for state in self._states.values():
+                remaining: float | None = state.get_remaining(now)
+                if remaining == float("inf"):
+                    remaining = None
+                quarantined_for = max(state.quarantined_until - now, 0)
+                usages.append(
+                    state.usage.model_copy(
+                        update={
+                            "quarantined_for": quarantined_for,
+                            "remaining": remaining,
+                        }
+                    )
+                )
+        return usages
@@ -1,9 +1,40 @@
+import asyncio
+import importlib.util
 import logging
+import time
+from collections.abc import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Hashable,
+    Iterable,
+    Iterator,
+)
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import (
+    AbstractContextManager,
+    asynccontextmanager,
+    contextmanager,
+    nullcontext,
+)
 from http import HTTPMethod
-from typing import Any, override
+from itertools import islice
+from typing import Any, Literal, cast, overload, override
 
-from httpx import Client, Request, Response
+from httpx import (
+    URL,
+    AsyncBaseTransport,
+    AsyncClient,
+    BaseTransport,
+    Client,
+    Headers,
+    Limits,
+    Request,
+    Response,
+    TransportError,
+)
 from httpx._client import USE_CLIENT_DEFAULT, UseClientDefault
+from httpx._config import DEFAULT_LIMITS
 from httpx._types import (
     AuthTypes,
     CookieTypes,
@@ -16,36 +47,535 @@ from httpx._types import (
     TimeoutTypes,
 )
 
+from src.constants import CacheStatus, MetricPhase
+from src.utils.api_key_pool import ApiKeyPool
+from src.utils.base_model import get_type_adapter
+from src.utils.json_codec import JsonCodec, get_json_codec
+from src.utils.metrics import ApiMetrics
+from src.utils.rate_limiter import RateLimiter
+from src.utils.resilience import Resilience
+from src.utils.response_cache import CachedResponse, ResponseCache
+from src.utils.single_flight import SingleFlight
+from src.utils.type_alias import BulkResult
 from src.utils.url_router import UrlRouter
+from src.utils.validation_policy import ValidationPolicy
+
+
+def check_route_names(url_router: UrlRouter, names: Iterable[str], usage: str) -> None:
+    unknown_routes = set(names) - set(url_router.ROUTER)
+    if unknown_routes:
+        raise ValueError(
+            f"The routes of {usage} {unknown_routes} don't exist in ROUTER: "
+            f"{url_router.ROUTER}"
+        )
+
+
+def check_http2(http2: bool) -> bool:
+    """
+    HTTP/2 needs the optional `h2` package, fall back to HTTP/1.1 without it.
+    """
+    if http2 and importlib.util.find_spec("h2") is None:
+        logging.getLogger().warning(
+            "HTTP/2 is disabled because the `h2` package isn't installed, "
+            "install it by `pip install httpx[http2]`"
+        )
+        return False
+    return http2
+
+
+def encode_json_body(codec: JsonCodec, kwargs: dict[str, Any]) -> dict[str, Any]:
+    """
+    Encode the `json` request argument into the request content by the codec.
+    """
+    body = kwargs.get("json")
+    if body is None:
+        return kwargs
+    headers = Headers(kwargs.get("headers"))
+    headers.setdefault("Content-Type", "application/json")
+    return {**kwargs, "json": None, "content": codec.dumps(body), "headers": headers}
 
 
-class BaseApiClient:
+class _ApiClientCore:
+    """
+    The IO-free logic shared by `BaseApiClient` and `AsyncBaseApiClient`:
+    building the requests, the cache, the key pool, the metrics and the
+    validation policy bookkeeping. The clients only own the IO and its await
+    points.
+    """
+
     log = logging.getLogger()
 
-    def __init__(self, url_router: UrlRouter) -> None:
+    # The request header whose value is used as the rate limit key, e.g. API token
+    RATE_LIMIT_KEY_HEADER: str | None = None
+
+    client: Client | AsyncClient
+
+    def _init_core(
+        self,
+        url_router: UrlRouter,
+        rate_limiter: RateLimiter | None,
+        response_cache: ResponseCache | None,
+        single_flight: SingleFlight | None,
+        resilience: Resilience | None,
+        json_codec: JsonCodec | None,
+        metrics: ApiMetrics | None,
+        api_key_pool: ApiKeyPool | None,
+        validation_policy: ValidationPolicy | None,
+    ) -> None:
         self.url_router = url_router
-        self.client = Client(
-            event_hooks={
-                "request": [self._log_request],
-                # "response": [self._raise_error],
-            }
-        )
+        self.rate_limiter = rate_limiter
+        self.response_cache = response_cache
+        self.single_flight = single_flight
+        self.resilience = resilience
+        self.json_codec = json_codec or get_json_codec()
+        self.metrics = metrics
+        if api_key_pool and self.RATE_LIMIT_KEY_HEADER is None:
+            raise ValueError("The API key pool needs RATE_LIMIT_KEY_HEADER.")
+        self.api_key_pool = api_key_pool
+        self.validation_policy = validation_policy
+        if rate_limiter:
+            check_route_names(url_router, rate_limiter.route_costs, "route_costs")
+        if response_cache:
+            check_route_names(url_router, response_cache.ttls, "ttls")
+        if resilience:
+            check_route_names(url_router, resilience.route_timeouts, "route_timeouts")
+        if validation_policy:
+            check_route_names(url_router, validation_policy.models, "models")
 
-    def _log_request(self, request: Request) -> None:
-        self.log.debug(
+    def _format_request(self, request: Request) -> str | None:
+        # Don't format the request unless it's logged
+        if not self.log.isEnabledFor(logging.DEBUG):
+            return None
+        return (
             f"Send Url: {request.url} with method: {request.method}, "
             f"headers: {request.headers}, data: {request.content}"
         )
 
-    def _raise_error(self, response: Response) -> None:
-        response.raise_for_status()
+    def _measure(
+        self, api_name: str | None, phase: MetricPhase
+    ) -> AbstractContextManager[None]:
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.timer(api_name, phase)
 
     def get_api_url(self, api_name: str) -> str:
         return self.url_router.get_api_url(api_name)
 
+    def get_rate_limit_key(self, headers: HeaderTypes | None) -> str | None:
+        if self.RATE_LIMIT_KEY_HEADER is None or headers is None:
+            return None
+        return Headers(headers).get(self.RATE_LIMIT_KEY_HEADER)
+
+    def set_api_key(self, headers: HeaderTypes | None, api_key: str) -> Headers:
+        headers = Headers(headers)
+        headers[cast(str, self.RATE_LIMIT_KEY_HEADER)] = api_key
+        return headers
+
     def get_formatter_api_url(self, api_name: str, **kwargs: Any) -> str:
         return self.url_router.get_formatter_api_url(api_name, **kwargs)
 
+    def _get_single_flight_key(self, kwargs: dict[str, Any]) -> Hashable | None:
+        """
+        The key of the identical requests in flight, None if it isn't coalesced.
+        """
+        if self.single_flight is None or kwargs["method"] != HTTPMethod.GET:
+            return None
+        return self.single_flight.make_key(
+            kwargs["method"], kwargs["url"], kwargs["params"], kwargs["headers"]
+        )
+
+    def _observe(self, api_name: str | None, res: Response) -> Response:
+        if self.validation_policy:
+            self.validation_policy.on_response(api_name, res)
+        return res
+
+    def _get_retry_delay(
+        self,
+        resilience: Resilience,
+        host: str,
+        kwargs: dict[str, Any],
+        attempt: int,
+        res: Response | None = None,
+        error: TransportError | None = None,
+    ) -> float | None:
+        """
+        Record the outcome of an attempt to the circuit breaker, and return the
+        seconds before the next attempt or None if it isn't retried.
+        """
+        resilience.record(host, res)
+        delay = resilience.get_retry_delay(
+            kwargs["method"], attempt, response=res, error=error
+        )
+        if delay is not None:
+            self.log.debug(
+                f"Retry {kwargs['url']} in {delay:.2f}s, attempt {attempt + 1}"
+            )
+        return delay
+
+    def _set_api_key(self, kwargs: dict[str, Any], api_key: str | None) -> None:
+        if api_key is not None:
+            kwargs["headers"] = self.set_api_key(kwargs.get("headers"), api_key)
+
+    def _on_limited_response(
+        self,
+        res: Response,
+        elapsed: float,
+        key: str | None,
+        api_key: str | None,
+    ) -> None:
+        """
+        Report a response to the rate limiter and the API key pool.
+        """
+        if self.rate_limiter is not None:
+            self.rate_limiter.on_response(res, elapsed, key)
+        if self.api_key_pool is not None and api_key is not None:
+            self.api_key_pool.on_response(api_key, res)
+
+    def _get_api_kwargs(
+        self,
+        api_name: str,
+        method: HTTPMethod,
+        params: QueryParamTypes | None,
+        headers: HeaderTypes | None,
+        json: Any | None,
+        timeout: TimeoutTypes | UseClientDefault,
+    ) -> dict[str, Any]:
+        return {
+            "method": method,
+            "url": self.get_api_url(api_name),
+            "params": params,
+            "headers": headers,
+            "json": json,
+            "timeout": timeout,
+        }
+
+    def _lookup_cache(
+        self, api_name: str, kwargs: dict[str, Any]
+    ) -> tuple[str, CachedResponse | None, CacheStatus] | None:
+        """
+        Look up the cached response of the request, None if it isn't cacheable.
+        """
+        cache = self.response_cache
+        if (
+            cache is None
+            or kwargs["method"] != HTTPMethod.GET
+            or not cache.is_cacheable(api_name)
+        ):
+            return None
+        cache_key = cache.make_key(api_name, kwargs["params"])
+        entry, status = cache.lookup(api_name, cache_key)
+        return cache_key, entry, status
+
+    def _get_cached_response(
+        self, entry: CachedResponse, kwargs: dict[str, Any]
+    ) -> Response:
+        return entry.to_response(
+            self.client.build_request(
+                kwargs["method"],
+                kwargs["url"],
+                params=kwargs["params"],
+                headers=kwargs["headers"],
+            )
+        )
+
+    def _get_revalidate_kwargs(
+        self, entry: CachedResponse | None, kwargs: dict[str, Any]
+    ) -> dict[str, Any]:
+        cache = cast(ResponseCache, self.response_cache)
+        headers = cache.add_conditional_headers(entry, kwargs["headers"])
+        return {**kwargs, "headers": headers}
+
+    def _update_cache(
+        self, cache_key: str, entry: CachedResponse | None, res: Response
+    ) -> Response:
+        return cast(ResponseCache, self.response_cache).update(cache_key, entry, res)
+
+    def _validate[T](self, api_name: str, model: type[T], res: Response) -> T:
+        res.raise_for_status()
+        with self._measure(api_name, MetricPhase.VALIDATE):
+            return get_type_adapter(model).validate_json(res.content)
+
+    def _decode(self, res: Response) -> Any:
+        with self._measure(None, MetricPhase.DECODE):
+            return self.json_codec.loads(res.content)
+
+    def _get_stream_kwargs(
+        self, api_name: str, timeout: TimeoutTypes | UseClientDefault
+    ) -> dict[str, Any]:
+        kwargs: dict[str, Any] = {"timeout": timeout}
+        if self.resilience:
+            kwargs = self.resilience.apply_timeout(api_name, kwargs)
+        if self.metrics:
+            kwargs = self.metrics.tag_request(api_name, kwargs)
+        return kwargs
+
+    @override
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}, url_router: {self.url_router}>"
+
+
+class BaseApiClient(_ApiClientCore):
+    client: Client
+
+    def __init__(
+        self,
+        url_router: UrlRouter,
+        transport: BaseTransport | None = None,
+        rate_limiter: RateLimiter | None = None,
+        response_cache: ResponseCache | None = None,
+        single_flight: SingleFlight | None = None,
+        resilience: Resilience | None = None,
+        limits: Limits | None = None,
+        http2: bool = False,
+        json_codec: JsonCodec | None = None,
+        metrics: ApiMetrics | None = None,
+        api_key_pool: ApiKeyPool | None = None,
+        validation_policy: ValidationPolicy | None = None,
+    ) -> None:
+        """
+        Args:
+            url_router (UrlRouter): The routes of the API.
+            transport (BaseTransport | None): The transport of `httpx.Client`,
+                `limits` and `http2` don't work if it's set.
+            rate_limiter (RateLimiter | None): The client-side rate limiter.
+            response_cache (ResponseCache | None): The per-route response cache.
+            single_flight (SingleFlight | None): Coalesce identical GET requests.
+            resilience (Resilience | None): Timeouts, retries and circuit breaker.
+            limits (Limits | None): The connection pool limits, e.g. max connections,
+                max keepalive connections and keepalive expiry.
+            http2 (bool): Enable HTTP/2 multiplexing.
+            json_codec (JsonCodec | None): The codec of the request and response
+                bodies, `settings.JSON_CODEC` by default.
+            metrics (ApiMetrics | None): Per-route latency and throughput metrics.
+            api_key_pool (ApiKeyPool | None): Send each request with a key of the
+                pool in the `RATE_LIMIT_KEY_HEADER` header.
+            validation_policy (ValidationPolicy | None): Validate a sample of the
+                responses of each route and alert on the schema drift.
+        """
+        self._init_core(
+            url_router,
+            rate_limiter,
+            response_cache,
+            single_flight,
+            resilience,
+            json_codec,
+            metrics,
+            api_key_pool,
+            validation_policy,
+        )
+        event_hooks: dict[str, list[Callable[..., Any]]] = {
+            "request": [self._log_request],
+            "response": [],
+            # "response": [self._raise_error],
+        }
+        if metrics:
+            event_hooks["request"].append(metrics.on_request)
+            event_hooks["response"].append(metrics.on_response)
+        self.client = Client(
+            transport=transport,
+            limits=limits or DEFAULT_LIMITS,
+            http2=check_http2(http2),
+            event_hooks=event_hooks,
+        )
+
+    def _log_request(self, request: Request) -> None:
+        if message := self._format_request(request):
+            self.log.debug(message)
+
+    def _raise_error(self, response: Response) -> None:
+        response.raise_for_status()
+
+    def _send(self, api_name: str | None, **kwargs: Any) -> Response:
+        """
+        Send the request, the identical GET requests in flight are coalesced
+        into one if `single_flight` is set.
+        """
+        kwargs = encode_json_body(self.json_codec, kwargs)
+
+        def send() -> Response:
+            # Only the leader observes, the coalesced callers share its response
+            return self._observe(api_name, self._send_request(api_name, **kwargs))
+
+        key = self._get_single_flight_key(kwargs)
+        if key is None:
+            return send()
+        return cast(SingleFlight, self.single_flight).do(key, send)
+
+    def _send_request(self, api_name: str | None, **kwargs: Any) -> Response:
+        """
+        Send the request with the per-route timeout, retries and circuit breaker
+        if `resilience` is set.
+        """
+        resilience = self.resilience
+        if resilience is None:
+            return self._send_once(api_name, **kwargs)
+        kwargs = resilience.apply_timeout(api_name, kwargs)
+        host = URL(kwargs["url"]).host
+        attempt = 0
+        while True:
+            resilience.before_request(host)
+            try:
+                res = self._send_once(api_name, **kwargs)
+            except TransportError as e:
+                delay = self._get_retry_delay(
+                    resilience, host, kwargs, attempt, error=e
+                )
+                if delay is None:
+                    raise
+            except BaseException:
+                # e.g. cancelled, don't keep the half-open trial of the host
+                resilience.release(host)
+                raise
+            else:
+                delay = self._get_retry_delay(resilience, host, kwargs, attempt, res)
+                if delay is None:
+                    return res
+                res.close()
+            attempt += 1
+            time.sleep(delay)
+
+    def _send_once(self, api_name: str | None, **kwargs: Any) -> Response:
+        """
+        Send the request by `self.client.request` under the rate limiter, and
+        record its metrics if `metrics` is set.
+        """
+        metrics = self.metrics
+        if metrics is None:
+            return self._send_limited(api_name, **kwargs)
+        try:
+            res = self._send_limited(api_name, **metrics.tag_request(api_name, kwargs))
+        except TransportError:
+            metrics.on_error(api_name)
+            raise
+        metrics.on_complete(res)
+        return res
+
+    def _send_limited(self, api_name: str | None, **kwargs: Any) -> Response:
+        api_key = self.api_key_pool.acquire() if self.api_key_pool else None
+        self._set_api_key(kwargs, api_key)
+        key = self.get_rate_limit_key(kwargs.get("headers"))
+        if self.rate_limiter:
+            self.rate_limiter.acquire(key, api_name)
+        start = time.perf_counter()
+        res = self.client.request(**kwargs)
+        self._on_limited_response(res, time.perf_counter() - start, key, api_key)
+        return res
+
+    def request_api(
+        self,
+        api_name: str,
+        method: HTTPMethod = HTTPMethod.GET,
+        *,
+        params: QueryParamTypes | None = None,
+        headers: HeaderTypes | None = None,
+        json: Any | None = None,
+        timeout: TimeoutTypes | UseClientDefault = USE_CLIENT_DEFAULT,
+    ) -> Response:
+        """
+        Send a request to the API registered as `api_name` in the url router.
+
+        Args:
+            api_name (str): The key of the api in `url_router.ROUTER`.
+            method (HTTPMethod): HTTP method, GET by default.
+            params (QueryParamTypes | None): Query parameters.
+            headers (HeaderTypes | None): Request headers.
+            json (Any | None): JSON request body.
+            timeout (TimeoutTypes | UseClientDefault): Request timeout.
+        """
+        kwargs = self._get_api_kwargs(api_name, method, params, headers, json, timeout)
+        cached = self._lookup_cache(api_name, kwargs)
+        if cached is None:
+            return self._send(api_name, **kwargs)
+        cache_key, entry, status = cached
+        match status:
+            case CacheStatus.FRESH:
+                pass
+            case CacheStatus.STALE:
+                cast(ResponseCache, self.response_cache).refresh(
+                    cache_key,
+                    lambda: self._revalidate(api_name, cache_key, entry, kwargs),
+                )
+            case _:
+                return self._revalidate(api_name, cache_key, entry, kwargs)
+        return self._get_cached_response(cast(CachedResponse, entry), kwargs)
+
+    def request_model[T](
+        self,
+        api_name: str,
+        model: type[T],
+        method: HTTPMethod = HTTPMethod.GET,
+        *,
+        params: QueryParamTypes | None = None,
+        headers: HeaderTypes | None = None,
+        json: Any | None = None,
+        timeout: TimeoutTypes | UseClientDefault = USE_CLIENT_DEFAULT,
+    ) -> T:
+        """
+        Send a request by `request_api`, and validate the response body into
+        `model` straight from the bytes without building the intermediate Python
+        objects. Raise `httpx.HTTPStatusError` if the status code isn't 2xx, and
+        `pydantic.ValidationError` if the body doesn't match the model.
+
+        Args:
+            api_name (str): The key of the api in `url_router.ROUTER`.
+            model (type[T]): A pydantic model or any type supported by `TypeAdapter`,
+                e.g. `list[CompanyNews]`.
+            method (HTTPMethod): HTTP method, GET by default.
+            params (QueryParamTypes | None): Query parameters.
+            headers (HeaderTypes | None): Request headers.
+            json (Any | None): JSON request body.
+            timeout (TimeoutTypes | UseClientDefault): Request timeout.
+        """
+        res = self.request_api(
+            api_name, method, params=params, headers=headers, json=json, timeout=timeout
+        )
+        return self._validate(api_name, model, res)
+
+    def _revalidate(
+        self,
+        api_name: str,
+        cache_key: str,
+        entry: CachedResponse | None,
+        kwargs: dict[str, Any],
+    ) -> Response:
+        """
+        Send the (conditional) request and update the cache entry.
+        """
+        res = self._send(api_name, **self._get_revalidate_kwargs(entry, kwargs))
+        return self._update_cache(cache_key, entry, res)
+
+    @contextmanager
+    def stream_api(
+        self,
+        api_name: str,
+        method: HTTPMethod = HTTPMethod.GET,
+        *,
+        params: QueryParamTypes | None = None,
+        headers: HeaderTypes | None = None,
+        timeout: TimeoutTypes | UseClientDefault = USE_CLIENT_DEFAULT,
+    ) -> Iterator[Response]:
+        """
+        Send a request to the API and yield the response before its body is read,
+        e.g. `response.iter_bytes()` reads the body incrementally. It's limited by
+        the rate limiter and the route timeout, but it isn't cached, coalesced or
+        retried because the body can only be consumed once.
+        """
+        kwargs = self._get_stream_kwargs(api_name, timeout)
+        api_key = self.api_key_pool.acquire() if self.api_key_pool else None
+        if api_key is not None:
+            headers = self.set_api_key(headers, api_key)
+        key = self.get_rate_limit_key(headers)
+        if self.rate_limiter:
+            self.rate_limiter.acquire(key, api_name)
+        start = time.perf_counter()
+        with self.client.stream(
+            method, self.get_api_url(api_name), params=params, headers=headers, **kwargs
+        ) as res:
+            self._on_limited_response(res, time.perf_counter() - start, key, api_key)
+            yield res
+        if self.metrics:
+            self.metrics.on_complete(res)
+
     def request_json(
         self,
         method: HTTPMethod,
@@ -60,10 +590,11 @@ class BaseApiClient:
         cookies: CookieTypes | None = None,
         auth: AuthTypes | UseClientDefault | None = USE_CLIENT_DEFAULT,
         follow_redirects: bool | UseClientDefault = USE_CLIENT_DEFAULT,
-        timeout: TimeoutTypes | UseClientDefault = 300,
+        timeout: TimeoutTypes | UseClientDefault = USE_CLIENT_DEFAULT,
         extensions: RequestExtensions | None = None,
     ) -> Any:
-        res = self.client.request(
+        res = self._send(
+            None,
             method=method,
             url=url,
             content=content,
@@ -78,8 +609,356 @@ class BaseApiClient:
             timeout=timeout,
             extensions=extensions,
         )
-        return res.json()
+        return self._decode(res)
 
-    @override
-    def __repr__(self) -> str:
-        return f"<{self.__class__.__name__}, url_router: {self.url_router}>"
+    def imap_unordered[K, T](
+        self,
+        func: Callable[[K], T],
+        items: Iterable[K],
+        max_workers: int = 16,
+    ) -> Iterator[BulkResult[K, T]]:
+        """
+        Call `func` for every item on a thread pool and yield `(item, result)` as
+        soon as each call finishes. An exception raised by `func` is yielded as the
+        result instead of aborting the rest of the items.
+
+        At most `max_workers * 2` items are in flight, so `items` can be a long
+        lazy iterable. All threads share `self.client`, i.e. the connection pool.
+
+        Args:
+            func (Callable[[K], T]): The function called with each item.
+            items (Iterable[K]): The items, e.g. symbols.
+            max_workers (int): The number of worker threads.
+        """
+        items_iter = iter(items)
+        executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=self.__class__.__name__
+        )
+        pending: dict[Future[T], K] = {}
+
+        def _submit(n: int) -> None:
+            for item in islice(items_iter, n):
+                pending[executor.submit(func, item)] = item
+
+        try:
+            _submit(max_workers * 2)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    result: T | Exception
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = e
+                    yield (item, result)
+                _submit(len(done))
+        finally:
+            # Don't run the remaining items if the caller stops iterating early
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self) -> None:
+        if self.response_cache:
+            self.response_cache.close()
+        self.client.close()
+
+
+class AsyncBaseApiClient(_ApiClientCore):
+    """
+    The asyncio twin of `BaseApiClient`, which is built on `httpx.AsyncClient`.
+    """
+
+    client: AsyncClient
+
+    def __init__(
+        self,
+        url_router: UrlRouter,
+        transport: AsyncBaseTransport | None = None,
+        max_concurrency: int = 10,
+        rate_limiter: RateLimiter | None = None,
+        response_cache: ResponseCache | None = None,
+        single_flight: SingleFlight | None = None,
+        resilience: Resilience | None = None,
+        limits: Limits | None = None,
+        http2: bool = False,
+        json_codec: JsonCodec | None = None,
+        metrics: ApiMetrics | None = None,
+        api_key_pool: ApiKeyPool | None = None,
+        validation_policy: ValidationPolicy | None = None,
+    ) -> None:
+        """
+        See `BaseApiClient.__init__`, `max_concurrency` is the default concurrency
+        of `gather`.
+        """
+        self._init_core(
+            url_router,
+            rate_limiter,
+            response_cache,
+            single_flight,
+            resilience,
+            json_codec,
+            metrics,
+            api_key_pool,
+            validation_policy,
+        )
+        self.max_concurrency = max_concurrency
+        event_hooks: dict[str, list[Callable[..., Any]]] = {
+            "request": [self._log_request],
+            "response": [],
+        }
+        if metrics:
+            event_hooks["request"].append(self._on_request_metrics)
+            event_hooks["response"].append(self._on_response_metrics)
+        self.client = AsyncClient(
+            transport=transport,
+            limits=limits or DEFAULT_LIMITS,
+            http2=check_http2(http2),
+            event_hooks=event_hooks,
+        )
+
+    async def _log_request(self, request: Request) -> None:
+        if message := self._format_request(request):
+            self.log.debug(message)
+
+    async def _on_request_metrics(self, request: Request) -> None:
+        cast(ApiMetrics, self.metrics).on_request_async(request)
+
+    async def _on_response_metrics(self, response: Response) -> None:
+        cast(ApiMetrics, self.metrics).on_response(response)
+
+    async def _send(self, api_name: str | None, **kwargs: Any) -> Response:
+        kwargs = encode_json_body(self.json_codec, kwargs)
+
+        async def send() -> Response:
+            # Only the leader observes, the coalesced callers share its response
+            return self._observe(api_name, await self._send_request(api_name, **kwargs))
+
+        key = self._get_single_flight_key(kwargs)
+        if key is None:
+            return await send()
+        return await cast(SingleFlight, self.single_flight).do_async(key, send)
+
+    async def _send_request(self, api_name: str | None, **kwargs: Any) -> Response:
+        resilience = self.resilience
+        if resilience is None:
+            return await self._send_once(api_name, **kwargs)
+        kwargs = resilience.apply_timeout(api_name, kwargs)
+        host = URL(kwargs["url"]).host
+        attempt = 0
+        while True:
+            resilience.before_request(host)
+            try:
+                res = await self._send_once(api_name, **kwargs)
+            except TransportError as e:
+                delay = self._get_retry_delay(
+                    resilience, host, kwargs, attempt, error=e
+                )
+                if delay is None:
+                    raise
+            except BaseException:
+                # e.g. cancelled, don't keep the half-open trial of the host
+                resilience.release(host)
+                raise
+            else:
+                delay = self._get_retry_delay(resilience, host, kwargs, attempt, res)
+                if delay is None:
+                    return res
+                await res.aclose()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _send_once(self, api_name: str | None, **kwargs: Any) -> Response:
+        metrics = self.metrics
+        if metrics is None:
+            return await self._send_limited(api_name, **kwargs)
+        try:
+            res = await self._send_limited(
+                api_name, **metrics.tag_request(api_name, kwargs)
+            )
+        except TransportError:
+            metrics.on_error(api_name)
+            raise
+        metrics.on_complete(res)
+        return res
+
+    async def _send_limited(self, api_name: str | None, **kwargs: Any) -> Response:
+        api_key = await self.api_key_pool.acquire_async() if self.api_key_pool else None
+        self._set_api_key(kwargs, api_key)
+        key = self.get_rate_limit_key(kwargs.get("headers"))
+        if self.rate_limiter:
+            await self.rate_limiter.acquire_async(key, api_name)
+        start = time.perf_counter()
+        res = await self.client.request(**kwargs)
+        self._on_limited_response(res, time.perf_counter() - start, key, api_key)
+        return res
+
+    async def request_api(
+        self,
+        api_name: str,
+        method: HTTPMethod = HTTPMethod.GET,
+        *,
+        params: QueryParamTypes | None = None,
+        headers: HeaderTypes | None = None,
+        json: Any | None = None,
+        timeout: TimeoutTypes | UseClientDefault = USE_CLIENT_DEFAULT,
+    ) -> Response:
+        """
+        Send a request to the API registered as `api_name` in the url router.
+        See `BaseApiClient.request_api`.
+        """
+        kwargs = self._get_api_kwargs(api_name, method, params, headers, json, timeout)
+        cached = self._lookup_cache(api_name, kwargs)
+        if cached is None:
+            return await self._send(api_name, **kwargs)
+        cache_key, entry, status = cached
+        match status:
+            case CacheStatus.FRESH:
+                pass
+            case CacheStatus.STALE:
+                cast(ResponseCache, self.response_cache).refresh_async(
+                    cache_key,
+                    lambda: self._revalidate(api_name, cache_key, entry, kwargs),
+                )
+            case _:
+                return await self._revalidate(api_name, cache_key, entry, kwargs)
+        return self._get_cached_response(cast(CachedResponse, entry), kwargs)
+
+    async def request_model[T](
+        self,
+        api_name: str,
+        model: type[T],
+        method: HTTPMethod = HTTPMethod.GET,
+        *,
+        params: QueryParamTypes | None = None,
+        headers: HeaderTypes | None = None,
+        json: Any | None = None,
+        timeout: TimeoutTypes | UseClientDefault = USE_CLIENT_DEFAULT,
+    ) -> T:
+        """
+        See `BaseApiClient.request_model`.
+        """
+        res = await self.request_api(
+            api_name, method, params=params, headers=headers, json=json, timeout=timeout
+        )
+        return self._validate(api_name, model, res)
+
+    async def _revalidate(
+        self,
+        api_name: str,
+        cache_key: str,
+        entry: CachedResponse | None,
+        kwargs: dict[str, Any],
+    ) -> Response:
+        res = await self._send(api_name, **self._get_revalidate_kwargs(entry, kwargs))
+        return self._update_cache(cache_key, entry, res)
+
+    @asynccontextmanager
+    async def stream_api(
+        self,
+        api_name: str,
+        method: HTTPMethod = HTTPMethod.GET,
+        *,
+        params: QueryParamTypes | None = None,
+        headers: HeaderTypes | None = None,
+        timeout: TimeoutTypes | UseClientDefault = USE_CLIENT_DEFAULT,
+    ) -> AsyncIterator[Response]:
+        """
+        See `BaseApiClient.stream_api`.
+        """
+        kwargs = self._get_stream_kwargs(api_name, timeout)
+        api_key = await self.api_key_pool.acquire_async() if self.api_key_pool else None
+        if api_key is not None:
+            headers = self.set_api_key(headers, api_key)
+        key = self.get_rate_limit_key(headers)
+        if self.rate_limiter:
+            await self.rate_limiter.acquire_async(key, api_name)
+        start = time.perf_counter()
+        async with self.client.stream(
+            method, self.get_api_url(api_name), params=params, headers=headers, **kwargs
+        ) as res:
+            self._on_limited_response(res, time.perf_counter() - start, key, api_key)
+            yield res
+        if self.metrics:
+            self.metrics.on_complete(res)
+
+    async def request_json(
+        self,
+        method: HTTPMethod,
+        url: str,
+        *,
+        content: RequestContent | None = None,
+        data: RequestData | None = None,
+        files: RequestFiles | None = None,
+        json: Any | None = None,
+        params: QueryParamTypes | None = None,
+        headers: HeaderTypes | None = None,
+        cookies: CookieTypes | None = None,
+        auth: AuthTypes | UseClientDefault | None = USE_CLIENT_DEFAULT,
+        follow_redirects: bool | UseClientDefault = USE_CLIENT_DEFAULT,
+        timeout: TimeoutTypes | UseClientDefault = USE_CLIENT_DEFAULT,
+        extensions: RequestExtensions | None = None,
+    ) -> Any:
+        res = await self._send(
+            None,
+            method=method,
+            url=url,
+            content=content,
+            data=data,
+            files=files,
+            json=json,
+            params=params,
+            headers=headers,
+            cookies=cookies,
+            auth=auth,
+            follow_redirects=follow_redirects,
+            timeout=timeout,
+            extensions=extensions,
+        )
+        return self._decode(res)
+
+    @overload
+    async def gather[T](
+        self,
+        aws: Iterable[Awaitable[T]],
+        max_concurrency: int | None = None,
+        return_exceptions: Literal[False] = False,
+    ) -> list[T]: ...
+
+    @overload
+    async def gather[T](
+        self,
+        aws: Iterable[Awaitable[T]],
+        max_concurrency: int | None = None,
+        return_exceptions: bool = False,
+    ) -> list[T | BaseException]: ...
+
+    async def gather[T](
+        self,
+        aws: Iterable[Awaitable[T]],
+        max_concurrency: int | None = None,
+        return_exceptions: bool = False,
+    ) -> list[T] | list[T | BaseException]:
+        """
+        Like `asyncio.gather`, but at most `max_concurrency` awaitables are
+        running at the same time. The results keep the order of `aws`.
+
+        Args:
+            aws (Iterable[Awaitable[T]]): The awaitables, e.g. `get_quote` calls.
+            max_concurrency (int | None): Defaults to `self.max_concurrency`.
+            return_exceptions (bool): Return the exceptions as results instead of
+                raising the first one.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def _run(aw: Awaitable[T]) -> T:
+            async with semaphore:
+                return await aw
+
+        return await asyncio.gather(
+            *(_run(aw) for aw in aws), return_exceptions=return_exceptions
+        )
+
+    async def aclose(self) -> None:
+        if self.response_cache:
+            await self.response_cache.aclose()
+        await self.client.aclose()
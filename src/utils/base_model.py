@@ -1,8 +1,10 @@
 import traceback
-from typing import Any
+from collections.abc import Hashable, Iterable
+from functools import lru_cache
+from typing import Any, NamedTuple, Self, cast
 
 from pydantic import BaseModel as _BaseModel
-from pydantic import ConfigDict
+from pydantic import ConfigDict, TypeAdapter, ValidationError
 
 
 class BaseModel(_BaseModel):
@@ -25,3 +27,72 @@ class BaseModel(_BaseModel):
             error = True
             err_msg = traceback.format_exc()
         return (error, err_msg)
+
+    @classmethod
+    def validate_many(cls, payloads: Iterable[Any]) -> "BatchValidation[Self]":
+        """
+        Validate a batch of payloads in one call of the cached `list[cls]`
+        adapter, instead of `validate_model` for each payload, which builds the
+        errors into traceback strings.
+
+        The invalid payloads don't abort the batch, their errors are returned as
+        `BatchError` records and the valid payloads are validated again without
+        them, so a batch with errors costs about two passes.
+
+        Args:
+            payloads (Iterable[Any]): The decoded payloads, e.g. the dicts of
+                `res.json()`.
+        """
+        payloads = list(payloads)
+        adapter = get_type_adapter(list[cls])  # type: ignore
+        try:
+            return BatchValidation(adapter.validate_python(payloads), [])
+        except ValidationError as exc:
+            errors = [
+                BatchError(
+                    index=error["loc"][0],
+                    loc=error["loc"][1:],
+                    type=error["type"],
+                    msg=error["msg"],
+                )
+                for error in exc.errors(
+                    include_url=False, include_context=False, include_input=False
+                )
+            ]
+        invalid = {error.index for error in errors}
+        valid = [payload for i, payload in enumerate(payloads) if i not in invalid]
+        return BatchValidation(adapter.validate_python(valid), errors)
+
+
+class BatchError(BaseModel):
+    # The index of the payload in the batch
+    index: int
+    # The field path in the payload, e.g. `("result", 0, "symbol")`
+    loc: tuple[int | str, ...]
+    # The pydantic error type, e.g. `missing` or `int_parsing`
+    type: str
+    msg: str
+
+
+class BatchValidation[T](NamedTuple):
+    # The models of the valid payloads, in the order of the batch
+    models: list[T]
+    errors: list[BatchError]
+
+    @property
+    def invalid_indexes(self) -> list[int]:
+        return sorted({error.index for error in self.errors})
+
+
+@lru_cache(maxsize=256)
+def _get_type_adapter(tp: Hashable) -> TypeAdapter[Any]:
+    return TypeAdapter(tp)
+
+
+def get_type_adapter[T](tp: type[T]) -> TypeAdapter[T]:
+    """
+    Building a `TypeAdapter` compiles the validator of the type, so cache it and
+    reuse it for every response of the type.
+    """
+    # lru_cache drops the type parameter, so keep it on this wrapper
+    return _get_type_adapter(cast(Hashable, tp))
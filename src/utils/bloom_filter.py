@@ -0,0 +1,86 @@
+import math
+import os
+import struct
+from collections.abc import Iterable
+from pathlib import Path
+
+HEADER = struct.Struct("<8sQQQQd")
+MAGIC = b"BLOOMFL1"
+
+
+class BloomFilter:
+    """
+    A Bloom filter of 64-bit hashes, e.g. the blake2b digests of the keys. The
+    positions of a hash are derived from its two 32-bit halves by double hashing,
+    so the keys are hashed only once.
+
+    `hash in bloom` is False only if the hash is never added, a True can be a
+    false positive at about `error_rate` when `capacity` hashes are added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        """
+        Args:
+            capacity (int): The expected number of hashes.
+            error_rate (float): The false positive rate at the capacity.
+        """
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.size = math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(round(self.size / self.capacity * math.log(2)), 1)
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _get_positions(self, value: int) -> Iterable[int]:
+        h1 = value & 0xFFFFFFFF
+        # An odd step visits different positions for each hash
+        h2 = (value >> 32) | 1
+        size = self.size
+        return ((h1 + i * h2) % size for i in range(self.hashes))
+
+    def add(self, value: int) -> None:
+        bits = self._bits
+        for position in self._get_positions(value):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: int) -> bool:
+        bits = self._bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._get_positions(value)
+        )
+
+    def save(self, path: Path) -> None:
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "wb") as wf:
+            wf.write(
+                HEADER.pack(
+                    MAGIC,
+                    self.capacity,
+                    self.size,
+                    self.hashes,
+                    self.count,
+                    self.error_rate,
+                )
+            )
+            wf.write(self._bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BloomFilter":
+        data = path.read_bytes()
+        if len(data) < HEADER.size:
+            raise ValueError(f"{path} isn't a Bloom filter file.")
+        magic, capacity, size, hashes, count, error_rate = HEADER.unpack_from(data)
+        if magic != MAGIC or len(data) != HEADER.size + (size + 7) // 8:
+            raise ValueError(f"{path} isn't a Bloom filter file.")
+        bloom = cls(capacity, error_rate)
+        if (bloom.size, bloom.hashes) != (size, hashes):
+            raise ValueError(f"{path} doesn't match its capacity and error rate.")
+        bloom.count = count
+        bloom._bits = bytearray(data[HEADER.size :])
+        return bloom
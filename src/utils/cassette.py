@@ -0,0 +1,192 @@
+import gzip
+import logging
+import os
+from collections.abc import Iterable
+from pathlib import Path
+from typing import override
+
+from httpx import (
+    AsyncBaseTransport,
+    AsyncHTTPTransport,
+    BaseTransport,
+    HTTPTransport,
+    Request,
+    Response,
+)
+from pydantic import Field
+
+from src.constants import CassetteMode
+from src.utils.base_model import BaseModel
+from src.utils.response_cache import CachedResponse
+
+log = logging.getLogger(__name__)
+
+
+class CassetteMissError(LookupError):
+    """
+    The request isn't recorded in the cassette.
+    """
+
+
+class CassetteEntry(BaseModel):
+    key: str
+    response: CachedResponse
+
+
+class CassetteFile(BaseModel):
+    entries: list[CassetteEntry] = Field(default_factory=list)
+
+
+class Cassette:
+    """
+    The recorded request/response pairs of a test, saved as gzipped JSON.
+
+    Requests are matched by the method, path, query parameters and the values of
+    `match_headers`, not the host, so the cassettes can be replayed against any
+    `FINN_HUB_HOST`. The identical requests are replayed in the recorded order,
+    and the last response is repeated when they run out.
+
+    The values of `secrets`, e.g. the API key, are replaced by their placeholders
+    before they're saved, so the cassettes can be committed and replayed with
+    another key.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        mode: CassetteMode,
+        match_headers: Iterable[str] = (),
+        secrets: dict[str, str] | None = None,
+    ) -> None:
+        """
+        Args:
+            path (Path): The cassette file, e.g. `tests/cassettes/test_quote.json.gz`.
+            mode (CassetteMode): Live, record or replay.
+            match_headers (Iterable[str]): The request headers to match besides the
+                url, e.g. the auth header to tell valid tokens from invalid ones.
+            secrets (dict[str, str] | None): The secret values and their
+                placeholders.
+        """
+        self.path = path
+        self.mode = mode
+        self.match_headers = sorted(header.lower() for header in match_headers)
+        self.secrets = {
+            secret: alias for secret, alias in (secrets or {}).items() if secret
+        }
+        self.entries: list[CassetteEntry] = []
+        self._positions: dict[str, int] = {}
+        if mode == CassetteMode.REPLAY:
+            if not path.exists():
+                raise FileNotFoundError(
+                    f"The cassette {path} doesn't exist, record it by the record mode"
+                )
+            with gzip.open(path, "rb") as rf:
+                self.entries = CassetteFile.model_validate_json(rf.read()).entries
+
+    def redact(self, text: str) -> str:
+        for secret, alias in self.secrets.items():
+            text = text.replace(secret, alias)
+        return text
+
+    def make_key(self, request: Request) -> str:
+        query = "&".join(
+            f"{key}={value}" for key, value in sorted(request.url.params.multi_items())
+        )
+        headers = "".join(
+            f"\n{name}: {request.headers.get(name, '')}" for name in self.match_headers
+        )
+        return self.redact(f"{request.method} {request.url.path}?{query}{headers}")
+
+    def play(self, request: Request) -> Response:
+        key = self.make_key(request)
+        matched = [entry for entry in self.entries if entry.key == key]
+        if not matched:
+            raise CassetteMissError(
+                f"The request isn't recorded in the cassette {self.path}:\n{key}"
+            )
+        position = self._positions.get(key, 0)
+        self._positions[key] = position + 1
+        return matched[min(position, len(matched) - 1)].response.to_response(request)
+
+    def record(self, request: Request, response: Response) -> Response:
+        """
+        Save the pair and return the recorded response, it has to be read already.
+        """
+        cached = CachedResponse.from_response(response)
+        cached.headers = [(key, self.redact(value)) for key, value in cached.headers]
+        self.entries.append(CassetteEntry(key=self.make_key(request), response=cached))
+        return cached.to_response(request)
+
+    def save(self) -> None:
+        if self.mode != CassetteMode.RECORD:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        content = CassetteFile(entries=self.entries).model_dump_json().encode()
+        # mtime=0 keeps the file the same if the responses don't change
+        with open(tmp_path, "wb") as wf:
+            with gzip.GzipFile(fileobj=wf, mode="wb", mtime=0) as gf:
+                gf.write(content)
+        os.replace(tmp_path, self.path)
+        log.info(f"Saved {len(self.entries)} requests to the cassette {self.path}")
+
+
+class CassetteTransport(BaseTransport):
+    """
+    Record the requests sent by `transport` to the cassette, or replay them from
+    the cassette without network. The cassette is saved when it's closed.
+    """
+
+    def __init__(
+        self, cassette: Cassette, transport: BaseTransport | None = None
+    ) -> None:
+        self.cassette = cassette
+        self.transport = transport or HTTPTransport()
+
+    @override
+    def handle_request(self, request: Request) -> Response:
+        if self.cassette.mode == CassetteMode.REPLAY:
+            return self.cassette.play(request)
+        response = self.transport.handle_request(request)
+        if self.cassette.mode == CassetteMode.LIVE:
+            return response
+        try:
+            response.read()
+        finally:
+            response.close()
+        return self.cassette.record(request, response)
+
+    @override
+    def close(self) -> None:
+        self.transport.close()
+        self.cassette.save()
+
+
+class AsyncCassetteTransport(AsyncBaseTransport):
+    """
+    The asyncio version of `CassetteTransport`.
+    """
+
+    def __init__(
+        self, cassette: Cassette, transport: AsyncBaseTransport | None = None
+    ) -> None:
+        self.cassette = cassette
+        self.transport = transport or AsyncHTTPTransport()
+
+    @override
+    async def handle_async_request(self, request: Request) -> Response:
+        if self.cassette.mode == CassetteMode.REPLAY:
+            return self.cassette.play(request)
+        response = await self.transport.handle_async_request(request)
+        if self.cassette.mode == CassetteMode.LIVE:
+            return response
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
+        return self.cassette.record(request, response)
+
+    @override
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+        self.cassette.save()
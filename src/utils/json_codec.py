@@ -0,0 +1,82 @@
+import importlib.util
+import json
+import logging
+from abc import ABC, abstractmethod
+from functools import cache
+from typing import Any, override
+
+from src.config import settings
+from src.constants import JsonCodecName
+
+log = logging.getLogger(__name__)
+
+
+class JsonCodec(ABC):
+    """
+    Encode and decode JSON, so the backend can be swapped without touching the
+    callers. `dumps` returns bytes because the result is sent as the request body.
+    """
+
+    name: JsonCodecName
+
+    @abstractmethod
+    def loads(self, data: bytes | str) -> Any: ...
+
+    @abstractmethod
+    def dumps(self, obj: Any) -> bytes: ...
+
+
+class StdlibJsonCodec(JsonCodec):
+    name = JsonCodecName.STDLIB
+
+    @override
+    def loads(self, data: bytes | str) -> Any:
+        return json.loads(data)
+
+    @override
+    def dumps(self, obj: Any) -> bytes:
+        # The same compact format as httpx
+        return json.dumps(
+            obj, ensure_ascii=False, separators=(",", ":"), allow_nan=False
+        ).encode()
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    It needs the optional `orjson` package, install it by `pip install orjson`.
+    """
+
+    name = JsonCodecName.ORJSON
+
+    def __init__(self) -> None:
+        import orjson
+
+        self._orjson = orjson
+
+    @override
+    def loads(self, data: bytes | str) -> Any:
+        return self._orjson.loads(data)
+
+    @override
+    def dumps(self, obj: Any) -> bytes:
+        return self._orjson.dumps(obj)
+
+
+@cache
+def get_json_codec(name: JsonCodecName | None = None) -> JsonCodec:
+    """
+    Get the codec by its name, `settings.JSON_CODEC` by default. Fall back to the
+    stdlib codec if orjson isn't installed.
+    """
+    name = JsonCodecName(name or settings.JSON_CODEC)
+    orjson_installed = importlib.util.find_spec("orjson") is not None
+    if name == JsonCodecName.AUTO:
+        name = JsonCodecName.ORJSON if orjson_installed else JsonCodecName.STDLIB
+    if name == JsonCodecName.ORJSON:
+        if orjson_installed:
+            return OrjsonCodec()
+        log.warning(
+            "The stdlib JSON codec is used because the `orjson` package isn't "
+            "installed, install it by `pip install orjson`"
+        )
+    return StdlibJsonCodec()
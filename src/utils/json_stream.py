@@ -0,0 +1,114 @@
+import codecs
+import json
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Iterator
+from typing import Any
+
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789+-.eE"
+
+
+class JsonArrayParser:
+    """
+    Incremental parser of a top-level JSON array. Feed it the chunks of the
+    document, and it returns the items which are complete so far, so the memory
+    is bounded by the largest item instead of the whole document.
+    """
+
+    # The parser expects "[", an item or "]", an item, "," or "]", nothing
+    _START, _FIRST_ITEM, _ITEM, _SEPARATOR, _DONE = range(5)
+
+    def __init__(self) -> None:
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._state = self._START
+
+    def feed(self, chunk: bytes) -> list[Any]:
+        self._buffer += self._text_decoder.decode(chunk)
+        return self._parse()
+
+    def close(self) -> list[Any]:
+        """
+        Parse the rest of the buffer, raise `ValueError` if the array isn't
+        complete.
+        """
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        items = self._parse(final=True)
+        if self._state != self._DONE:
+            raise ValueError(f"Invalid or incomplete JSON array: {self._buffer[:50]}")
+        if self._buffer.strip(_WHITESPACE):
+            raise ValueError(f"Extra data after the JSON array: {self._buffer[:50]}")
+        return items
+
+    def _parse(self, final: bool = False) -> list[Any]:
+        items: list[Any] = []
+        buffer = self._buffer
+        pos = 0
+        while self._state != self._DONE:
+            pos = _skip_whitespace(buffer, pos)
+            if pos >= len(buffer):
+                break
+            char = buffer[pos]
+            if self._state == self._START:
+                if char != "[":
+                    raise ValueError(
+                        f"Expect a JSON array, got: {buffer[pos : pos + 50]}"
+                    )
+                self._state = self._FIRST_ITEM
+                pos += 1
+            elif char == "]" and self._state in (self._FIRST_ITEM, self._SEPARATOR):
+                self._state = self._DONE
+                pos += 1
+            elif self._state == self._SEPARATOR:
+                if char != ",":
+                    raise ValueError(
+                        f"Expect ',' or ']', got: {buffer[pos : pos + 50]}"
+                    )
+                self._state = self._ITEM
+                pos += 1
+            else:
+                try:
+                    item, end = self._decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # The item isn't complete, wait for the next chunk
+                    break
+                if (
+                    not final
+                    and type(item) in (int, float)
+                    and not buffer[end:].lstrip(_NUMBER_CHARS)
+                ):
+                    # The number at the end of the buffer may be cut in the middle
+                    break
+                items.append(item)
+                self._state = self._SEPARATOR
+                pos = end
+        self._buffer = buffer[pos:]
+        return items
+
+
+def _skip_whitespace(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Yield the items of a JSON array from its byte chunks one by one.
+    """
+    parser = JsonArrayParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+async def aiter_json_array(chunks: AsyncIterable[bytes]) -> AsyncIterator[Any]:
+    """
+    Yield the items of a JSON array from its async byte chunks one by one.
+    """
+    parser = JsonArrayParser()
+    async for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
+    for item in parser.close():
+        yield item
@@ -0,0 +1,309 @@
+import bisect
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from httpx import Request, Response
+from pydantic import Field
+
+from src.constants import MetricPhase
+from src.utils.base_model import BaseModel
+
+# The request extensions which carry the route name and timings to the hooks
+ROUTE_EXTENSION = "metrics_route"
+TIMINGS_EXTENSION = "metrics_timings"
+# The route of the requests which aren't sent by `request_api`
+OTHER_ROUTE = "other"
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# The httpcore trace events of opening a connection
+_CONNECT_STARTED = "connection.connect_tcp.started"
+_CONNECT_COMPLETES = (
+    "connection.connect_tcp.complete",
+    "connection.start_tls.complete",
+)
+
+
+class Histogram(BaseModel):
+    """
+    `counts[i]` is the number of values in (buckets[i - 1], buckets[i]], and the
+    last count is the number of values above all buckets. Prometheus buckets are
+    cumulative, they're summed up on export.
+    """
+
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    counts: list[int] = Field(default_factory=list)
+    count: int = 0
+    sum: float = 0
+
+    def observe(self, value: float) -> None:
+        if not self.counts:
+            self.counts = [0] * (len(self.buckets) + 1)
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def get_quantile(self, q: float) -> float | None:
+        """
+        Estimate the quantile by linear interpolation in its bucket, None if the
+        histogram is empty.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class RouteMetrics(BaseModel):
+    requests: int = 0
+    errors: int = 0
+    connections: int = 0
+    request_bytes: int = 0
+    response_bytes: int = 0
+    statuses: dict[int, int] = Field(default_factory=dict)
+    latency: dict[MetricPhase, Histogram] = Field(default_factory=dict)
+
+
+class ApiMetrics:
+    """
+    Per-route metrics of the api clients: the counters of requests, errors,
+    new connections, bytes and status codes, and the latency histograms of each
+    `MetricPhase`.
+
+    The clients only register the event hooks when it's set, so it costs nothing
+    when it's disabled. TTFB includes waiting for and opening the connection,
+    and CONNECT is only observed when a new connection is opened.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.routes: dict[str, RouteMetrics] = {}
+        self._lock = threading.Lock()
+
+    def _get_route(self, route: str) -> RouteMetrics:
+        # The caller holds the lock
+        metrics = self.routes.get(route)
+        if metrics is None:
+            metrics = self.routes[route] = RouteMetrics()
+        return metrics
+
+    def _observe(self, metrics: RouteMetrics, phase: MetricPhase, value: float) -> None:
+        histogram = metrics.latency.get(phase)
+        if histogram is None:
+            histogram = metrics.latency[phase] = Histogram(buckets=self.buckets)
+        histogram.observe(value)
+
+    def observe(self, route: str, phase: MetricPhase, seconds: float) -> None:
+        with self._lock:
+            self._observe(self._get_route(route), phase, seconds)
+
+    @contextmanager
+    def timer(self, route: str | None, phase: MetricPhase) -> Iterator[None]:
+        """
+        Observe the seconds spent in the block if it doesn't raise.
+        """
+        start = time.perf_counter()
+        yield
+        self.observe(route or OTHER_ROUTE, phase, time.perf_counter() - start)
+
+    @staticmethod
+    def tag_request(api_name: str | None, kwargs: dict[str, Any]) -> dict[str, Any]:
+        """
+        Add the route name to the request extensions of `httpx.Client.request`.
+        """
+        extensions = {**(kwargs.get("extensions") or {})}
+        extensions[ROUTE_EXTENSION] = api_name or OTHER_ROUTE
+        return {**kwargs, "extensions": extensions}
+
+    def _start(self, request: Request) -> dict[str, float]:
+        timings = {"start": time.perf_counter()}
+        request.extensions[TIMINGS_EXTENSION] = timings
+        route = request.extensions.get(ROUTE_EXTENSION, OTHER_ROUTE)
+        with self._lock:
+            metrics = self._get_route(route)
+            metrics.requests += 1
+            metrics.request_bytes += int(request.headers.get("Content-Length", 0))
+        return timings
+
+    def on_request(self, request: Request) -> None:
+        """
+        The request hook of `httpx.Client`, it traces the connection events.
+        """
+        timings = self._start(request)
+
+        def trace(event: str, info: dict[str, Any]) -> None:
+            timings[event] = time.perf_counter()
+
+        request.extensions["trace"] = trace
+
+    def on_request_async(self, request: Request) -> None:
+        """
+        The request hook of `httpx.AsyncClient`, whose trace callback is async.
+        """
+        timings = self._start(request)
+
+        async def trace(event: str, info: dict[str, Any]) -> None:
+            timings[event] = time.perf_counter()
+
+        request.extensions["trace"] = trace
+
+    def on_response(self, response: Response) -> None:
+        """
+        The response hook, it's called when the response headers are received.
+        """
+        now = time.perf_counter()
+        extensions = response.request.extensions
+        timings = extensions.get(TIMINGS_EXTENSION)
+        if timings is None:
+            return
+        timings["ttfb"] = now - timings["start"]
+        with self._lock:
+            metrics = self._get_route(extensions.get(ROUTE_EXTENSION, OTHER_ROUTE))
+            metrics.statuses[response.status_code] = (
+                metrics.statuses.get(response.status_code, 0) + 1
+            )
+            self._observe(metrics, MetricPhase.TTFB, timings["ttfb"])
+            if _CONNECT_STARTED in timings:
+                connected_at = max(timings.get(name, 0) for name in _CONNECT_COMPLETES)
+                metrics.connections += 1
+                self._observe(
+                    metrics,
+                    MetricPhase.CONNECT,
+                    max(connected_at - timings[_CONNECT_STARTED], 0),
+                )
+
+    def on_complete(self, response: Response) -> None:
+        """
+        Call it after the response body is read and closed.
+        """
+        extensions = response.request.extensions
+        timings = extensions.get(TIMINGS_EXTENSION)
+        if timings is None or "ttfb" not in timings:
+            return
+        try:
+            elapsed = response.elapsed.total_seconds()
+        except RuntimeError:
+            # The content of a mocked response is read without its stream
+            elapsed = time.perf_counter() - timings["start"]
+        download = max(elapsed - timings["ttfb"], 0)
+        with self._lock:
+            metrics = self._get_route(extensions.get(ROUTE_EXTENSION, OTHER_ROUTE))
+            metrics.response_bytes += response.num_bytes_downloaded
+            self._observe(metrics, MetricPhase.DOWNLOAD, download)
+
+    def on_error(self, api_name: str | None) -> None:
+        with self._lock:
+            self._get_route(api_name or OTHER_ROUTE).errors += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Dump the metrics of each route, with the estimated p50, p95 and p99 of
+        each phase in seconds.
+        """
+        with self._lock:
+            snapshot = {}
+            for route, metrics in self.routes.items():
+                data = metrics.model_dump(exclude={"latency"})
+                data["latency"] = {
+                    str(phase): {
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                        "p50": histogram.get_quantile(0.5),
+                        "p95": histogram.get_quantile(0.95),
+                        "p99": histogram.get_quantile(0.99),
+                    }
+                    for phase, histogram in metrics.latency.items()
+                }
+                snapshot[route] = data
+        return snapshot
+
+    def to_prometheus(self, namespace: str = "api_client") -> str:
+        """
+        Export the metrics in the Prometheus text exposition format.
+        """
+        counters = {
+            "requests": "Requests sent.",
+            "errors": "Requests failed without a response.",
+            "connections": "New connections opened.",
+            "request_bytes": "Request body bytes sent.",
+            "response_bytes": "Response body bytes received.",
+        }
+        lines = []
+        with self._lock:
+            routes = sorted(self.routes.items())
+            for field, help_text in counters.items():
+                name = f"{namespace}_{field}_total"
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                lines += [
+                    f'{name}{{route="{route}"}} {getattr(metrics, field)}'
+                    for route, metrics in routes
+                ]
+            name = f"{namespace}_responses_total"
+            lines += [
+                f"# HELP {name} Responses by status code.",
+                f"# TYPE {name} counter",
+            ]
+            for route, metrics in routes:
+                lines += [
+                    f'{name}{{route="{route}",status="{status}"}} {count}'
+                    for status, count in sorted(metrics.statuses.items())
+                ]
+            name = f"{namespace}_latency_seconds"
+            lines += [
+                f"# HELP {name} Latency of each phase of the requests.",
+                f"# TYPE {name} histogram",
+            ]
+            for route, metrics in routes:
+                for phase, histogram in sorted(metrics.latency.items()):
+                    labels = f'route="{route}",phase="{phase}"'
+                    cumulative = 0
+                    for bound, count in zip(
+                        (*histogram.buckets, "+Inf"), histogram.counts, strict=True
+                    ):
+                        cumulative += count
+                        lines.append(
+                            f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+                        )
+                    lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+                    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Path, namespace: str = "api_client") -> None:
+        """
+        Write the metrics to a file for the node exporter textfile collector,
+        the file is replaced atomically so the collector never reads half of it.
+        """
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(self.to_prometheus(namespace))
+        os.replace(tmp_path, path)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.routes.clear()
@@ -0,0 +1,323 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from datetime import UTC
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+from multiprocessing.context import BaseContext
+from typing import Self, override
+
+from httpx import Response
+from pydantic import Field
+
+from src.utils.base_model import BaseModel
+from src.utils.utils import HelperFuncs
+
+log = logging.getLogger(__name__)
+
+DEFAULT_KEY = "default"
+
+
+class RateLimit(BaseModel):
+    """
+    At most `calls` requests in `period` seconds.
+    """
+
+    calls: float = Field(gt=0)
+    period: float = Field(default=1, gt=0)
+
+
+class RateLimiterStats(BaseModel):
+    requests: int = 0
+    throttled_requests: int = 0
+    throttled_seconds: float = 0
+    network_seconds: float = 0
+    too_many_requests: int = 0
+
+
+class TokenBucket:
+    """
+    A token bucket which hands out reservations: the tokens can go negative, and
+    the caller has to wait until the deficit is refilled. It isn't thread-safe, the
+    `RateLimiter` holds the lock.
+    """
+
+    def __init__(self, rate_limit: RateLimit, now: float) -> None:
+        self.rate = rate_limit.calls / rate_limit.period
+        self.capacity = rate_limit.calls
+        self.tokens = self.capacity
+        self.updated_at = now
+
+    def peek(self, now: float) -> float:
+        """
+        Return the tokens at `now` without taking any.
+        """
+        # `now` is before the last update when it's reserved at the end of a pause
+        elapsed = max(now - self.updated_at, 0)
+        return min(self.capacity, self.tokens + elapsed * self.rate)
+
+    def reserve(self, cost: float, now: float) -> float:
+        """
+        Take `cost` tokens and return how many seconds the caller has to wait.
+        """
+        self.tokens = self.peek(now)
+        self.updated_at = max(now, self.updated_at)
+        self.tokens -= cost
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def drain(self, until: float) -> None:
+        """
+        Empty the bucket at `until`, so the requests after it are spaced at the
+        rate instead of a burst of the refilled tokens.
+        """
+        self.tokens = min(self.peek(until), 0)
+        self.updated_at = until
+
+
+class RateLimiter:
+    """
+    Client-side rate limiter shared by the sync and async api clients.
+
+    Every key, e.g. an API token, gets its own token buckets for each `RateLimit`.
+    A request of `api_name` takes `route_costs[api_name]` tokens (1 by default).
+    When a response is 429, all requests are paused for its `Retry-After` seconds
+    or `default_retry_after` if the header is missing. With `pause_per_key`, only
+    the requests of its key are paused, e.g. the keys of an `ApiKeyPool` have
+    their own quotas. The buckets are empty at the end of the pause, so the
+    requests queued during it are sent at the rate instead of all at once.
+    """
+
+    def __init__(
+        self,
+        rate_limits: list[RateLimit],
+        route_costs: dict[str, float] | None = None,
+        default_retry_after: float = 1,
+        pause_per_key: bool = False,
+    ) -> None:
+        if not rate_limits:
+            raise ValueError("At least one rate limit is required.")
+        self.rate_limits = rate_limits
+        self.route_costs = route_costs or {}
+        self.default_retry_after = default_retry_after
+        self.pause_per_key = pause_per_key
+        self.stats = RateLimiterStats()
+        self._buckets: dict[str, list[TokenBucket]] = {}
+        self._pause_until: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_calls(
+        cls,
+        per_second: float | None = None,
+        per_minute: float | None = None,
+        route_costs: dict[str, float] | None = None,
+        pause_per_key: bool = False,
+    ) -> Self | None:
+        """
+        Build the rate limiter by the calls per second and per minute,
+        return None if both of them are None.
+        """
+        rate_limits = cls.get_rate_limits(per_second, per_minute)
+        if not rate_limits:
+            return None
+        return cls(rate_limits, route_costs=route_costs, pause_per_key=pause_per_key)
+
+    @staticmethod
+    def get_rate_limits(
+        per_second: float | None = None, per_minute: float | None = None
+    ) -> list[RateLimit]:
+        rate_limits = []
+        if per_second:
+            rate_limits.append(RateLimit(calls=per_second, period=1))
+        if per_minute:
+            rate_limits.append(RateLimit(calls=per_minute, period=60))
+        return rate_limits
+
+    def get_pause_key(self, key: str | None) -> str:
+        return (key or DEFAULT_KEY) if self.pause_per_key else DEFAULT_KEY
+
+    def _get_buckets(self, key: str, now: float) -> list[TokenBucket]:
+        buckets = self._buckets.get(key)
+        if buckets is None:
+            buckets = [TokenBucket(limit, now) for limit in self.rate_limits]
+            self._buckets[key] = buckets
+        return buckets
+
+    def reserve(self, key: str | None = None, api_name: str | None = None) -> float:
+        """
+        Reserve the tokens for a request and return the seconds to wait before
+        sending it.
+        """
+        cost = self.route_costs.get(api_name, 1) if api_name else 1
+        key = key or DEFAULT_KEY
+        with self._lock:
+            now = time.monotonic()
+            buckets = self._get_buckets(key, now)
+            # The tokens are taken at the end of the pause
+            start = max(now, self._pause_until.get(self.get_pause_key(key), 0))
+            delay = start - now + max(bucket.reserve(cost, start) for bucket in buckets)
+            self.stats.requests += 1
+            if delay > 0:
+                self.stats.throttled_requests += 1
+                self.stats.throttled_seconds += delay
+        return delay
+
+    def acquire(self, key: str | None = None, api_name: str | None = None) -> None:
+        delay = self.reserve(key, api_name)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(
+        self, key: str | None = None, api_name: str | None = None
+    ) -> None:
+        delay = self.reserve(key, api_name)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_response(
+        self, response: Response, elapsed: float, key: str | None = None
+    ) -> None:
+        """
+        Record the network time of a response, and pause the requests if it's
+        429.
+
+        Args:
+            response (Response): The received response.
+            elapsed (float): The seconds spent on sending the request.
+            key (str | None): The rate limit key of the request.
+        """
+        with self._lock:
+            self.stats.network_seconds += elapsed
+            if response.status_code != HTTPStatus.TOO_MANY_REQUESTS:
+                return
+            self.stats.too_many_requests += 1
+            retry_after = self.parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is None:
+                retry_after = self.default_retry_after
+            now = time.monotonic()
+            pause_key = self.get_pause_key(key)
+            pause_until = max(self._pause_until.get(pause_key, 0), now + retry_after)
+            self._pause_until[pause_key] = pause_until
+            self._get_buckets(key or DEFAULT_KEY, now)
+            self._drain(pause_key, pause_until)
+        log.warning(f"Got 429 from {response.url}, pause for {retry_after} seconds")
+
+    def _drain(self, pause_key: str, until: float) -> None:
+        """
+        Empty the buckets of the paused keys at the end of the pause, the caller
+        holds the lock.
+        """
+        for key, buckets in self._buckets.items():
+            if self.pause_per_key and key != pause_key:
+                continue
+            for bucket in buckets:
+                bucket.drain(until)
+
+    @staticmethod
+    def parse_retry_after(value: str | None) -> float | None:
+        """
+        Parse the `Retry-After` header, which is seconds or an HTTP date.
+        """
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=UTC)
+        return max((retry_at - HelperFuncs.get_current_utc()).total_seconds(), 0.0)
+
+
+class SharedRateBudget:
+    """
+    The token buckets of `rate_limits` in shared memory, so the processes of a
+    pool share one rate budget. Create it in the parent process and pass it to the
+    workers when they're started, e.g. by the `initargs` of the process pool.
+    """
+
+    def __init__(
+        self, rate_limits: list[RateLimit], context: BaseContext | None = None
+    ) -> None:
+        context = context or multiprocessing.get_context()
+        now = time.monotonic()
+        self.rate_limits = rate_limits
+        # The tokens and the last update time of each bucket
+        self._buckets = [
+            context.Array("d", [limit.calls, now]) for limit in rate_limits
+        ]
+
+    def reserve(self, cost: float, start: float = 0) -> float:
+        """
+        Take `cost` tokens of every bucket at `start` or now, whichever is later,
+        and return the seconds to wait from now.
+        """
+        now = time.monotonic()
+        start = max(now, start)
+        delay = 0.0
+        for limit, bucket in zip(self.rate_limits, self._buckets, strict=True):
+            rate = limit.calls / limit.period
+            with bucket.get_lock():
+                tokens, updated_at = bucket[0], bucket[1]
+                elapsed = max(start - updated_at, 0)
+                tokens = min(limit.calls, tokens + elapsed * rate) - cost
+                bucket[0], bucket[1] = tokens, max(start, updated_at)
+            if tokens < 0:
+                delay = max(delay, -tokens / rate)
+        return start - now + delay
+
+    def drain(self, until: float) -> None:
+        """
+        Empty every bucket at `until`, like `TokenBucket.drain`.
+        """
+        for limit, bucket in zip(self.rate_limits, self._buckets, strict=True):
+            rate = limit.calls / limit.period
+            with bucket.get_lock():
+                tokens, updated_at = bucket[0], bucket[1]
+                elapsed = max(until - updated_at, 0)
+                tokens = min(limit.calls, tokens + elapsed * rate)
+                bucket[0], bucket[1] = min(tokens, 0), max(until, updated_at)
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    The `RateLimiter` of a worker process, whose buckets are the shared budget of
+    all workers instead of per key. The 429 pauses are still per process.
+    """
+
+    def __init__(
+        self,
+        budget: SharedRateBudget,
+        route_costs: dict[str, float] | None = None,
+        default_retry_after: float = 1,
+        pause_per_key: bool = False,
+    ) -> None:
+        super().__init__(
+            budget.rate_limits, route_costs, default_retry_after, pause_per_key
+        )
+        self.budget = budget
+
+    @override
+    def reserve(self, key: str | None = None, api_name: str | None = None) -> float:
+        cost = self.route_costs.get(api_name, 1) if api_name else 1
+        with self._lock:
+            pause_until = self._pause_until.get(self.get_pause_key(key), 0)
+        delay = self.budget.reserve(cost, pause_until)
+        with self._lock:
+            self.stats.requests += 1
+            if delay > 0:
+                self.stats.throttled_requests += 1
+                self.stats.throttled_seconds += delay
+        return delay
+
+    @override
+    def _drain(self, pause_key: str, until: float) -> None:
+        self.budget.drain(until)
@@ -0,0 +1,266 @@
+import logging
+import random
+import threading
+import time
+from http import HTTPMethod, HTTPStatus
+from typing import Any
+
+from httpx import Response, Timeout, TransportError
+from httpx._client import UseClientDefault
+from pydantic import Field
+
+from src.constants import CircuitState
+from src.utils.base_model import BaseModel
+from src.utils.rate_limiter import RateLimiter
+
+log = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised without sending the request, when the circuit of the host is open.
+    """
+
+    def __init__(self, host: str, retry_in: float) -> None:
+        super().__init__(f"The circuit of {host} is open, retry in {retry_in:.1f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class RetryPolicy(BaseModel):
+    """
+    Retry the idempotent requests with exponential backoff and full jitter, i.e.
+    the n-th retry waits a random time in [0, min(backoff_max, backoff_base * 2^n)].
+    """
+
+    max_retries: int = Field(default=3, ge=0)
+    backoff_base: float = Field(default=0.5, ge=0)
+    backoff_max: float = Field(default=10, ge=0)
+    retry_methods: set[HTTPMethod] = {HTTPMethod.GET, HTTPMethod.HEAD}
+    retry_statuses: set[int] = {
+        HTTPStatus.TOO_MANY_REQUESTS,
+        HTTPStatus.BAD_GATEWAY,
+        HTTPStatus.SERVICE_UNAVAILABLE,
+        HTTPStatus.GATEWAY_TIMEOUT,
+    }
+
+    def get_backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+
+class CircuitBreakerState:
+    def __init__(self) -> None:
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+
+class CircuitBreaker:
+    """
+    A circuit breaker per host. After `failure_threshold` consecutive failures
+    (transport errors or 5xx), the circuit opens and the requests fail fast with
+    `CircuitOpenError`. After `recovery_timeout` seconds, one trial request is
+    allowed (half open), its success closes the circuit, and its failure opens
+    it again.
+    """
+
+    def __init__(
+        self, failure_threshold: int = 5, recovery_timeout: float = 30
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._hosts: dict[str, CircuitBreakerState] = {}
+        self._lock = threading.Lock()
+
+    def before_request(self, host: str) -> None:
+        with self._lock:
+            host_state = self._hosts.setdefault(host, CircuitBreakerState())
+            if host_state.state == CircuitState.CLOSED:
+                return
+            retry_in = host_state.opened_at + self.recovery_timeout - time.monotonic()
+            if (
+                host_state.state == CircuitState.OPEN
+                and retry_in <= 0
+                and not host_state.trial_in_flight
+            ):
+                host_state.state = CircuitState.HALF_OPEN
+                host_state.trial_in_flight = True
+                return
+        raise CircuitOpenError(host, max(retry_in, 0))
+
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            host_state = self._hosts.setdefault(host, CircuitBreakerState())
+            if host_state.state != CircuitState.CLOSED:
+                log.info(f"The circuit of {host} is closed")
+            host_state.state = CircuitState.CLOSED
+            host_state.failures = 0
+            host_state.trial_in_flight = False
+
+    def release(self, host: str) -> None:
+        """
+        Release the trial of a request which ends without a result, e.g. it's
+        cancelled or fails before it's sent, so the next request is the trial.
+        """
+        with self._lock:
+            host_state = self._hosts.get(host)
+            if host_state is None or not host_state.trial_in_flight:
+                return
+            host_state.trial_in_flight = False
+            if host_state.state == CircuitState.HALF_OPEN:
+                host_state.state = CircuitState.OPEN
+
+    def record_failure(self, host: str) -> bool:
+        """
+        Record a failure, return True if the circuit is opened by it.
+        """
+        with self._lock:
+            host_state = self._hosts.setdefault(host, CircuitBreakerState())
+            host_state.failures += 1
+            host_state.trial_in_flight = False
+            if host_state.state == CircuitState.HALF_OPEN or (
+                host_state.state == CircuitState.CLOSED
+                and host_state.failures >= self.failure_threshold
+            ):
+                host_state.state = CircuitState.OPEN
+                host_state.opened_at = time.monotonic()
+                log.warning(f"The circuit of {host} is open")
+                return True
+            if host_state.state == CircuitState.OPEN:
+                host_state.opened_at = time.monotonic()
+        return False
+
+    def get_state(self, host: str) -> CircuitState:
+        with self._lock:
+            host_state = self._hosts.get(host)
+            return host_state.state if host_state else CircuitState.CLOSED
+
+    @property
+    def open_circuits(self) -> int:
+        with self._lock:
+            return sum(
+                host_state.state != CircuitState.CLOSED
+                for host_state in self._hosts.values()
+            )
+
+
+class ResilienceStats(BaseModel):
+    retries: int = 0
+    failures: int = 0
+    circuits_opened: int = 0
+    short_circuited: int = 0
+    open_circuits: int = 0
+
+
+class Resilience:
+    """
+    The resilience layer of the api clients: per-route timeouts, bounded
+    retries of the idempotent requests and a circuit breaker per host.
+
+    Args:
+        retry_policy (RetryPolicy | None): None means no retry.
+        circuit_breaker (CircuitBreaker | None): None means no circuit breaker.
+        route_timeouts (dict[str, Timeout] | None): The timeout of each route
+            name, it's used when the request doesn't set the timeout.
+    """
+
+    def __init__(
+        self,
+        retry_policy: RetryPolicy | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        route_timeouts: dict[str, Timeout] | None = None,
+    ) -> None:
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.route_timeouts = route_timeouts or {}
+        self._stats = ResilienceStats()
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> ResilienceStats:
+        if self.circuit_breaker:
+            self._stats.open_circuits = self.circuit_breaker.open_circuits
+        return self._stats
+
+    def apply_timeout(
+        self, api_name: str | None, kwargs: dict[str, Any]
+    ) -> dict[str, Any]:
+        timeout = self.route_timeouts.get(api_name) if api_name else None
+        if timeout is None or not isinstance(kwargs.get("timeout"), UseClientDefault):
+            return kwargs
+        return {**kwargs, "timeout": timeout}
+
+    def before_request(self, host: str) -> None:
+        if self.circuit_breaker is None:
+            return
+        try:
+            self.circuit_breaker.before_request(host)
+        except CircuitOpenError:
+            with self._lock:
+                self._stats.short_circuited += 1
+            raise
+
+    def record(self, host: str, response: Response | None) -> None:
+        """
+        Record the result of a request, None response means a transport error.
+        """
+        is_failure = response is None or response.is_server_error
+        if is_failure:
+            with self._lock:
+                self._stats.failures += 1
+        if self.circuit_breaker is None:
+            return
+        if not is_failure:
+            self.circuit_breaker.record_success(host)
+        elif self.circuit_breaker.record_failure(host):
+            with self._lock:
+                self._stats.circuits_opened += 1
+
+    def release(self, host: str) -> None:
+        """
+        Release the request of the host which ends without a response or a
+        transport error.
+        """
+        if self.circuit_breaker:
+            self.circuit_breaker.release(host)
+
+    def get_retry_delay(
+        self,
+        method: str,
+        attempt: int,
+        response: Response | None = None,
+        error: Exception | None = None,
+    ) -> float | None:
+        """
+        Return the seconds to wait before the next attempt, or None if the
+        request shouldn't be retried.
+
+        Args:
+            method (str): The HTTP method of the request.
+            attempt (int): How many times the request has been retried.
+            response (Response | None): The response of this attempt.
+            error (Exception | None): The error of this attempt.
+        """
+        policy = self.retry_policy
+        if (
+            policy is None
+            or attempt >= policy.max_retries
+            or method not in policy.retry_methods
+        ):
+            return None
+        if response is not None:
+            if response.status_code not in policy.retry_statuses:
+                return None
+        elif not isinstance(error, TransportError):
+            return None
+
+        delay = policy.get_backoff(attempt)
+        if response is not None:
+            retry_after = RateLimiter.parse_retry_after(
+                response.headers.get("Retry-After")
+            )
+            delay = max(delay, retry_after or 0)
+        with self._lock:
+            self._stats.retries += 1
+        return delay
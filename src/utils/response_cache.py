@@ -0,0 +1,513 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable, Coroutine
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, override
+from urllib.parse import urlencode
+
+from httpx import Headers, QueryParams, Request, Response
+from httpx._types import HeaderTypes, QueryParamTypes
+
+from src.constants import CACHE_DIR, CacheStatus
+from src.utils.base_model import BaseModel
+
+log = logging.getLogger(__name__)
+
+# `content` is stored decoded, so the headers which describe the encoded body
+# don't apply to it anymore.
+_SKIPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class CachedResponse(BaseModel):
+    status_code: int
+    headers: list[tuple[str, str]]
+    content: bytes
+    stored_at: float
+
+    @classmethod
+    def from_response(cls, response: Response) -> "CachedResponse":
+        return cls(
+            status_code=response.status_code,
+            headers=[
+                (key, value)
+                for key, value in response.headers.multi_items()
+                if key.lower() not in _SKIPPED_HEADERS
+            ],
+            content=response.content,
+            stored_at=time.time(),
+        )
+
+    def to_response(self, request: Request) -> Response:
+        return Response(
+            self.status_code,
+            headers=self.headers,
+            content=self.content,
+            request=request,
+        )
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    def get_header(self, name: str) -> str | None:
+        name = name.lower()
+        for key, value in self.headers:
+            if key.lower() == name:
+                return value
+        return None
+
+
+class ResponseCacheStats(BaseModel):
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    refreshes: int = 0
+    revalidations: int = 0
+    not_modified: int = 0
+
+
+class CacheBackend(ABC):
+    """
+    The storage of `ResponseCache`. The implementations must be thread-safe.
+    """
+
+    def __init__(self) -> None:
+        self.evictions = 0
+
+    @abstractmethod
+    def get(self, key: str) -> CachedResponse | None: ...
+
+    @abstractmethod
+    def set(self, key: str, value: CachedResponse) -> None: ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    @abstractmethod
+    def __len__(self) -> int: ...
+
+    @abstractmethod
+    def close(self) -> None:
+        """
+        Release the resources of the storage, e.g. the connections.
+        """
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    In-memory LRU storage, the least recently used entry is evicted when the
+    number of entries exceeds `max_size`.
+    """
+
+    def __init__(self, max_size: int = 1024) -> None:
+        super().__init__()
+        self.max_size = max_size
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @override
+    def get(self, key: str) -> CachedResponse | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    @override
+    def set(self, key: str, value: CachedResponse) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    @override
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    @override
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    @override
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @override
+    def close(self) -> None:
+        pass
+
+
+class SqliteCacheBackend(CacheBackend):
+    """
+    Persistent storage in a single SQLite file, so a restarted process starts
+    warm. The file can be shared by many processes, it uses WAL journal mode and
+    each thread has its own connection.
+
+    When the total size of the stored contents exceeds `max_bytes`, the least
+    recently used entries are evicted. The access time of an entry is only
+    written when it's older than `touch_interval`, so most reads don't write.
+
+    Args:
+        path (Path): The SQLite file path.
+        max_bytes (int): The max total bytes of the contents, 256MB by default.
+        timeout (float): Seconds to wait for the lock held by other processes.
+        touch_interval (float): The seconds between the access time updates of
+            an entry.
+    """
+
+    def __init__(
+        self,
+        path: Path = CACHE_DIR / "response_cache.sqlite3",
+        max_bytes: int = 2**28,
+        timeout: float = 30,
+        touch_interval: float = 60,
+    ) -> None:
+        super().__init__()
+        self.path = path
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connect().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                status_code INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                content BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_accessed_at
+                ON responses (accessed_at);
+            """
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode, every statement is a transaction. The connection is
+            # only used by this thread, but `close` may close it from another one.
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._lock:
+                self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    @override
+    def get(self, key: str) -> CachedResponse | None:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT status_code, headers, content, stored_at, accessed_at "
+            "FROM responses WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        status_code, headers, content, stored_at, accessed_at = row
+        now = time.time()
+        if now - accessed_at >= self.touch_interval:
+            conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+        return CachedResponse(
+            status_code=status_code,
+            headers=[tuple(header) for header in json.loads(headers)],
+            content=content,
+            stored_at=stored_at,
+        )
+
+    @override
+    def set(self, key: str, value: CachedResponse) -> None:
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                value.status_code,
+                json.dumps(value.headers),
+                value.content,
+                len(value.content),
+                value.stored_at,
+                time.time(),
+            ),
+        )
+        self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        (total_bytes,) = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total_bytes <= self.max_bytes:
+            return
+        evicted_keys = []
+        for key, size in conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ):
+            if total_bytes <= self.max_bytes:
+                break
+            evicted_keys.append((key,))
+            total_bytes -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", evicted_keys)
+        self.evictions += len(evicted_keys)
+
+    @override
+    def delete(self, key: str) -> None:
+        self._connect().execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    @override
+    def clear(self) -> None:
+        self._connect().execute("DELETE FROM responses")
+
+    @override
+    def __len__(self) -> int:
+        (count,) = self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()
+        return count
+
+    @override
+    def close(self) -> None:
+        """
+        Close the connections of all threads, the next call opens a new one.
+        """
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for conn in connections:
+            conn.close()
+
+
+class ResponseCache:
+    """
+    Cache the successful GET responses per route.
+
+    The key is the route name and the sorted query parameters. A route is cached
+    only if it has a TTL in `ttls`. When an entry is older than its TTL but
+    younger than TTL + `stale_while_revalidate`, the stale response is served
+    immediately and the entry is refreshed in the background. An expired entry
+    with an `ETag` or `Last-Modified` header is revalidated by a conditional
+    request, and reused if the server answers 304 Not Modified.
+
+    Args:
+        ttls (dict[str, float]): TTL seconds of each route name.
+        backend (CacheBackend | None): Defaults to `MemoryCacheBackend(max_size)`.
+        max_size (int): The max entries of the default backend.
+        stale_while_revalidate (float): The seconds a stale entry can be served.
+    """
+
+    def __init__(
+        self,
+        ttls: dict[str, float],
+        backend: CacheBackend | None = None,
+        max_size: int = 1024,
+        stale_while_revalidate: float = 0,
+    ) -> None:
+        self.ttls = ttls
+        self.backend = backend if backend is not None else MemoryCacheBackend(max_size)
+        self.stale_while_revalidate = stale_while_revalidate
+        self._stats = ResponseCacheStats()
+        self._refreshing: set[str] = set()
+        self._refresh_tasks: set[asyncio.Task[Any]] = set()
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> ResponseCacheStats:
+        self._stats.evictions = self.backend.evictions
+        return self._stats
+
+    def is_cacheable(self, api_name: str | None) -> bool:
+        return api_name is not None and api_name in self.ttls
+
+    @staticmethod
+    def make_key(api_name: str, params: QueryParamTypes | None) -> str:
+        items = sorted(QueryParams(params).multi_items()) if params else []
+        return f"{api_name}?{urlencode(items)}"
+
+    def lookup(
+        self, api_name: str, key: str
+    ) -> tuple[CachedResponse | None, CacheStatus]:
+        """
+        Return the cached entry and its status. The expired entry is returned
+        as well, it can be used to revalidate.
+        """
+        entry = self.backend.get(key)
+        if entry is None:
+            status = CacheStatus.MISS
+        else:
+            age = entry.age
+            ttl = self.ttls[api_name]
+            if age <= ttl:
+                status = CacheStatus.FRESH
+            elif age <= ttl + self.stale_while_revalidate:
+                status = CacheStatus.STALE
+            else:
+                status = CacheStatus.EXPIRED
+        with self._lock:
+            match status:
+                case CacheStatus.FRESH:
+                    self._stats.hits += 1
+                case CacheStatus.STALE:
+                    self._stats.stale_hits += 1
+                case _:
+                    self._stats.misses += 1
+        return (entry, status)
+
+    def store(self, key: str, response: Response) -> None:
+        if response.is_success:
+            self.backend.set(key, CachedResponse.from_response(response))
+
+    def add_conditional_headers(
+        self, entry: CachedResponse | None, headers: HeaderTypes | None
+    ) -> HeaderTypes | None:
+        """
+        Add `If-None-Match` and `If-Modified-Since` to the request headers by
+        the validators of the entry.
+        """
+        if entry is None:
+            return headers
+        etag = entry.get_header("ETag")
+        last_modified = entry.get_header("Last-Modified")
+        if etag is None and last_modified is None:
+            return headers
+        conditional_headers = Headers(headers)
+        if etag is not None:
+            conditional_headers["If-None-Match"] = etag
+        if last_modified is not None:
+            conditional_headers["If-Modified-Since"] = last_modified
+        with self._lock:
+            self._stats.revalidations += 1
+        return conditional_headers
+
+    def update(
+        self, key: str, entry: CachedResponse | None, response: Response
+    ) -> Response:
+        """
+        Store the response of a (conditional) request, and return the response
+        for the caller. The entry is reused if the response is 304 Not Modified.
+        """
+        if entry is not None and response.status_code == HTTPStatus.NOT_MODIFIED:
+            with self._lock:
+                self._stats.not_modified += 1
+            entry = entry.model_copy(update={"stored_at": time.time()})
+            self.backend.set(key, entry)
+            return entry.to_response(response.request)
+        self.store(key, response)
+        return response
+
+    def _start_refresh(self, key: str) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self._stats.refreshes += 1
+            return True
+
+    def _finish_refresh(self, key: str) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def refresh(self, key: str, fetch: Callable[[], Any]) -> None:
+        """
+        Refresh the entry on a background thread, at most once per key at a time.
+        `fetch` has to send the request and update the entry.
+        """
+        if not self._start_refresh(key):
+            return
+
+        def _refresh() -> None:
+            try:
+                fetch()
+            except Exception:
+                log.exception(f"Failed to refresh the cache: {key}")
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=2, thread_name_prefix="ResponseCacheRefresh"
+                )
+        future = self._executor.submit(_refresh)
+        # The callback runs when the queued refresh is cancelled by close as well
+        future.add_done_callback(lambda _: self._finish_refresh(key))
+
+    def refresh_async(
+        self, key: str, fetch: Callable[[], Coroutine[Any, Any, Any]]
+    ) -> None:
+        """
+        Refresh the entry on a background task, at most once per key at a time.
+        """
+        if not self._start_refresh(key):
+            return
+
+        async def _refresh() -> None:
+            try:
+                await fetch()
+            except Exception:
+                log.exception(f"Failed to refresh the cache: {key}")
+
+        task = asyncio.create_task(_refresh())
+        # Keep a reference, otherwise the task may be garbage collected
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+        # The callback runs when the task is cancelled before it starts as well
+        task.add_done_callback(lambda _: self._finish_refresh(key))
+
+    async def wait_refreshes(self) -> None:
+        """
+        Wait for the background refreshes of the async clients started so far.
+        """
+        if self._refresh_tasks:
+            await asyncio.gather(*self._refresh_tasks, return_exceptions=True)
+
+    def close(self) -> None:
+        """
+        Drop the queued background refreshes, and wait for the running ones so
+        they don't use a closed client, then close the backend.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        for task in self._refresh_tasks:
+            task.cancel()
+        self.backend.close()
+
+    async def aclose(self) -> None:
+        """
+        Cancel the background refreshes of the async clients and wait for them.
+        """
+        tasks = list(self._refresh_tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self.close()
+
+    def clear(self) -> None:
+        self.backend.clear()
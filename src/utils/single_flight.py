@@ -0,0 +1,114 @@
+import asyncio
+import functools
+import threading
+from collections.abc import Awaitable, Callable, Hashable
+from concurrent.futures import Future
+from typing import Any
+
+from httpx import Headers, QueryParams
+from httpx._types import HeaderTypes, QueryParamTypes
+
+from src.utils.base_model import BaseModel
+
+
+class SingleFlightStats(BaseModel):
+    calls: int = 0
+    coalesced: int = 0
+
+
+class _AsyncCall:
+    def __init__(self, task: asyncio.Future[Any]) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key: only the first caller runs the
+    function, the others wait for it and receive the same result or exception.
+    `do` coalesces calls across threads, and `do_async` across tasks.
+    """
+
+    def __init__(self) -> None:
+        self.stats = SingleFlightStats()
+        self._calls: dict[Hashable, Future[Any]] = {}
+        self._async_calls: dict[Hashable, _AsyncCall] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        method: str,
+        url: str,
+        params: QueryParamTypes | None = None,
+        headers: HeaderTypes | None = None,
+    ) -> Hashable:
+        """
+        Requests are identical if they have the same method, url, query parameters
+        and headers, which include the auth header.
+        """
+        return (
+            method,
+            url,
+            tuple(sorted(QueryParams(params).multi_items())) if params else (),
+            tuple(sorted(Headers(headers).multi_items())) if headers else (),
+        )
+
+    def do[T](self, key: Hashable, func: Callable[[], T]) -> T:
+        with self._lock:
+            self.stats.calls += 1
+            future = self._calls.get(key)
+            is_leader = future is None
+            if future is None:
+                future = self._calls[key] = Future()
+            else:
+                self.stats.coalesced += 1
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def do_async[T](self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        The function runs in a task shared by the callers. A cancelled caller
+        stops waiting for it, and the task is only cancelled when all callers are
+        cancelled, so the others still receive the result.
+        """
+        with self._lock:
+            self.stats.calls += 1
+            call = self._async_calls.get(key)
+            if call is None:
+                call = self._async_calls[key] = _AsyncCall(
+                    asyncio.ensure_future(func())
+                )
+                call.task.add_done_callback(
+                    functools.partial(self._finish_async_call, key)
+                )
+            else:
+                self.stats.coalesced += 1
+            call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            with self._lock:
+                call.waiters -= 1
+                if call.waiters == 0:
+                    call.task.cancel()
+            raise
+
+    def _finish_async_call(self, key: Hashable, task: asyncio.Future[Any]) -> None:
+        with self._lock:
+            if (call := self._async_calls.get(key)) and call.task is task:
+                del self._async_calls[key]
+        # Mark the exception retrieved, in case all callers are cancelled
+        if not task.cancelled():
+            task.exception()
@@ -1 +1,2 @@
 type Router = dict[str, str]
+type BulkResult[K, T] = tuple[K, T | Exception]
@@ -1,5 +1,5 @@
 import json
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
 from typing import Any
 
@@ -44,3 +44,23 @@ class HelperFuncs:
                 return int(float(text[:-1]) * 1_000_000_000)
             case _:
                 return int(float(text))
+
+    @staticmethod
+    def split_date_range(
+        from_: str, to_: str, days: int, format_: str = "%Y-%m-%d"
+    ) -> list[tuple[str, str]]:
+        """
+        Split the inclusive date range into inclusive windows of `days` days,
+        e.g. ("2025-04-01", "2025-04-10") by 7 days is
+        [("2025-04-01", "2025-04-07"), ("2025-04-08", "2025-04-10")].
+        """
+        if days < 1:
+            raise ValueError(f"days must be positive, got {days}")
+        start = datetime.strptime(from_, format_)
+        end = datetime.strptime(to_, format_)
+        windows = []
+        while start <= end:
+            window_end = min(start + timedelta(days=days - 1), end)
+            windows.append((start.strftime(format_), window_end.strftime(format_)))
+            start = window_end + timedelta(days=1)
+        return windows
@@ -0,0 +1,262 @@
+import logging
+import random
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from httpx import Response
+from pydantic import Field, ValidationError
+
+from src.constants import DriftKind
+from src.utils.base_model import BaseModel, get_type_adapter
+from src.utils.json_codec import JsonCodec, get_json_codec
+
+log = logging.getLogger(__name__)
+
+
+class DriftAlert(BaseModel):
+    api_name: str
+    kind: DriftKind
+    # The field path, e.g. `result[].symbol`, `[]` is an item of a list
+    path: str
+    detail: str = ""
+
+
+class RouteSchemaStats(BaseModel):
+    responses: int = 0
+    validated: int = 0
+    invalid: int = 0
+    alerts: int = 0
+    # The validated responses which have each field path
+    fields: dict[str, int] = Field(default_factory=dict)
+    # The JSON types of each field path, e.g. {"c": {"number": 10}}
+    types: dict[str, dict[str, int]] = Field(default_factory=dict)
+
+
+def get_json_type(value: Any) -> str:
+    match value:
+        case None:
+            return "null"
+        case bool():
+            return "boolean"
+        # The integer prices are valid floats, so they're the same type
+        case int() | float():
+            return "number"
+        case str():
+            return "string"
+        case list():
+            return "array"
+        case _:
+            return "object"
+
+
+def collect_fields(
+    value: Any, path: str = "", fields: dict[str, set[str]] | None = None
+) -> dict[str, set[str]]:
+    """
+    The JSON types of each field path of a decoded payload.
+    """
+    if fields is None:
+        fields = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            item_path = f"{path}.{key}" if path else key
+            fields.setdefault(item_path, set()).add(get_json_type(item))
+            collect_fields(item, item_path, fields)
+    elif isinstance(value, list):
+        item_path = f"{path}[]"
+        for item in value:
+            fields.setdefault(item_path, set()).add(get_json_type(item))
+            collect_fields(item, item_path, fields)
+    return fields
+
+
+def get_parent_path(path: str) -> str:
+    if path.endswith("[]"):
+        return path[:-2]
+    return path.rpartition(".")[0]
+
+
+type _Drift = tuple[DriftKind, str, str]
+
+
+class _RouteState:
+    def __init__(self) -> None:
+        self.stats = RouteSchemaStats()
+        # The baseline of the warmup
+        self.known_types: dict[str, set[str]] = {}
+        self.always_present: set[str] | None = None
+        # Each drift is alerted once
+        self.alerted: set[_Drift] = set()
+
+    def update(self, fields: dict[str, set[str]], invalid: bool) -> None:
+        stats = self.stats
+        stats.validated += 1
+        stats.invalid += invalid
+        for path, types in fields.items():
+            stats.fields[path] = stats.fields.get(path, 0) + 1
+            counts = stats.types.setdefault(path, {})
+            for tp in types:
+                counts[tp] = counts.get(tp, 0) + 1
+
+    def learn(self, fields: dict[str, set[str]]) -> None:
+        for path, types in fields.items():
+            self.known_types.setdefault(path, set()).update(types)
+        if self.always_present is None:
+            self.always_present = set(fields)
+        else:
+            self.always_present &= fields.keys()
+
+    def get_drifts(self, fields: dict[str, set[str]]) -> list[_Drift]:
+        drifts = []
+        for path, types in fields.items():
+            known = self.known_types.setdefault(path, set())
+            if not known:
+                drifts.append((DriftKind.NEW_FIELD, path, ",".join(sorted(types))))
+            elif new_types := types - known:
+                drifts.append((DriftKind.NEW_TYPE, path, ",".join(sorted(new_types))))
+            known.update(types)
+        for path in self.always_present or ():
+            if path in fields or path.endswith("[]"):
+                continue
+            # The fields of the items of an empty list aren't missing
+            parent = get_parent_path(path)
+            if parent and parent not in fields:
+                continue
+            drifts.append((DriftKind.MISSING_FIELD, path, ""))
+        return drifts
+
+
+class ValidationPolicy:
+    """
+    Validate a sample of the responses of each route against its model, and alert
+    when the schema of the responses drifts, so the schema changes are caught
+    without decoding and validating every response.
+
+    The first `warmup` responses of each route are always validated, and their
+    fields and JSON types are the baseline. After the warmup, a validated response
+    raises a `DriftAlert` if it has a new field or a new type of a field, misses a
+    field of all warmup responses, or doesn't match the model. Each alert is
+    logged and passed to `on_drift` once per route.
+
+    It observes the responses and never raises, the responses are returned as
+    they are. It's thread-safe and shared by the sync and async api clients like
+    `RateLimiter`.
+    """
+
+    def __init__(
+        self,
+        models: dict[str, Any],
+        sample_rate: float = 0.01,
+        warmup: int = 100,
+        sample_rates: dict[str, float] | None = None,
+        on_drift: Callable[[DriftAlert], None] | None = None,
+        seed: int | None = None,
+        json_codec: JsonCodec | None = None,
+    ) -> None:
+        """
+        Args:
+            models (dict[str, Any]): The validation model of each route, e.g.
+                `FinnHubRouter.VALIDATE_MODELS`. The other routes aren't observed.
+            sample_rate (float): The ratio of the responses validated after the
+                warmup.
+            warmup (int): The responses of each route always validated after
+                startup, which are the baseline of the schema.
+            sample_rates (dict[str, float] | None): The sample rates of some
+                routes, which override `sample_rate`.
+            on_drift (Callable[[DriftAlert], None] | None): Called with each alert.
+            seed (int | None): The seed of the sampling.
+            json_codec (JsonCodec | None): The codec of the response bodies.
+        """
+        self.models = models
+        self.sample_rate = sample_rate
+        self.warmup = max(warmup, 1)
+        self.sample_rates = sample_rates or {}
+        self.on_drift = on_drift
+        self.json_codec = json_codec or get_json_codec()
+        self._random = random.Random(seed)
+        self._routes = {api_name: _RouteState() for api_name in models}
+        self._lock = threading.Lock()
+
+    def should_validate(self, api_name: str) -> bool:
+        """
+        Count a response of the route, and decide whether it's validated.
+        """
+        state = self._routes[api_name]
+        with self._lock:
+            state.stats.responses += 1
+            if state.stats.responses <= self.warmup:
+                return True
+            rate = self.sample_rates.get(api_name, self.sample_rate)
+            return self._random.random() < rate
+
+    def on_response(self, api_name: str | None, response: Response) -> None:
+        if api_name not in self._routes or not response.is_success:
+            return
+        if self.should_validate(api_name):
+            self.observe(api_name, response.content)
+
+    def observe(self, api_name: str, content: bytes) -> list[DriftAlert]:
+        """
+        Validate a response body, update the histograms of the route and return
+        the new alerts.
+        """
+        # The path and the type of each error
+        errors: list[tuple[str, str]] = []
+        try:
+            data = self.json_codec.loads(content)
+        except ValueError:
+            fields: dict[str, set[str]] = {}
+            errors.append(("", "json_invalid"))
+        else:
+            fields = collect_fields(data)
+            try:
+                get_type_adapter(self.models[api_name]).validate_python(data)
+            except ValidationError as e:
+                errors = [
+                    (".".join(str(loc) for loc in error["loc"]), error["type"])
+                    for error in e.errors(
+                        include_url=False, include_context=False, include_input=False
+                    )
+                ]
+
+        state = self._routes[api_name]
+        with self._lock:
+            state.update(fields, bool(errors))
+            drifts = []
+            # An empty payload, e.g. the profile of an unknown symbol, has no
+            # schema to learn or check
+            if fields and state.stats.validated <= self.warmup:
+                state.learn(fields)
+            elif fields:
+                drifts = state.get_drifts(fields)
+            drifts += [(DriftKind.INVALID, path, tp) for path, tp in errors]
+            drifts = [
+                drift for drift in dict.fromkeys(drifts) if drift not in state.alerted
+            ]
+            state.alerted.update(drifts)
+            state.stats.alerts += len(drifts)
+
+        alerts = [
+            DriftAlert(api_name=api_name, kind=kind, path=path, detail=detail)
+            for kind, path, detail in drifts
+        ]
+        for alert in alerts:
+            log.warning(
+                f"Schema drift of {api_name}: {alert.kind} {alert.path!r} "
+                f"{alert.detail}"
+            )
+            if self.on_drift is None:
+                continue
+            try:
+                self.on_drift(alert)
+            except Exception:
+                log.exception(f"The on_drift callback of {api_name} failed")
+        return alerts
+
+    def get_stats(self) -> dict[str, RouteSchemaStats]:
+        with self._lock:
+            return {
+                api_name: state.stats.model_copy(deep=True)
+                for api_name, state in self._routes.items()
+            }
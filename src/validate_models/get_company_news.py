@@ -1,4 +1,4 @@
-from pydantic import RootModel
+from pydantic import Field, RootModel
 
 from src.utils.base_model import BaseModel
 
@@ -7,6 +7,7 @@ class CompanyNews(BaseModel):
     category: str
     datetime: int
     headline: str
+    id: int | None = Field(default=None)
     image: str
     related: str
     source: str
@@ -1,11 +1,14 @@
 import logging
+import re
 from collections.abc import Generator
 from typing import Any, cast
 
 import pytest
 
-from src.constants import Browser
+from src.config import settings
+from src.constants import CASSETTE_DIR, Browser, CassetteMode
 from src.finnhub.finnhub_api_client import FinnHubApiClient
+from src.utils.cassette import Cassette, CassetteTransport
 from src.utils.utils import HelperFuncs
 from src.webdriver.driver_factory import WebDriver
 from src.webdriver.driver_generator import WebDriverGenerator
@@ -43,6 +46,14 @@ def pytest_addoption(parser: pytest.Parser) -> None:
         default=Browser.CHROME,
         help="Which drive will be used",
     )
+    parser.addoption(
+        "--cassette",
+        dest="cassette",
+        action="store",
+        type=CassetteMode,
+        default=CassetteMode.LIVE,
+        help="Send the api requests live, record them or replay them offline",
+    )
 
 
 @pytest.fixture()
@@ -60,5 +71,30 @@ def webdriver(request: pytest.FixtureRequest) -> Generator[WebDriver, Any, None]
 
 
 @pytest.fixture()
-def finhun_api_client() -> FinnHubApiClient:
-    return FinnHubApiClient()
+def finhun_api_client(
+    request: pytest.FixtureRequest,
+) -> Generator[FinnHubApiClient, Any, None]:
+    mode = cast(CassetteMode, request.config.getoption("--cassette"))
+    if mode == CassetteMode.LIVE:
+        client = FinnHubApiClient()
+    else:
+        module_name = request.node.path.stem
+        test_name = re.sub(r"[^\w.-]+", "_", request.node.name)
+        path = CASSETTE_DIR / module_name / f"{test_name}.json.gz"
+        if mode == CassetteMode.REPLAY and not path.exists():
+            # The cassettes are recorded with a real API key, they aren't in the
+            # repo until someone records them
+            pytest.skip(
+                f"The cassette {path.relative_to(CASSETTE_DIR)} isn't recorded, "
+                "record it by `--cassette record` with FINN_HUB_API_KEY"
+            )
+        cassette = Cassette(
+            path,
+            mode,
+            match_headers=["X-Finnhub-Token"],
+            secrets={settings.FINN_HUB_API_KEY: "<FINN_HUB_API_KEY>"},
+        )
+        client = FinnHubApiClient(transport=CassetteTransport(cassette))
+    yield client
+    # It saves the recorded cassette
+    client.close()
@@ -0,0 +1,52 @@
+import pytest
+
+from benchmarks.load_test import iter_routes, run_stage
+from src.config import settings
+from src.finnhub.stand_in_server import StandInServer
+
+ROUTE_KEYS = {
+    "requests",
+    "errors",
+    "error_rate",
+    "outcomes",
+    "p50_ms",
+    "p95_ms",
+    "p99_ms",
+    "max_ms",
+}
+
+
+class TestLoadTest:
+    def test_iter_routes_follows_mix(self) -> None:
+        routes = iter_routes({"quote": 3, "company_profile": 1})
+        names = [next(routes)[0] for _ in range(8)]
+        assert names.count("quote") == 6
+        assert names.count("company_profile") == 2
+
+    @pytest.mark.parametrize("mode", ["sync", "async"])
+    def test_closed_loop_stage(
+        self, mode: str, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        with StandInServer() as server:
+            monkeypatch.setattr(settings, "FINN_HUB_HOST", server.url)
+            stage = run_stage(
+                mode, {"quote": 1, "company_profile": 1}, None, 0.2, concurrency=2
+            )
+        assert stage["mode"] == mode
+        assert stage["target_rps"] is None
+        assert stage["concurrency"] == 2
+        assert stage["requests"] > 0
+        assert stage["error_rate"] == 0
+        assert stage["achieved_rps"] > 0
+        assert {
+            "elapsed_seconds",
+            "cpu_seconds",
+            "cpu_percent",
+            "process_peak_rss_mb",
+        } <= stage.keys()
+        assert stage["routes"].keys() == {"quote", "company_profile"}
+        for route in stage["routes"].values():
+            assert route.keys() == ROUTE_KEYS
+            assert route["outcomes"] == {"ok": route["requests"]}
+            assert route["p50_ms"] <= route["p95_ms"] <= route["p99_ms"]
+            assert route["p99_ms"] <= route["max_ms"]
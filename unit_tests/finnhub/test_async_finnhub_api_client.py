@@ -0,0 +1,46 @@
+import asyncio
+
+from httpx import MockTransport, Request, Response
+
+from src.finnhub.finnhub_api_client import AsyncFinnHubApiClient
+
+
+class TestAsyncFinnHubApiClient:
+    def test_gather_keeps_order_and_caps_concurrency(self) -> None:
+        running = 0
+        max_running = 0
+
+        async def handler(request: Request) -> Response:
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return Response(200, json={"symbol": request.url.params["symbol"]})
+
+        async def run() -> list[str]:
+            client = AsyncFinnHubApiClient(transport=MockTransport(handler))
+            symbols = [f"S{i}" for i in range(20)]
+            responses = await client.gather(
+                (client.get_quote(symbol) for symbol in symbols), max_concurrency=4
+            )
+            await client.aclose()
+            return [res.json()["symbol"] for res in responses]
+
+        assert asyncio.run(run()) == [f"S{i}" for i in range(20)]
+        assert max_running == 4
+
+    def test_request_api_uses_router_url_and_auth_headers(self) -> None:
+        async def handler(request: Request) -> Response:
+            assert request.url.path == "/api/v1/stock/profile2"
+            assert request.url.params["symbol"] == "AAPL"
+            assert "X-Finnhub-Token" in request.headers
+            return Response(200, json={})
+
+        async def run() -> int:
+            client = AsyncFinnHubApiClient(transport=MockTransport(handler))
+            res = await client.get_company_profile(symbol="AAPL", isin="US0378331005")
+            await client.aclose()
+            return res.status_code
+
+        assert asyncio.run(run()) == 200
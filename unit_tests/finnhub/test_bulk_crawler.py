@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import pytest
+
+from src.config import settings
+from src.constants import CrawlFormat
+from src.finnhub.bulk_crawler import BulkCrawler, iter_records
+from src.finnhub.stand_in_server import StandInServer
+from src.utils.rate_limiter import RateLimit, SharedRateBudget
+
+SYMBOLS = [f"SYM{i}" for i in range(30)]
+
+
+def read_symbols(output_dir: Path, route: str) -> list[str]:
+    return [
+        record["symbol"]
+        for path in sorted(output_dir.glob(f"{route}-part-*.gz"))
+        for record in iter_records(path)
+    ]
+
+
+class TestBulkCrawler:
+    @pytest.mark.parametrize("format", list(CrawlFormat))
+    def test_crawl_and_resume(
+        self, format: CrawlFormat, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        with StandInServer() as server:
+            monkeypatch.setattr(settings, "FINN_HUB_HOST", server.url)
+            crawler = BulkCrawler(tmp_path, format=format, workers=2, batch_size=4)
+            report = crawler.run(SYMBOLS[:20])
+            assert report.written == {"quote": 20, "company_profile": 20}
+            assert sorted(read_symbols(tmp_path, "quote")) == sorted(SYMBOLS[:20])
+            record = next(iter_records(next(tmp_path.glob("quote-part-*.gz"))))
+            assert {"symbol", "c", "pc", "t"} <= record.keys()
+
+            # Only the new symbols are requested again
+            requests = server.stats.requests
+            report = crawler.run(SYMBOLS)
+            assert report.resumed == {"quote": 20, "company_profile": 20}
+            assert report.written == {"quote": 10, "company_profile": 10}
+            assert server.stats.requests - requests == 20
+        for route in ("quote", "company_profile"):
+            assert sorted(read_symbols(tmp_path, route)) == sorted(SYMBOLS)
+
+    def test_torn_tail_is_truncated(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        with StandInServer() as server:
+            monkeypatch.setattr(settings, "FINN_HUB_HOST", server.url)
+            crawler = BulkCrawler(
+                tmp_path,
+                routes=["quote"],
+                workers=1,
+                batch_size=4,
+                calls_per_second=500,
+            )
+            crawler.run(SYMBOLS[:10])
+            # A batch torn by a crash, which isn't in the checkpoint
+            part_path = tmp_path / "quote-part-000.ndjson.gz"
+            with open(part_path, "ab") as wf:
+                wf.write(b"\x1f\x8b\x08\x00torn")
+            crawler.run(SYMBOLS[:15])
+        assert sorted(read_symbols(tmp_path, "quote")) == sorted(SYMBOLS[:15])
+
+    def test_settings_are_the_shared_budget(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(settings, "FINN_HUB_CALLS_PER_SECOND", None)
+        monkeypatch.setattr(settings, "FINN_HUB_CALLS_PER_MINUTE", 300)
+        crawler = BulkCrawler(tmp_path)
+        assert crawler.rate_limits == [RateLimit(calls=300, period=60)]
+        crawler = BulkCrawler(tmp_path, calls_per_second=5)
+        assert crawler.rate_limits == [RateLimit(calls=5, period=1)]
+
+    def test_unknown_route(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError, match="Unknown routes"):
+            BulkCrawler(tmp_path, routes=["candles"])
+
+
+class TestSharedRateBudget:
+    def test_reserve(self) -> None:
+        budget = SharedRateBudget([RateLimit(calls=2, period=1)])
+        assert budget.reserve(1) == 0
+        assert budget.reserve(1) == 0
+        assert budget.reserve(1) == pytest.approx(0.5, abs=0.05)
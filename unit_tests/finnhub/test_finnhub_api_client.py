@@ -0,0 +1,216 @@
+import asyncio
+import importlib.util
+import json
+import logging
+from datetime import UTC, datetime, timedelta
+from typing import Any, cast
+
+import pytest
+from httpx import (
+    AsyncHTTPTransport,
+    HTTPStatusError,
+    HTTPTransport,
+    MockTransport,
+    Request,
+    Response,
+)
+from pydantic import ValidationError
+
+from src.config import settings
+from src.finnhub.finnhub_api_client import AsyncFinnHubApiClient, FinnHubApiClient
+from src.finnhub.synthetic_data import SyntheticData
+from src.validate_models.get_company_news import CompanyNews
+from src.validate_models.get_quote import GetQuoteResponse
+from src.validate_models.get_symbol_lookup import GetSymbolLookupResponse
+
+QUOTE = {"c": 1.0, "h": 2.0, "l": 0.5, "o": 1.5, "pc": 1.2, "t": 1700000000}
+
+
+def quote_handler(request: Request) -> Response:
+    match request.url.params["symbol"]:
+        case "UNAUTHORIZED":
+            return Response(401, json={"error": "Invalid API key"})
+        case "LIMITED":
+            return Response(429, json={"error": "API limit reached"})
+        case _:
+            return Response(200, json=QUOTE)
+
+
+class TestFinnHubApiClientBulk:
+    def test_get_quotes_reports_errors_without_aborting(self) -> None:
+        client = FinnHubApiClient(transport=MockTransport(quote_handler))
+        symbols = ["AAPL", "UNAUTHORIZED", "TSM", "LIMITED"] + [
+            f"S{i}" for i in range(50)
+        ]
+        results = dict(client.get_quotes(symbols, max_workers=4))
+
+        assert set(results) == set(symbols)
+        assert isinstance(results["AAPL"], GetQuoteResponse)
+        assert isinstance(results["UNAUTHORIZED"], HTTPStatusError)
+        assert isinstance(results["LIMITED"], HTTPStatusError)
+        assert results["LIMITED"].response.status_code == 429
+
+    def test_get_quotes_is_lazy(self) -> None:
+        client = FinnHubApiClient(transport=MockTransport(quote_handler))
+        results = client.get_quotes((f"S{i}" for i in range(1000)), max_workers=2)
+        symbol, quote = next(results)
+        results.close()
+        assert isinstance(quote, GetQuoteResponse)
+
+
+class TestFinnHubApiClientStreaming:
+    def test_iter_company_news(self) -> None:
+        news = [
+            {
+                "category": "company",
+                "datetime": 1744243200 + i,
+                "headline": f"headline {i}",
+                "id": i,
+                "image": "",
+                "related": "AAPL",
+                "source": "Yahoo",
+                "summary": "summary",
+                "url": f"https://example.com/{i}",
+            }
+            for i in range(100)
+        ]
+        body = json.dumps(news).encode()
+
+        def handler(request: Request) -> Response:
+            chunks = (body[i : i + 100] for i in range(0, len(body), 100))
+            return Response(200, content=chunks)
+
+        client = FinnHubApiClient(transport=MockTransport(handler))
+        items = list(client.iter_company_news("AAPL", "2025-04-01", "2025-04-10"))
+        assert [item.url for item in items] == [item["url"] for item in news]
+        assert all(isinstance(item, CompanyNews) for item in items)
+
+    def test_iter_company_news_raises_http_error(self) -> None:
+        client = FinnHubApiClient(transport=MockTransport(quote_handler))
+        with pytest.raises(HTTPStatusError):
+            next(client.iter_company_news("UNAUTHORIZED", "2025-04-01", "2025-04-10"))
+
+
+def news_handler(request: Request) -> Response:
+    """
+    One news per day in the requested window, and the same news which belongs
+    to every window, in descending datetime order like Finnhub.
+    """
+    date_format = "%Y-%m-%d"
+    start = datetime.strptime(request.url.params["from"], date_format)
+    end = datetime.strptime(request.url.params["to"], date_format)
+    news = [make_news(0, int(start.replace(tzinfo=UTC).timestamp()))]
+    while start <= end:
+        ts = int(start.replace(tzinfo=UTC).timestamp())
+        news.append(make_news(ts, ts))
+        start += timedelta(days=1)
+    return Response(200, json=news[::-1])
+
+
+def make_news(id_: int, ts: int) -> dict[str, Any]:
+    return {
+        "category": "company",
+        "datetime": ts,
+        "headline": "headline",
+        "id": id_,
+        "image": "",
+        "related": "AAPL",
+        "source": "Yahoo",
+        "summary": "summary",
+        "url": f"https://example.com/{id_}",
+    }
+
+
+class TestFinnHubApiClientShardedNews:
+    def test_iter_company_news_sharded(self) -> None:
+        client = FinnHubApiClient(transport=MockTransport(news_handler))
+        news = list(
+            client.iter_company_news_sharded(
+                "AAPL", "2025-01-01", "2025-03-31", window_days=10
+            )
+        )
+        datetimes = [item.datetime for item in news]
+        assert datetimes == sorted(datetimes)
+        assert len({item.url for item in news}) == len(news) == 90 + 1
+
+    def test_iter_company_news_sharded_async(self) -> None:
+        async def run() -> list[CompanyNews]:
+            client = AsyncFinnHubApiClient(transport=MockTransport(news_handler))
+            news = [
+                item
+                async for item in client.iter_company_news_sharded(
+                    "AAPL", "2025-01-01", "2025-01-31", window_days=3
+                )
+            ]
+            await client.aclose()
+            return news
+
+        news = asyncio.run(run())
+        datetimes = [item.datetime for item in news]
+        assert datetimes == sorted(datetimes)
+        assert len({item.url for item in news}) == len(news) == 31 + 1
+
+
+class TestFinnHubApiClientModels:
+    def test_request_model_decodes_bytes(self) -> None:
+        def handler(request: Request) -> Response:
+            if request.url.path.endswith("/search"):
+                return Response(200, json=SyntheticData.symbol_lookup("apple", 3))
+            if request.url.params["symbol"] == "BROKEN":
+                return Response(200, json={"c": "not a number"})
+            return quote_handler(request)
+
+        client = FinnHubApiClient(transport=MockTransport(handler))
+        assert client.get_quote_model("AAPL") == GetQuoteResponse.model_validate(QUOTE)
+        lookup = client.get_symbol_lookup_model("apple")
+        assert isinstance(lookup, GetSymbolLookupResponse)
+        assert lookup.result[0].display_symbol == "APPLE"
+        with pytest.raises(ValidationError):
+            client.get_quote_model("BROKEN")
+        with pytest.raises(HTTPStatusError):
+            client.get_quote_model("UNAUTHORIZED")
+
+    def test_request_model_async(self) -> None:
+        async def run() -> list[CompanyNews]:
+            client = AsyncFinnHubApiClient(transport=MockTransport(news_handler))
+            news = await client.request_model(
+                "company_news",
+                list[CompanyNews],
+                params={"symbol": "AAPL", "from": "2025-01-01", "to": "2025-01-02"},
+            )
+            await client.aclose()
+            return news
+
+        news = asyncio.run(run())
+        assert news and all(isinstance(item, CompanyNews) for item in news)
+
+
+class TestFinnHubApiClientPool:
+    def test_pool_follows_settings(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        warnings: list[str] = []
+        monkeypatch.setattr(logging.getLogger(), "warning", warnings.append)
+        monkeypatch.setattr(settings, "HTTP_MAX_CONNECTIONS", 7)
+        monkeypatch.setattr(settings, "HTTP_MAX_KEEPALIVE_CONNECTIONS", 3)
+        monkeypatch.setattr(settings, "HTTP_KEEPALIVE_EXPIRY", 1.5)
+        monkeypatch.setattr(settings, "HTTP2", True)
+        http2 = importlib.util.find_spec("h2") is not None
+
+        client = FinnHubApiClient()
+        sync_pool = cast(HTTPTransport, client.client._transport)._pool
+        client.close()
+
+        async def run() -> AsyncFinnHubApiClient:
+            async_client = AsyncFinnHubApiClient()
+            await async_client.aclose()
+            return async_client
+
+        async_client = asyncio.run(run())
+        async_pool = cast(AsyncHTTPTransport, async_client.client._transport)._pool
+        for pool in (sync_pool, async_pool):
+            assert pool._max_connections == 7
+            assert pool._max_keepalive_connections == 3
+            assert pool._keepalive_expiry == 1.5
+            assert pool._http2 is http2
+        # Without h2, each client falls back to HTTP/1.1 with a warning
+        assert len(warnings) == (0 if http2 else 2)
+        assert all("h2" in warning for warning in warnings)
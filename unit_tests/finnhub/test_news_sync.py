@@ -0,0 +1,131 @@
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+from httpx import MockTransport, Request, Response
+
+from src.finnhub.finnhub_api_client import FinnHubApiClient
+from src.finnhub.news_sync import NewsSync, SeenIndex
+from src.finnhub.synthetic_data import SyntheticData
+from src.validate_models.get_company_news import CompanyNews
+
+SHARED_NEWS: dict[str, Any] = {
+    "category": "company",
+    "datetime": 1743552000,
+    "headline": "AAPL and MSFT headline",
+    "id": 1,
+    "image": "",
+    "related": "AAPL,MSFT",
+    "source": "Reuters",
+    "summary": "",
+    "url": "https://finnhub.io/api/news?id=1",
+}
+
+
+class StubNewsServer:
+    def __init__(self) -> None:
+        self.windows: list[tuple[str, str, str]] = []
+
+    def handler(self, request: Request) -> Response:
+        params = request.url.params
+        window = (params["symbol"], params["from"], params["to"])
+        self.windows.append(window)
+        news = SyntheticData.company_news(*window)
+        if params["from"] <= "2025-04-02" <= params["to"]:
+            news.append(SHARED_NEWS)
+        return Response(200, json=news)
+
+
+class TestNewsSync:
+    def test_incremental_sync(self, tmp_path: Path) -> None:
+        server = StubNewsServer()
+        client = FinnHubApiClient(transport=MockTransport(server.handler))
+        news_sync = NewsSync(client, tmp_path, initial_days=3)
+        news = news_sync.sync(["AAPL", "MSFT"], today=date(2025, 4, 3))
+        # 5 news a day of each symbol, and the shared one once
+        assert len(news) == 2 * 3 * 5 + 1
+        assert [item.url for item in news].count(SHARED_NEWS["url"]) == 1
+        assert news == sorted(news, key=lambda item: item.datetime)
+        assert sorted(server.windows) == [
+            ("AAPL", "2025-04-01", "2025-04-03"),
+            ("MSFT", "2025-04-01", "2025-04-03"),
+        ]
+        news_sync.commit()
+
+        # A new process resumes from the saved high-water marks and index
+        server.windows.clear()
+        news_sync = NewsSync(client, tmp_path, initial_days=3)
+        assert news_sync.sync(["AAPL", "MSFT"], today=date(2025, 4, 3)) == []
+        news = news_sync.sync(["AAPL", "MSFT"], today=date(2025, 4, 4))
+        news_sync.commit()
+        assert len(news) == 2 * 5
+        assert {item.datetime >= 1743724800 for item in news} == {True}
+        assert news_sync.stats.fetched == 2 * 2 * 5
+        assert ("AAPL", "2025-04-03", "2025-04-04") in server.windows
+        client.close()
+
+    def test_failed_symbol_is_retried(self, tmp_path: Path) -> None:
+        server = StubNewsServer()
+        failed = {"MSFT"}
+
+        def handler(request: Request) -> Response:
+            if request.url.params["symbol"] in failed:
+                return Response(500)
+            return server.handler(request)
+
+        client = FinnHubApiClient(transport=MockTransport(handler))
+        news_sync = NewsSync(client, tmp_path, initial_days=1)
+        assert len(news_sync.sync(["AAPL", "MSFT"], today=date(2025, 4, 1))) == 5
+        news_sync.commit()
+        assert news_sync.stats.errors == 1
+        assert "MSFT" not in news_sync.watermarks
+
+        failed.clear()
+        assert len(news_sync.sync(["AAPL", "MSFT"], today=date(2025, 4, 1))) == 5
+        client.close()
+
+    def test_news_is_returned_again_until_committed(self, tmp_path: Path) -> None:
+        server = StubNewsServer()
+        client = FinnHubApiClient(transport=MockTransport(server.handler))
+        today = date(2025, 4, 1)
+        news_sync = NewsSync(client, tmp_path, initial_days=1)
+        news = news_sync.sync(["AAPL"], today=today)
+        assert len(news) == 5
+        # The same process doesn't return them twice
+        assert news_sync.sync(["AAPL"], today=today) == []
+
+        # A crash before the commit, e.g. the caller failed to store the news
+        news_sync = NewsSync(client, tmp_path, initial_days=1)
+        assert news_sync.sync(["AAPL"], today=today) == news
+        news_sync.rollback()
+        assert news_sync.sync(["AAPL"], today=today) == news
+        news_sync.commit()
+
+        news_sync = NewsSync(client, tmp_path, initial_days=1)
+        assert news_sync.sync(["AAPL"], today=today) == []
+        client.close()
+
+
+class TestSeenIndex:
+    def test_persist_and_grow(self, tmp_path: Path) -> None:
+        news = [
+            CompanyNews.model_validate(item)
+            for item in SyntheticData.company_news("AAPL", "2025-04-01", "2025-04-10")
+        ]
+        index = SeenIndex(tmp_path, capacity=10)
+        assert all(index.is_new(item) for item in news[:30])
+        index.save()
+        assert len(index) == 60
+
+        index = SeenIndex(tmp_path, capacity=10)
+        assert not any(index.is_new(item) for item in news[:30])
+        assert all(index.is_new(item) for item in news[30:])
+        # A news with a seen url is seen
+        item = news[0].model_copy(update={"id": None})
+        assert not index.is_new(item)
+
+        # The filter is rebuilt from the index if it's lost
+        index.save()
+        index.bloom_path.unlink()
+        index = SeenIndex(tmp_path)
+        assert not any(index.is_new(item) for item in news)
@@ -0,0 +1,121 @@
+import asyncio
+from collections import Counter
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from httpx import MockTransport, Request, Response
+
+from src.finnhub.finnhub_api_client import AsyncFinnHubApiClient
+from src.finnhub.quote_scheduler import MarketHours, QuoteScheduler, WatchlistItem
+from src.validate_models.get_quote import GetQuoteResponse
+
+NEW_YORK = ZoneInfo("America/New_York")
+# Wednesday
+OPEN_TS = datetime(2025, 4, 16, 10, 0, tzinfo=NEW_YORK).timestamp()
+CLOSED_TS = datetime(2025, 4, 19, 10, 0, tzinfo=NEW_YORK).timestamp()
+
+
+def make_quote(price: float) -> GetQuoteResponse:
+    return GetQuoteResponse(c=price, h=price, l=price, o=price, pc=price, t=0)
+
+
+def simulate(
+    scheduler: QuoteScheduler, prices: dict[str, list[float]], slots: int
+) -> Counter[str]:
+    fetched: Counter[str] = Counter()
+    now = OPEN_TS
+    for _ in range(slots):
+        symbol = scheduler.next_symbol(now)
+        if symbol is not None:
+            price = prices[symbol][fetched[symbol] % len(prices[symbol])]
+            scheduler.on_quote(symbol, make_quote(price), now)
+            fetched[symbol] += 1
+        now += scheduler.interval
+    return fetched
+
+
+class TestQuoteScheduler:
+    def test_market_hours(self) -> None:
+        hours = MarketHours()
+        assert hours.is_open(OPEN_TS)
+        assert not hours.is_open(CLOSED_TS)
+        assert not hours.is_open(
+            datetime(2025, 4, 16, 16, 0, tzinfo=NEW_YORK).timestamp()
+        )
+
+    def test_budget_follows_priority_and_volatility(self) -> None:
+        scheduler = QuoteScheduler(
+            [
+                WatchlistItem(symbol="HOT", priority=1),
+                WatchlistItem(symbol="VIP", priority=4),
+                WatchlistItem(symbol="COLD", priority=1),
+            ],
+            requests_per_minute=60,
+        )
+        prices: dict[str, list[float]] = {
+            "HOT": [1, 2, 3, 4, 5],
+            "VIP": [1, 2, 3, 4, 5],
+            "COLD": [1],
+        }
+        fetched = simulate(scheduler, prices, 600)
+        # The weights are 4 * 1.05, 1 * 1.05 and 1 * 0.05
+        assert fetched["VIP"] > 2.5 * fetched["HOT"]
+        assert fetched["HOT"] > 5 * fetched["COLD"]
+        assert fetched["COLD"] >= 5
+
+        end = OPEN_TS + 600 * scheduler.interval
+        reports = {report.symbol: report for report in scheduler.report(end)}
+        assert reports["COLD"].change_rate < 0.05
+        assert reports["HOT"].change_rate > 0.99
+        # The observed intervals meet the planned ones
+        for symbol, interval in scheduler.get_target_intervals(end).items():
+            assert 600 / fetched[symbol] < interval * 1.5
+
+    def test_skip_closed_market(self) -> None:
+        watchlist = [
+            WatchlistItem(symbol="AAPL"),
+            WatchlistItem(symbol="BTC", always_open=True),
+        ]
+        scheduler = QuoteScheduler(watchlist, requests_per_minute=60)
+        # The first fetch of each symbol even if the market is closed
+        first = {scheduler.next_symbol(CLOSED_TS), scheduler.next_symbol(CLOSED_TS)}
+        assert first == {"AAPL", "BTC"}
+        scheduler.on_quote("AAPL", make_quote(1), CLOSED_TS)
+        scheduler.on_quote("BTC", make_quote(1), CLOSED_TS)
+        assert scheduler.next_symbol(CLOSED_TS + 1) == "BTC"
+        scheduler.on_error("BTC")
+        assert scheduler.next_symbol(CLOSED_TS + 2) == "BTC"
+        assert scheduler.next_symbol(CLOSED_TS + 3) is None
+
+        reports = {report.symbol: report for report in scheduler.report(CLOSED_TS)}
+        assert not reports["AAPL"].is_open
+        assert reports["AAPL"].target_interval is None
+        assert reports["BTC"].errors == 1
+
+    def test_run_emits_changed_quotes(self) -> None:
+        calls: Counter[str] = Counter()
+
+        async def handler(request: Request) -> Response:
+            symbol = request.url.params["symbol"]
+            calls[symbol] += 1
+            # The price changes every other call
+            price = 100 + calls[symbol] // 2
+            return Response(200, json=make_quote(price).model_dump())
+
+        async def run() -> list[tuple[str, float]]:
+            client = AsyncFinnHubApiClient(transport=MockTransport(handler))
+            scheduler = QuoteScheduler(
+                [WatchlistItem(symbol="AAPL")],
+                requests_per_minute=6000,
+                market_hours=None,
+            )
+            updates = []
+            async for symbol, quote in scheduler.run(client):
+                updates.append((symbol, quote.c))
+                if len(updates) == 3:
+                    break
+            await client.aclose()
+            return updates
+
+        assert asyncio.run(run()) == [("AAPL", 100), ("AAPL", 101), ("AAPL", 102)]
+        assert calls["AAPL"] >= 4
@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import pytest
+
+from src.finnhub.quote_store import QuoteSeries, QuoteSeriesStore
+from src.validate_models.get_quote import GetQuoteResponse
+
+
+def make_quote(t: int, price: float) -> GetQuoteResponse:
+    return GetQuoteResponse(
+        c=price, h=price + 1, l=price - 1, o=price, pc=price - 0.5, t=t
+    )
+
+
+class TestQuoteSeries:
+    def test_keep_latest_capacity(self) -> None:
+        series = QuoteSeries.create(capacity=8)
+        for t in range(100):
+            assert series.append_quote(make_quote(t, 100 + t))
+        assert len(series) == 8
+        assert list(series.columns().t) == list(range(92, 100))
+        assert series.get_quote(-1) == make_quote(99, 199)
+        assert [quote.t for quote in series] == list(range(92, 100))
+        # A snapshot takes 60 bytes with the spare slots
+        assert series.nbytes < 80 * 8
+
+        # The same timestamp is skipped, and the older one is rejected
+        assert not series.append_quote(make_quote(99, 1))
+        with pytest.raises(ValueError):
+            series.append_quote(make_quote(50, 1))
+
+    def test_time_range_is_zero_copy(self) -> None:
+        series = QuoteSeries.create(capacity=100)
+        for t in range(0, 100, 10):
+            series.append_quote(make_quote(t, t))
+        columns = series.columns(start_t=25, end_t=60)
+        assert list(columns.t) == [30, 40, 50]
+        assert list(columns.c) == [30.0, 40.0, 50.0]
+        assert columns.c.obj is series._buffer
+
+    def test_stats(self) -> None:
+        series = QuoteSeries.create(capacity=100)
+        for t, price in [(0, 10), (10, 11), (30, 9.9), (40, 12)]:
+            series.append_quote(make_quote(t, price))
+        stats = series.stats()
+        assert stats.count == 4
+        assert stats.low == 8.9
+        assert stats.high == 13
+        assert stats.mean == pytest.approx(10.725)
+        assert stats.twap == pytest.approx((10 * 10 + 11 * 20 + 9.9 * 10) / 40)
+        assert stats.total_return == pytest.approx(0.2)
+        assert series.returns() == pytest.approx([0.1, -0.1, 12 / 9.9 - 1])
+        assert series.stats(start_t=100).count == 0
+
+        assert series.rolling_mean(2) == pytest.approx([10.5, 10.45, 10.95])
+        assert series.rolling_min(2) == [10, 9.9, 9.9]
+        assert series.rolling_max(3) == [11, 12]
+        for rolling in (series.rolling_mean, series.rolling_min, series.rolling_max):
+            with pytest.raises(ValueError):
+                rolling(0)
+
+
+class TestQuoteSeriesStore:
+    def test_reload_from_files(self, tmp_path: Path) -> None:
+        with QuoteSeriesStore(tmp_path, capacity=16) as store:
+            for t in range(20):
+                store.append("AAPL", make_quote(t, 100 + t))
+            store.append("BINANCE:BTCUSDT", make_quote(1, 60000))
+
+        with QuoteSeriesStore(tmp_path, capacity=1000) as store:
+            assert sorted(store.symbols) == ["AAPL", "BINANCE:BTCUSDT"]
+            series = store["AAPL"]
+            # The capacity of the file is kept
+            assert series.capacity == 16
+            assert list(series.columns().t) == list(range(4, 20))
+            assert store["BINANCE:BTCUSDT"].get_quote(0) == make_quote(1, 60000)
+            store.append("AAPL", make_quote(20, 120))
+            assert len(series) == 16
@@ -0,0 +1,86 @@
+from collections.abc import Iterator
+
+import httpx
+import pytest
+
+from src.constants import LatencyDistribution
+from src.finnhub.stand_in_server import StandInConfig, StandInServer
+from src.validate_models.get_company_news import CompanyNews
+from src.validate_models.get_company_profile import GetCompanyProfileResponse
+from src.validate_models.get_quote import GetQuoteResponse
+from src.validate_models.get_symbol_lookup import GetSymbolLookupResponse
+
+TOKEN = {"X-Finnhub-Token": "stand-in-token"}
+
+
+@pytest.fixture()
+def server() -> Iterator[StandInServer]:
+    with StandInServer(StandInConfig(api_keys={"stand-in-token"}, seed=1)) as server:
+        yield server
+
+
+class TestStandInServer:
+    def test_payloads_match_models(self, server: StandInServer) -> None:
+        with httpx.Client(base_url=server.url, headers=TOKEN) as client:
+            res = client.get("/api/v1/search", params={"q": "apple"})
+            GetSymbolLookupResponse.model_validate_json(res.content)
+            res = client.get("/api/v1/stock/profile2", params={"symbol": "AAPL"})
+            GetCompanyProfileResponse.model_validate_json(res.content)
+            res = client.get("/api/v1/quote", params={"symbol": "AAPL"})
+            GetQuoteResponse.model_validate_json(res.content)
+            res = client.get(
+                "/api/v1/company-news",
+                params={"symbol": "AAPL", "from": "2025-04-01", "to": "2025-04-10"},
+            )
+            assert res.headers["Content-Encoding"] == "gzip"
+            news = [CompanyNews.model_validate(item) for item in res.json()]
+            assert len(news) == 10 * server.config.news_per_day
+
+            # The same payload is 304 with its ETag
+            res = client.get(
+                "/api/v1/company-news",
+                params={"symbol": "AAPL", "from": "2025-04-01", "to": "2025-04-10"},
+                headers={"If-None-Match": res.headers["ETag"]},
+            )
+            assert res.status_code == 304
+            assert client.get("/api/v1/unknown").status_code == 404
+        assert server.stats.routes["company_news"] == 2
+
+    def test_unauthorized_and_quotas(self, server: StandInServer) -> None:
+        server.config.calls_per_minute = 3
+        with httpx.Client(base_url=server.url) as client:
+            res = client.get("/api/v1/quote", params={"symbol": "AAPL"})
+            assert res.status_code == 401
+            res = client.get("/api/v1/quote", params={"symbol": "A", "token": "bad"})
+            assert res.status_code == 401
+
+            statuses = [
+                client.get("/api/v1/quote", params={"symbol": "A"}, headers=TOKEN)
+                for _ in range(4)
+            ]
+        assert [res.status_code for res in statuses] == [200, 200, 200, 429]
+        assert statuses[0].headers["X-Ratelimit-Remaining"] == "2"
+        assert 0 < int(statuses[-1].headers["Retry-After"]) <= 60
+        assert server.stats.unauthorized == 2
+        assert server.stats.rate_limited == 1
+
+    def test_injected_errors_and_timeouts(self, server: StandInServer) -> None:
+        server.config.error_rate = 1
+        server.config.error_statuses = [503]
+        with httpx.Client(base_url=server.url, headers=TOKEN) as client:
+            assert client.get("/api/v1/quote?symbol=A").status_code == 503
+            server.config.timeout_rate = 1
+            server.config.timeout_seconds = 0.3
+            with pytest.raises(httpx.ReadTimeout):
+                client.get("/api/v1/quote?symbol=A", timeout=0.05)
+        assert server.stats.server_errors == 1
+        assert server.stats.timeouts == 1
+
+    def test_latency(self, server: StandInServer) -> None:
+        server.config.latency = 0.01
+        server.config.route_latency = {"company_news": 0.5}
+        assert server.get_latency("quote") == 0.01
+        assert server.get_latency("company_news") == 0.5
+        server.config.latency_distribution = LatencyDistribution.LOGNORMAL
+        latencies = sorted(server.get_latency("quote") for _ in range(1001))
+        assert 0.008 < latencies[500] < 0.012
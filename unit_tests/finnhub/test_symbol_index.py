@@ -0,0 +1,80 @@
+from pathlib import Path
+
+from httpx import MockTransport, Request, Response
+
+from src.finnhub.finnhub_api_client import FinnHubApiClient
+from src.finnhub.symbol_index import SymbolIndex
+from src.finnhub.synthetic_data import SyntheticData
+from src.validate_models.get_symbol_lookup import Description
+
+
+def make_description(symbol: str, description: str) -> Description:
+    return Description(
+        description=description,
+        displaySymbol=symbol,
+        symbol=symbol,
+        type="Common Stock",
+    )
+
+
+def make_index() -> SymbolIndex:
+    index = SymbolIndex()
+    index.update(
+        [
+            make_description("APLE", "APPLE HOSPITALITY REIT INC"),
+            make_description("AAPL.SW", "APPLE INC"),
+            make_description("AAPL", "APPLE INC"),
+            make_description("APPL", "APPLIED UV INC"),
+            make_description("PINE", "ALPINE INCOME PROPERTY TRUST"),
+            make_description("MSFT", "MICROSOFT CORP"),
+        ]
+    )
+    return index
+
+
+def get_symbols(index: SymbolIndex, q: str, **kwargs: object) -> list[str]:
+    return [item.symbol for item in index.lookup(q, **kwargs).result]  # type: ignore
+
+
+class TestSymbolIndex:
+    def test_lookup_ranking(self) -> None:
+        index = make_index()
+        assert get_symbols(index, "aapl") == ["AAPL", "AAPL.SW"]
+        assert get_symbols(index, "apple inc") == ["AAPL", "AAPL.SW", "APLE"]
+        assert get_symbols(index, "appl") == ["APPL", "AAPL", "APLE", "AAPL.SW"]
+        assert get_symbols(index, "ap", limit=2) == ["APLE", "APPL"]
+        assert get_symbols(index, "income") == ["PINE"]
+        assert get_symbols(index, "  ") == []
+        assert get_symbols(index, "msft", exchange="TO") == []
+
+        response = index.lookup("msft")
+        assert response.count == 1
+        assert response.result[0].description == "MICROSOFT CORP"
+
+    def test_incremental_update(self) -> None:
+        index = make_index()
+        assert index.update([make_description("MSFT", "MICROSOFT CORP")]) == 0
+        assert index.update([make_description("MSFT", "MICROSOFT CORPORATION")]) == 1
+        assert get_symbols(index, "corporation") == ["MSFT"]
+        assert index.remove(["MSFT", "UNKNOWN"]) == 1
+        assert get_symbols(index, "msft") == []
+        assert len(index) == 5
+
+    def test_refresh_save_and_load(self, tmp_path: Path) -> None:
+        def handler(request: Request) -> Response:
+            q = request.url.params["q"]
+            if q == "bad":
+                return Response(500)
+            return Response(200, json=SyntheticData.symbol_lookup(q, count=3))
+
+        index = SymbolIndex()
+        client = FinnHubApiClient(transport=MockTransport(handler))
+        assert index.refresh(client, ["apple", "bad", "micro"]) == 6
+        client.close()
+        assert get_symbols(index, "apple") == ["APPLE", "APPLE.B1", "APPLE.C2"]
+
+        path = tmp_path / "us_symbols.json"
+        index.save(path)
+        loaded = SymbolIndex()
+        assert loaded.load(path) == 6
+        assert loaded.lookup("micro") == index.lookup("micro")
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("websockets")
+
+from src.finnhub.stand_in_trade_feed import (  # noqa: E402
+    StandInTradeFeed,
+    StandInTradeFeedConfig,
+)
+from src.finnhub.trades_stream import (  # noqa: E402
+    FinnHubTradesStream,
+    Trade,
+    decode_trades,
+)
+
+TOKEN = "stand-in-token"
+
+
+def make_feed() -> StandInTradeFeed:
+    config = StandInTradeFeedConfig(
+        api_keys={TOKEN}, interval=0.01, trades_per_message=3, seed=1
+    )
+    return StandInTradeFeed(config)
+
+
+def make_stream(feed: StandInTradeFeed, *symbols: str) -> FinnHubTradesStream:
+    return FinnHubTradesStream(
+        symbols, url=feed.url, token=TOKEN, reconnect_delay=0.01, open_timeout=2
+    )
+
+
+class TestFinnHubTradesStream:
+    def test_decode_trades(self) -> None:
+        payload = {
+            "type": "trade",
+            "data": [
+                {"s": "AAPL", "p": 190.5, "t": 1575526691134, "v": 10, "c": ["1"]},
+                {"s": "MSFT", "p": 410.1, "t": 1575526691135, "v": 2, "c": None},
+            ],
+        }
+        assert decode_trades(payload) == [
+            Trade("AAPL", 190.5, 10, 1575526691134, ("1",)),
+            Trade("MSFT", 410.1, 2, 1575526691135),
+        ]
+
+    def test_iterator_and_callbacks(self) -> None:
+        async def run() -> None:
+            async with make_feed() as feed:
+                async with make_stream(feed, "AAPL") as stream:
+                    callback_trades: list[Trade] = []
+                    stream.add_callback(callback_trades.extend)
+                    await stream.wait_connected(2)
+                    await stream.subscribe("MSFT")
+
+                    symbols: set[str] = set()
+                    async for trades in stream:
+                        symbols.update(trade.symbol for trade in trades)
+                        if symbols == {"AAPL", "MSFT"}:
+                            break
+                    assert stream.stats.trades == len(callback_trades)
+
+                    await stream.unsubscribe("AAPL")
+                    await asyncio.sleep(0.05)
+                    assert feed.get_subscriptions() == {"MSFT"}
+                    assert feed.stats.unsubscribes == 1
+
+        asyncio.run(run())
+
+    def test_reconnect_and_resubscribe(self) -> None:
+        async def run() -> None:
+            async with make_feed() as feed:
+                async with make_stream(feed, "AAPL", "MSFT") as stream:
+                    await stream.wait_connected(2)
+                    await asyncio.sleep(0.05)
+                    await feed.drop_connections()
+                    async with asyncio.timeout(2):
+                        while stream.stats.connections < 2:
+                            await asyncio.sleep(0.01)
+                    await asyncio.sleep(0.05)
+                    assert stream.connected
+                    assert stream.stats.reconnects == 1
+                    assert feed.get_subscriptions() == {"AAPL", "MSFT"}
+                    assert feed.stats.subscribes == 4
+
+        asyncio.run(run())
+
+    def test_invalid_token(self) -> None:
+        async def run() -> None:
+            async with make_feed() as feed:
+                stream = FinnHubTradesStream(["AAPL"], url=feed.url, token="bad")
+                with pytest.raises(PermissionError):
+                    async for _ in stream:
+                        pass
+                await stream.close()
+                assert feed.stats.unauthorized == 1
+
+        asyncio.run(run())
@@ -0,0 +1,94 @@
+from collections import Counter
+
+import pytest
+from httpx import MockTransport, Request, Response
+
+from src.config import settings
+from src.finnhub.finnhub_api_client import FinnHubApiClient
+from src.finnhub.stand_in_server import StandInConfig, StandInServer
+from src.utils.api_key_pool import ApiKeyPool, NoUsableApiKeyError, mask_key
+from src.utils.rate_limiter import RateLimit
+
+KEYS = ["key-aaaa-0001", "key-bbbb-0002", "key-cccc-0003"]
+
+
+class TestApiKeyPool:
+    def test_route_to_most_remaining_budget(self) -> None:
+        pool = ApiKeyPool(KEYS[:2], [RateLimit(calls=10, period=60)])
+        keys = [pool.reserve()[0] for _ in range(6)]
+        assert Counter(keys) == {KEYS[0]: 3, KEYS[1]: 3}
+
+        # The server reports the first key is almost used up
+        response = Response(
+            200, headers={"X-Ratelimit-Remaining": "1", "X-Ratelimit-Reset": "1e10"}
+        )
+        pool.on_response(KEYS[0], response)
+        assert [pool.reserve()[0] for _ in range(3)] == [KEYS[1]] * 3
+        usage = pool.get_usage()
+        assert [item.requests for item in usage] == [3, 6]
+        assert usage[0].remaining == 1
+        assert usage[0].key == mask_key(KEYS[0]) == "key-...01"
+
+    def test_quarantine_after_401_and_429(self) -> None:
+        pool = ApiKeyPool(KEYS[:2], quarantine_seconds=5, unauthorized_seconds=100)
+        pool.on_response(KEYS[0], Response(401))
+        assert {pool.reserve()[0] for _ in range(3)} == {KEYS[1]}
+        pool.on_response(KEYS[1], Response(429, headers={"Retry-After": "2"}))
+
+        # All keys are quarantined, wait for the first one released
+        key, delay = pool.reserve()
+        assert key == KEYS[1]
+        assert delay == pytest.approx(2, abs=0.1)
+        usage = pool.get_usage()
+        assert usage[0].unauthorized == 1
+        assert usage[0].quarantined_for > 90
+        assert usage[1].too_many_requests == 1
+
+    def test_no_usable_key(self) -> None:
+        pool = ApiKeyPool(KEYS[:2], max_wait=30)
+        for key in KEYS[:2]:
+            pool.on_response(key, Response(401))
+        with pytest.raises(NoUsableApiKeyError, match="unauthorized"):
+            pool.acquire()
+
+        pool = ApiKeyPool(KEYS[:2], max_wait=30)
+        pool.on_response(KEYS[0], Response(401))
+        pool.on_response(KEYS[1], Response(429, headers={"Retry-After": "600"}))
+        with pytest.raises(NoUsableApiKeyError, match="quarantined") as exc_info:
+            pool.acquire()
+        assert exc_info.value.retry_in == pytest.approx(600, abs=1)
+        # The failed requests aren't counted
+        assert [item.requests for item in pool.get_usage()] == [0, 0]
+
+    def test_client_sends_pooled_keys(self) -> None:
+        tokens: Counter[str] = Counter()
+
+        def handler(request: Request) -> Response:
+            tokens[request.headers["X-Finnhub-Token"]] += 1
+            return Response(200, json={})
+
+        pool = ApiKeyPool(KEYS)
+        client = FinnHubApiClient(transport=MockTransport(handler), api_key_pool=pool)
+        for _ in range(9):
+            client.get_quote("AAPL")
+        client.close()
+        assert tokens == dict.fromkeys(KEYS, 3)
+
+    def test_quotas_of_stand_in_scale_with_keys(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        config = StandInConfig(api_keys=set(KEYS), calls_per_minute=4)
+        with StandInServer(config) as server:
+            monkeypatch.setattr(settings, "FINN_HUB_HOST", server.url)
+            pool = ApiKeyPool(KEYS, [RateLimit(calls=4, period=60)])
+            client = FinnHubApiClient(api_key_pool=pool)
+            statuses = [client.get_quote("AAPL").status_code for _ in range(12)]
+            assert statuses == [200] * 12
+            assert server.stats.rate_limited == 0
+
+            # Over the quotas of all keys
+            assert client.get_quote("AAPL").status_code == 429
+            client.close()
+        usage = pool.get_usage()
+        assert sum(item.too_many_requests for item in usage) == 1
+        assert sum(item.quarantines for item in usage) == 1
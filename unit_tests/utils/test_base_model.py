@@ -0,0 +1,38 @@
+from src.finnhub.synthetic_data import SyntheticData
+from src.utils.base_model import BatchError
+from src.validate_models.get_company_news import CompanyNews
+from src.validate_models.get_quote import GetQuoteResponse
+
+
+class TestValidateMany:
+    def test_valid_batch(self) -> None:
+        payloads = [SyntheticData.quote(symbol) for symbol in ("AAPL", "MSFT")]
+        models, errors = GetQuoteResponse.validate_many(iter(payloads))
+        assert errors == []
+        assert models == [GetQuoteResponse.model_validate(p) for p in payloads]
+
+    def test_invalid_payloads_are_reported(self) -> None:
+        payloads = SyntheticData.company_news("AAPL", "2025-04-01", "2025-04-03")[:5]
+        payloads[1] = {**payloads[1], "datetime": "yesterday"}
+        payloads[3] = {k: v for k, v in payloads[3].items() if k != "headline"}
+        result = CompanyNews.validate_many(payloads + ["not a dict"])
+        assert [model.id for model in result.models] == [
+            payloads[i]["id"] for i in (0, 2, 4)
+        ]
+        assert result.invalid_indexes == [1, 3, 5]
+        assert result.errors[:2] == [
+            BatchError(
+                index=1,
+                loc=("datetime",),
+                type="int_parsing",
+                msg="Input should be a valid integer, unable to parse string as an "
+                "integer",
+            ),
+            BatchError(
+                index=3, loc=("headline",), type="missing", msg="Field required"
+            ),
+        ]
+        assert result.errors[2].type == "model_type"
+
+    def test_empty_batch(self) -> None:
+        assert CompanyNews.validate_many([]) == ([], [])
@@ -0,0 +1,30 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from src.utils.bloom_filter import BloomFilter
+
+
+class TestBloomFilter:
+    def test_false_positive_rate(self, tmp_path: Path) -> None:
+        rnd = random.Random(0)
+        values = [rnd.getrandbits(64) for _ in range(20000)]
+        bloom = BloomFilter(10000, error_rate=0.01)
+        for value in values[:10000]:
+            bloom.add(value)
+        assert all(value in bloom for value in values[:10000])
+        false_positives = sum(value in bloom for value in values[10000:])
+        assert false_positives < 200
+
+        path = tmp_path / "seen.bloom"
+        bloom.save(path)
+        loaded = BloomFilter.load(path)
+        assert (loaded.capacity, len(loaded)) == (10000, 10000)
+        assert all(value in loaded for value in values[:10000])
+
+    def test_load_invalid_file(self, tmp_path: Path) -> None:
+        path = tmp_path / "seen.bloom"
+        path.write_bytes(b"not a bloom filter")
+        with pytest.raises(ValueError, match="isn't a Bloom filter"):
+            BloomFilter.load(path)
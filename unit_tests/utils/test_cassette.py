@@ -0,0 +1,90 @@
+import asyncio
+import gzip
+from pathlib import Path
+
+import pytest
+from httpx import AsyncClient, Client, MockTransport, Request, Response
+
+from src.constants import CassetteMode
+from src.utils.cassette import (
+    AsyncCassetteTransport,
+    Cassette,
+    CassetteMissError,
+    CassetteTransport,
+)
+
+SECRET = "real-api-key"
+
+
+def make_cassette(path: Path, mode: CassetteMode, secret: str) -> Cassette:
+    return Cassette(
+        path,
+        mode,
+        match_headers=["X-Finnhub-Token"],
+        secrets={secret: "<FINN_HUB_API_KEY>"},
+    )
+
+
+class TestCassette:
+    def test_record_and_replay(self, tmp_path: Path) -> None:
+        calls = []
+
+        def handler(request: Request) -> Response:
+            calls.append(request)
+            if request.headers["X-Finnhub-Token"] != SECRET:
+                return Response(401, json={"error": "Invalid API key"})
+            return Response(200, json={"c": len(calls)})
+
+        path = tmp_path / "test_quote.json.gz"
+        cassette = make_cassette(path, CassetteMode.RECORD, SECRET)
+        with Client(transport=CassetteTransport(cassette, MockTransport(handler))) as c:
+            headers = {"X-Finnhub-Token": SECRET}
+            assert c.get("https://a.io/quote?symbol=A", headers=headers).json() == {
+                "c": 1
+            }
+            assert c.get("https://a.io/quote?symbol=A", headers=headers).json() == {
+                "c": 2
+            }
+            res = c.get("https://a.io/quote?symbol=A", headers={"X-Finnhub-Token": "x"})
+            assert res.status_code == 401
+        assert SECRET not in gzip.decompress(path.read_bytes()).decode()
+
+        # Replay with another key and host, the identical requests keep their order
+        cassette = make_cassette(path, CassetteMode.REPLAY, "another-key")
+        with Client(transport=CassetteTransport(cassette)) as client:
+            headers = {"X-Finnhub-Token": "another-key"}
+            quotes = [
+                client.get(
+                    "http://localhost/quote", params={"symbol": "A"}, headers=headers
+                )
+                for _ in range(3)
+            ]
+            assert [res.json()["c"] for res in quotes] == [1, 2, 2]
+            res = client.get(
+                "http://localhost/quote?symbol=A", headers={"X-Finnhub-Token": "x"}
+            )
+            assert res.status_code == 401
+            with pytest.raises(CassetteMissError):
+                client.get("http://localhost/quote?symbol=B", headers=headers)
+        assert len(calls) == 3
+
+    def test_async_record_and_replay(self, tmp_path: Path) -> None:
+        async def handler(request: Request) -> Response:
+            return Response(200, json={"symbol": request.url.params["symbol"]})
+
+        path = tmp_path / "test_async.json.gz"
+
+        async def run(mode: CassetteMode, transport: MockTransport | None) -> str:
+            cassette = make_cassette(path, mode, SECRET)
+            async with AsyncClient(
+                transport=AsyncCassetteTransport(cassette, transport)
+            ) as client:
+                res = await client.get("https://a.io/quote?symbol=TSM")
+            return res.json()["symbol"]
+
+        assert asyncio.run(run(CassetteMode.RECORD, MockTransport(handler))) == "TSM"
+        assert asyncio.run(run(CassetteMode.REPLAY, None)) == "TSM"
+
+    def test_replay_without_cassette(self, tmp_path: Path) -> None:
+        with pytest.raises(FileNotFoundError):
+            make_cassette(tmp_path / "missing.json.gz", CassetteMode.REPLAY, SECRET)
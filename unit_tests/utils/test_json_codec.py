@@ -0,0 +1,67 @@
+import importlib.util
+import json
+from http import HTTPMethod
+from typing import Any, override
+
+import pytest
+from httpx import MockTransport, Request, Response
+
+from src.constants import JsonCodecName
+from src.finnhub.finnhub_api_client import FinnHubApiClient
+from src.utils.json_codec import JsonCodec, StdlibJsonCodec, get_json_codec
+
+ORJSON_INSTALLED = importlib.util.find_spec("orjson") is not None
+
+
+class CountingCodec(StdlibJsonCodec):
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    @override
+    def loads(self, data: bytes | str) -> Any:
+        self.calls.append("loads")
+        return super().loads(data)
+
+    @override
+    def dumps(self, obj: Any) -> bytes:
+        self.calls.append("dumps")
+        return super().dumps(obj)
+
+
+class TestJsonCodec:
+    def test_stdlib_round_trip(self) -> None:
+        codec = get_json_codec(JsonCodecName.STDLIB)
+        obj = {"symbol": "台積電", "prices": [1.5, 2], "ok": True, "none": None}
+        assert codec.dumps(obj) == json.dumps(
+            obj, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        assert codec.loads(codec.dumps(obj)) == obj
+
+    def test_get_json_codec(self) -> None:
+        orjson_codec = get_json_codec(JsonCodecName.ORJSON)
+        auto_codec = get_json_codec(JsonCodecName.AUTO)
+        expected = JsonCodecName.ORJSON if ORJSON_INSTALLED else JsonCodecName.STDLIB
+        assert orjson_codec.name == auto_codec.name == expected
+        assert isinstance(get_json_codec(), JsonCodec)
+
+    def test_client_uses_codec(self) -> None:
+        def handler(request: Request) -> Response:
+            assert request.headers["Content-Type"] == "application/json"
+            return Response(200, content=request.content)
+
+        codec = CountingCodec()
+        client = FinnHubApiClient(transport=MockTransport(handler), json_codec=codec)
+        body = {"symbols": ["AAPL", "TSM"]}
+        assert (
+            client.request_json(HTTPMethod.POST, "https://example.com", json=body)
+            == body
+        )
+        assert codec.calls == ["dumps", "loads"]
+
+    @pytest.mark.skipif(not ORJSON_INSTALLED, reason="orjson isn't installed")
+    def test_orjson_matches_stdlib(self) -> None:
+        obj = {"c": 261.74, "t": 1582641000, "name": "Apple Inc"}
+        orjson_codec = get_json_codec(JsonCodecName.ORJSON)
+        stdlib_codec = get_json_codec(JsonCodecName.STDLIB)
+        assert orjson_codec.loads(stdlib_codec.dumps(obj)) == obj
+        assert stdlib_codec.loads(orjson_codec.dumps(obj)) == obj
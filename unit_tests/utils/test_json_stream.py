@@ -0,0 +1,43 @@
+import json
+import re
+
+import pytest
+
+from src.utils.json_stream import iter_json_array
+
+ITEMS = [
+    {"id": 1, "headline": 'Apple é "quoted" [1,2]', "related": [1.5, -2e3, None]},
+    42,
+    -0.5,
+    "text",
+    [],
+    {},
+    True,
+]
+
+
+class TestJsonStream:
+    @pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 1 << 20])
+    def test_iter_json_array_by_chunks(self, chunk_size: int) -> None:
+        raw = json.dumps(ITEMS, ensure_ascii=False).encode()
+        chunks = [raw[i : i + chunk_size] for i in range(0, len(raw), chunk_size)]
+        assert list(iter_json_array(chunks)) == ITEMS
+
+    def test_empty_array(self) -> None:
+        assert list(iter_json_array([b" [ ", b" ] "])) == []
+
+    @pytest.mark.parametrize("raw", [b"[1,", b"{}", b"[1 2]", b"[1]x", b"[1,]"])
+    def test_invalid_array(self, raw: bytes) -> None:
+        with pytest.raises(ValueError):
+            list(iter_json_array([raw]))
+
+    @pytest.mark.parametrize(
+        ("raw", "message"),
+        [
+            (f"[{'1,' * 100}2 3]", "Expect ',' or ']', got: 3]"),
+            (f"{' ' * 100}{{}}", "Expect a JSON array, got: {}"),
+        ],
+    )
+    def test_invalid_data_deep_in_chunk(self, raw: str, message: str) -> None:
+        with pytest.raises(ValueError, match=re.escape(message)):
+            list(iter_json_array([raw.encode()]))
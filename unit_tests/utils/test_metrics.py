@@ -0,0 +1,87 @@
+import asyncio
+from http import HTTPMethod
+from pathlib import Path
+
+import pytest
+from httpx import ConnectError, MockTransport, Request, Response
+
+from src.constants import MetricPhase
+from src.finnhub.finnhub_api_client import AsyncFinnHubApiClient, FinnHubApiClient
+from src.utils.metrics import ApiMetrics, Histogram
+
+QUOTE = {"c": 1.0, "h": 2.0, "l": 0.5, "o": 1.5, "pc": 1.2, "t": 1700000000}
+
+
+def handler(request: Request) -> Response:
+    match request.url.params.get("symbol"):
+        case "DOWN":
+            raise ConnectError("Connection refused", request=request)
+        case "UNAUTHORIZED":
+            return Response(401, json={"error": "Invalid API key"})
+        case _:
+            return Response(200, json=QUOTE)
+
+
+class TestHistogram:
+    def test_observe_and_quantile(self) -> None:
+        histogram = Histogram(buckets=(1, 2, 4))
+        assert histogram.get_quantile(0.5) is None
+        for value in [0.5, 1.5, 1.5, 3, 10]:
+            histogram.observe(value)
+        assert histogram.counts == [1, 2, 1, 1]
+        assert histogram.count == 5
+        assert histogram.sum == 16.5
+        assert histogram.get_quantile(0.5) == pytest.approx(1.75)
+        assert histogram.get_quantile(1) == 4
+
+
+class TestApiMetrics:
+    def test_client_metrics(self, tmp_path: Path) -> None:
+        metrics = ApiMetrics()
+        client = FinnHubApiClient(transport=MockTransport(handler), metrics=metrics)
+        for _ in range(3):
+            client.get_quote_model("AAPL")
+        assert client.get_quote("UNAUTHORIZED").status_code == 401
+        with pytest.raises(ConnectError):
+            client.get_quote("DOWN")
+
+        snapshot = metrics.snapshot()["quote"]
+        assert snapshot["requests"] == 5
+        assert snapshot["errors"] == 1
+        assert snapshot["statuses"] == {200: 3, 401: 1}
+        assert snapshot["latency"]["ttfb"]["count"] == 4
+        assert snapshot["latency"]["download"]["count"] == 4
+        assert snapshot["latency"]["validate"]["count"] == 3
+
+        text = metrics.to_prometheus()
+        assert 'api_client_requests_total{route="quote"} 5' in text
+        assert 'api_client_responses_total{route="quote",status="401"} 1' in text
+        assert (
+            'api_client_latency_seconds_bucket{route="quote",phase="validate",'
+            'le="+Inf"} 3'
+        ) in text
+        path = tmp_path / "api_client.prom"
+        metrics.write_prometheus(path)
+        assert path.read_text() == text
+
+    def test_async_client_metrics(self) -> None:
+        metrics = ApiMetrics()
+
+        async def run() -> None:
+            client = AsyncFinnHubApiClient(
+                transport=MockTransport(handler), metrics=metrics
+            )
+            await client.gather(client.get_quote_model("AAPL") for _ in range(5))
+            await client.request_json(HTTPMethod.GET, "https://example.com/other")
+            await client.aclose()
+
+        asyncio.run(run())
+        assert metrics.routes["quote"].requests == 5
+        assert metrics.routes["quote"].latency[MetricPhase.VALIDATE].count == 5
+        assert metrics.routes["other"].latency[MetricPhase.DECODE].count == 1
+
+    def test_disabled_by_default(self) -> None:
+        client = FinnHubApiClient(transport=MockTransport(handler))
+        assert client.metrics is None
+        assert client.client.event_hooks["response"] == []
+        client.get_quote_model("AAPL")
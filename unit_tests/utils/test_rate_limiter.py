@@ -0,0 +1,138 @@
+import asyncio
+import itertools
+
+import pytest
+from httpx import HTTPStatusError, MockTransport, Request, Response
+
+from src.config import settings
+from src.finnhub.finnhub_api_client import AsyncFinnHubApiClient, FinnHubApiClient
+from src.utils.rate_limiter import (
+    RateLimit,
+    RateLimiter,
+    SharedRateBudget,
+    SharedRateLimiter,
+)
+
+
+class TestRateLimiter:
+    def test_reserve_waits_when_bucket_is_empty(self) -> None:
+        rate_limiter = RateLimiter([RateLimit(calls=2, period=1)])
+        assert rate_limiter.reserve("key") == 0
+        assert rate_limiter.reserve("key") == 0
+        assert rate_limiter.reserve("key") == pytest.approx(0.5, abs=0.01)
+        assert rate_limiter.stats.throttled_requests == 1
+
+    def test_buckets_are_per_key_and_route_cost(self) -> None:
+        rate_limiter = RateLimiter(
+            [RateLimit(calls=2, period=1)], route_costs={"company_news": 2}
+        )
+        assert rate_limiter.reserve("key-1", "company_news") == 0
+        assert rate_limiter.reserve("key-2", "quote") == 0
+        assert rate_limiter.reserve("key-1", "quote") > 0
+
+    def test_parse_retry_after(self) -> None:
+        assert RateLimiter.parse_retry_after("3") == 3
+        assert RateLimiter.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+        assert RateLimiter.parse_retry_after("invalid") is None
+        assert RateLimiter.parse_retry_after(None) is None
+
+    def test_429_pauses_sync_and_async_clients(self) -> None:
+        def handler(request: Request) -> Response:
+            return Response(429, headers={"Retry-After": "0.2"})
+
+        rate_limiter = RateLimiter([RateLimit(calls=100, period=1)])
+        client = FinnHubApiClient(
+            transport=MockTransport(handler), rate_limiter=rate_limiter
+        )
+        client.get_quote("AAPL")
+        key = settings.FINN_HUB_API_KEY
+        assert rate_limiter.reserve(key) == pytest.approx(0.2, abs=0.05)
+        assert rate_limiter.reserve("other-key") == pytest.approx(0.2, abs=0.05)
+
+        async def run() -> None:
+            async_client = AsyncFinnHubApiClient(
+                transport=MockTransport(handler), rate_limiter=rate_limiter
+            )
+            await async_client.get_quote("AAPL")
+            await async_client.aclose()
+
+        asyncio.run(run())
+        assert rate_limiter.stats.too_many_requests == 2
+        assert rate_limiter.stats.throttled_seconds > 0.2
+
+    def test_429_pauses_only_its_key(self) -> None:
+        rate_limiter = RateLimiter([RateLimit(calls=100)], pause_per_key=True)
+        response = Response(
+            429,
+            headers={"Retry-After": "0.2"},
+            request=Request("GET", "https://example.com"),
+        )
+        rate_limiter.on_response(response, 0, key="key-1")
+        assert rate_limiter.reserve("key-1") == pytest.approx(0.2, abs=0.05)
+        assert rate_limiter.reserve("key-2") == 0
+
+    def test_key_pool_pauses_per_key(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(settings, "FINN_HUB_CALLS_PER_MINUTE", 60)
+        monkeypatch.setattr(settings, "FINN_HUB_API_KEYS", [])
+        client = FinnHubApiClient()
+        assert client.rate_limiter is not None
+        assert not client.rate_limiter.pause_per_key
+        client.close()
+
+        monkeypatch.setattr(settings, "FINN_HUB_API_KEYS", ["key-1", "key-2"])
+        client = FinnHubApiClient()
+        assert client.rate_limiter is not None
+        assert client.rate_limiter.pause_per_key
+        client.close()
+
+    def test_429_of_stream_pauses_clients(self) -> None:
+        def handler(request: Request) -> Response:
+            return Response(429, headers={"Retry-After": "0.2"})
+
+        rate_limiter = RateLimiter([RateLimit(calls=100, period=1)])
+        client = FinnHubApiClient(
+            transport=MockTransport(handler), rate_limiter=rate_limiter
+        )
+        with pytest.raises(HTTPStatusError):
+            list(client.iter_company_news("AAPL", "2025-04-01", "2025-04-02"))
+        client.close()
+
+        async def run() -> None:
+            async_client = AsyncFinnHubApiClient(
+                transport=MockTransport(handler), rate_limiter=rate_limiter
+            )
+            with pytest.raises(HTTPStatusError):
+                async for _ in async_client.iter_company_news(
+                    "AAPL", "2025-04-01", "2025-04-02"
+                ):
+                    pass
+            await async_client.aclose()
+
+        asyncio.run(run())
+        assert rate_limiter.stats.too_many_requests == 2
+        assert rate_limiter.reserve() > 0.1
+
+    @pytest.mark.parametrize("shared", [False, True])
+    def test_requests_after_429_are_spaced(self, shared: bool) -> None:
+        rate_limits = [RateLimit(calls=5, period=1)]
+        rate_limiter = (
+            SharedRateLimiter(SharedRateBudget(rate_limits))
+            if shared
+            else RateLimiter(rate_limits)
+        )
+        response = Response(
+            429,
+            headers={"Retry-After": "10"},
+            request=Request("GET", "https://example.com"),
+        )
+        rate_limiter.on_response(response, 0)
+        delays = [rate_limiter.reserve() for _ in range(20)]
+        # Queued during the pause, they're sent at 5/s after it instead of a burst
+        assert delays[0] == pytest.approx(10.2, abs=0.05)
+        for previous, delay in itertools.pairwise(delays):
+            assert delay - previous == pytest.approx(0.2, abs=0.01)
+
+    def test_unknown_route_cost(self) -> None:
+        rate_limiter = RateLimiter([RateLimit(calls=1)], route_costs={"unknown": 2})
+        with pytest.raises(ValueError):
+            FinnHubApiClient(rate_limiter=rate_limiter)
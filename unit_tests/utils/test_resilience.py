@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+import pytest
+from httpx import ConnectError, MockTransport, Request, Response, Timeout
+
+from src.constants import CircuitState
+from src.finnhub.finnhub_api_client import (
+    AsyncFinnHubApiClient,
+    FinnHubApiClient,
+    FinnHubRouter,
+)
+from src.utils.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Resilience,
+    RetryPolicy,
+)
+
+NO_BACKOFF = RetryPolicy(max_retries=2, backoff_base=0)
+
+
+class TestResilience:
+    def test_retry_until_success(self) -> None:
+        statuses = iter([503, 502, 200])
+
+        def handler(request: Request) -> Response:
+            return Response(next(statuses))
+
+        resilience = Resilience(retry_policy=NO_BACKOFF)
+        client = FinnHubApiClient(
+            transport=MockTransport(handler), resilience=resilience
+        )
+        assert client.get_quote("AAPL").status_code == 200
+        assert resilience.stats.retries == 2
+
+    def test_retry_transport_error_is_bounded(self) -> None:
+        calls = 0
+
+        async def handler(request: Request) -> Response:
+            nonlocal calls
+            calls += 1
+            raise ConnectError("connection refused", request=request)
+
+        async def run() -> None:
+            client = AsyncFinnHubApiClient(
+                transport=MockTransport(handler),
+                resilience=Resilience(retry_policy=NO_BACKOFF),
+            )
+            await client.get_quote("AAPL")
+
+        with pytest.raises(ConnectError):
+            asyncio.run(run())
+        assert calls == 3
+
+    def test_client_error_is_not_retried(self) -> None:
+        calls = 0
+
+        def handler(request: Request) -> Response:
+            nonlocal calls
+            calls += 1
+            return Response(401)
+
+        client = FinnHubApiClient(
+            transport=MockTransport(handler),
+            resilience=Resilience(retry_policy=NO_BACKOFF),
+        )
+        assert client.get_quote("AAPL").status_code == 401
+        assert calls == 1
+
+    def test_circuit_breaker_fails_fast_and_recovers(self) -> None:
+        status_code = 500
+
+        def handler(request: Request) -> Response:
+            return Response(status_code)
+
+        circuit_breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+        resilience = Resilience(circuit_breaker=circuit_breaker)
+        client = FinnHubApiClient(
+            transport=MockTransport(handler), resilience=resilience
+        )
+        host = client.url_router.domain
+        client.get_quote("AAPL")
+        client.get_quote("AAPL")
+        assert circuit_breaker.get_state(host) == CircuitState.OPEN
+        with pytest.raises(CircuitOpenError):
+            client.get_quote("AAPL")
+        assert resilience.stats.short_circuited == 1
+        assert resilience.stats.open_circuits == 1
+
+        time.sleep(0.06)
+        status_code = 200
+        assert client.get_quote("AAPL").status_code == 200
+        assert circuit_breaker.get_state(host) == CircuitState.CLOSED
+
+    def test_route_timeout(self) -> None:
+        def handler(request: Request) -> Response:
+            return Response(200, json=request.extensions["timeout"])
+
+        client = FinnHubApiClient(
+            transport=MockTransport(handler),
+            resilience=Resilience(route_timeouts=FinnHubRouter.ROUTE_TIMEOUTS),
+        )
+        res = client.get_company_news("AAPL", "2025-04-01", "2025-04-10")
+        assert res.json() == Timeout(30, connect=5).as_dict()
+
+    def test_half_open_trial_is_released_on_other_errors(self) -> None:
+        outcomes = iter([Response(500), RuntimeError("not sent"), Response(200)])
+
+        def handler(request: Request) -> Response:
+            outcome = next(outcomes)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        circuit_breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+        client = FinnHubApiClient(
+            transport=MockTransport(handler),
+            resilience=Resilience(circuit_breaker=circuit_breaker),
+        )
+        host = client.url_router.domain
+        client.get_quote("AAPL")
+        assert circuit_breaker.get_state(host) == CircuitState.OPEN
+        # The trial fails without a result, the next request is the trial again
+        with pytest.raises(RuntimeError):
+            client.get_quote("AAPL")
+        assert circuit_breaker.get_state(host) == CircuitState.OPEN
+        assert client.get_quote("AAPL").status_code == 200
+        assert circuit_breaker.get_state(host) == CircuitState.CLOSED
+
+    def test_half_open_trial_is_released_on_cancel(self) -> None:
+        calls = 0
+
+        async def handler(request: Request) -> Response:
+            nonlocal calls
+            calls += 1
+            if calls == 2:
+                await asyncio.sleep(10)
+            return Response(500 if calls == 1 else 200)
+
+        circuit_breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+
+        async def run() -> None:
+            client = AsyncFinnHubApiClient(
+                transport=MockTransport(handler),
+                resilience=Resilience(circuit_breaker=circuit_breaker),
+            )
+            await client.get_quote("AAPL")
+            with pytest.raises(TimeoutError):
+                async with asyncio.timeout(0.05):
+                    await client.get_quote("AAPL")
+            res = await client.get_quote("AAPL")
+            assert res.status_code == 200
+            await client.aclose()
+
+        asyncio.run(run())
+        assert calls == 3
+        assert circuit_breaker.open_circuits == 0
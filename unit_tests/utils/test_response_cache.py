@@ -0,0 +1,268 @@
+import asyncio
+import functools
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import cast
+
+import pytest
+from httpx import MockTransport, Request, Response
+
+from src.finnhub.finnhub_api_client import AsyncFinnHubApiClient, FinnHubApiClient
+from src.utils import response_cache
+from src.utils.response_cache import (
+    CachedResponse,
+    ResponseCache,
+    SqliteCacheBackend,
+)
+
+PROFILE = {"ticker": "AAPL"}
+
+
+class CountingHandler:
+    def __init__(self, status_code: int = 200) -> None:
+        self.status_code = status_code
+        self.calls = 0
+
+    def __call__(self, request: Request) -> Response:
+        self.calls += 1
+        return Response(self.status_code, json={**PROFILE, "calls": self.calls})
+
+
+class TestResponseCache:
+    def test_make_key_normalizes_params(self) -> None:
+        assert ResponseCache.make_key("quote", {"b": "2", "a": "1"}) == (
+            ResponseCache.make_key("quote", {"a": "1", "b": "2"})
+        )
+
+    def test_hit_miss_and_ttl_per_route(self) -> None:
+        handler = CountingHandler()
+        cache = ResponseCache({"company_profile": 60})
+        client = FinnHubApiClient(
+            transport=MockTransport(handler), response_cache=cache
+        )
+        for _ in range(3):
+            res = client.get_company_profile(symbol="AAPL")
+            assert res.json()["calls"] == 1
+            res.raise_for_status()
+        client.get_quote("AAPL")
+        client.get_quote("AAPL")
+
+        assert handler.calls == 3
+        assert cache.stats.hits == 2
+        assert cache.stats.misses == 1
+
+    def test_error_response_is_not_cached(self) -> None:
+        handler = CountingHandler(status_code=401)
+        client = FinnHubApiClient(
+            transport=MockTransport(handler),
+            response_cache=ResponseCache({"company_profile": 60}),
+        )
+        client.get_company_profile(symbol="AAPL")
+        client.get_company_profile(symbol="AAPL")
+        assert handler.calls == 2
+
+    def test_lru_eviction(self) -> None:
+        cache = ResponseCache({"quote": 60}, max_size=2)
+        client = FinnHubApiClient(
+            transport=MockTransport(CountingHandler()), response_cache=cache
+        )
+        for symbol in ["A", "B", "A", "C", "A", "B"]:
+            client.get_quote(symbol)
+        assert cache.stats.evictions == 2
+        assert cache.stats.hits == 2
+
+    def test_stale_while_revalidate(self) -> None:
+        handler = CountingHandler()
+        cache = ResponseCache({"quote": 0.01}, stale_while_revalidate=60)
+        client = FinnHubApiClient(
+            transport=MockTransport(handler), response_cache=cache
+        )
+        client.get_quote("AAPL")
+        time.sleep(0.02)
+        # The stale response is served while the refresh runs in the background
+        assert client.get_quote("AAPL").json()["calls"] == 1
+        cache_key = cache.make_key("quote", {"symbol": "AAPL"})
+        for _ in range(100):
+            entry = cache.backend.get(cache_key)
+            if entry and entry.to_response(Request("GET", "/")).json()["calls"] == 2:
+                break
+            time.sleep(0.01)
+        assert handler.calls == 2
+        assert cache.stats.stale_hits == 1
+
+    def test_stale_while_revalidate_async(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        handler = CountingHandler()
+        cache = ResponseCache({"quote": 60}, stale_while_revalidate=600)
+        cache_key = cache.make_key("quote", {"symbol": "AAPL"})
+        errors: list[str] = []
+        monkeypatch.setattr(response_cache.log, "exception", errors.append)
+
+        def make_stale() -> None:
+            entry = cast(CachedResponse, cache.backend.get(cache_key))
+            cache.backend.set(
+                cache_key, entry.model_copy(update={"stored_at": entry.stored_at - 90})
+            )
+
+        async def run() -> list[int]:
+            client = AsyncFinnHubApiClient(
+                transport=MockTransport(handler), response_cache=cache
+            )
+            calls = [(await client.get_quote("AAPL")).json()["calls"]]
+            make_stale()
+            # The stale response is served while the refresh runs in the background
+            calls.append((await client.get_quote("AAPL")).json()["calls"])
+            await cache.wait_refreshes()
+            calls.append((await client.get_quote("AAPL")).json()["calls"])
+            await client.aclose()
+            return calls
+
+        assert asyncio.run(run()) == [1, 1, 2]
+        assert cache.stats.stale_hits == 1
+        assert errors == []
+
+    def test_close_cancels_refreshes(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        errors: list[str] = []
+        monkeypatch.setattr(response_cache.log, "exception", errors.append)
+        cache = ResponseCache({"quote": 60})
+
+        async def fetch() -> None:
+            await asyncio.sleep(10)
+
+        async def run() -> None:
+            client = AsyncFinnHubApiClient(
+                transport=MockTransport(CountingHandler()), response_cache=cache
+            )
+            cache.refresh_async("key", fetch)
+            await asyncio.sleep(0)
+            await client.aclose()
+
+        asyncio.run(asyncio.wait_for(run(), 1))
+        assert errors == []
+        assert cache._refreshing == set()
+
+        release = threading.Event()
+        ran: list[str] = []
+
+        def wait_and_run(key: str) -> None:
+            release.wait()
+            ran.append(key)
+
+        for key in ["a", "b", "c"]:
+            cache.refresh(key, functools.partial(wait_and_run, key))
+        # Both refresh threads are busy, so "c" is queued and dropped by close
+        closing = threading.Thread(target=FinnHubApiClient(response_cache=cache).close)
+        closing.start()
+        time.sleep(0.05)
+        release.set()
+        closing.join(timeout=5)
+        assert not closing.is_alive()
+        assert sorted(ran) == ["a", "b"]
+        # The dropped refresh of "c" doesn't block the next refresh of "c"
+        assert cache._refreshing == set()
+
+    def test_aclose_cancels_unstarted_refresh(self) -> None:
+        cache = ResponseCache({"quote": 60})
+        fetched: list[str] = []
+
+        async def fetch() -> None:
+            fetched.append("key")
+
+        async def run() -> None:
+            cache.refresh_async("key", fetch)
+            await cache.aclose()
+
+        asyncio.run(run())
+        assert fetched == []
+        assert cache._refreshing == set()
+
+
+class TestSqliteCacheBackend:
+    def test_persist_across_instances(self, tmp_path: Path) -> None:
+        handler = CountingHandler()
+        for _ in range(2):
+            client = FinnHubApiClient(
+                transport=MockTransport(handler),
+                response_cache=ResponseCache(
+                    {"company_profile": 60},
+                    backend=SqliteCacheBackend(tmp_path / "cache.sqlite3"),
+                ),
+            )
+            assert client.get_company_profile(symbol="AAPL").json()["calls"] == 1
+        assert handler.calls == 1
+
+    def test_evict_by_size(self, tmp_path: Path) -> None:
+        backend = SqliteCacheBackend(tmp_path / "cache.sqlite3", max_bytes=25)
+        for key in ["a", "b", "c"]:
+            backend.set(
+                key,
+                CachedResponse(
+                    status_code=200, headers=[], content=b"x" * 10, stored_at=0
+                ),
+            )
+        assert len(backend) == 2
+        assert backend.get("a") is None
+        assert backend.evictions == 1
+
+    @pytest.mark.parametrize(("touch_interval", "evicted"), [(0, "b"), (60, "a")])
+    def test_touch_interval(
+        self, tmp_path: Path, touch_interval: float, evicted: str
+    ) -> None:
+        backend = SqliteCacheBackend(
+            tmp_path / "cache.sqlite3", max_bytes=25, touch_interval=touch_interval
+        )
+        value = CachedResponse(
+            status_code=200, headers=[], content=b"x" * 10, stored_at=0
+        )
+        backend.set("a", value)
+        backend.set("b", value)
+        # The read only moves "a" ahead of "b" if its access time is written
+        time.sleep(0.01)
+        assert backend.get("a") is not None
+        backend.set("c", value)
+        assert backend.get(evicted) is None
+        assert len(backend) == 2
+
+    def test_close_connections_of_all_threads(self, tmp_path: Path) -> None:
+        backend = SqliteCacheBackend(tmp_path / "cache.sqlite3")
+        connections: list[sqlite3.Connection] = []
+        thread = threading.Thread(target=lambda: connections.append(backend._connect()))
+        thread.start()
+        thread.join()
+        connections.append(backend._connect())
+
+        ResponseCache({"quote": 60}, backend=backend).close()
+
+        for conn in connections:
+            with pytest.raises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+        # A new connection is opened after close
+        assert len(backend) == 0
+
+    def test_revalidate_with_etag(self, tmp_path: Path) -> None:
+        requests: list[Request] = []
+
+        def handler(request: Request) -> Response:
+            requests.append(request)
+            if request.headers.get("If-None-Match") == '"v1"':
+                return Response(304)
+            return Response(200, headers={"ETag": '"v1"'}, json=PROFILE)
+
+        cache = ResponseCache(
+            {"company_profile": 0},
+            backend=SqliteCacheBackend(tmp_path / "cache.sqlite3"),
+        )
+        client = FinnHubApiClient(
+            transport=MockTransport(handler), response_cache=cache
+        )
+        client.get_company_profile(symbol="AAPL")
+        time.sleep(0.01)
+        res = client.get_company_profile(symbol="AAPL")
+
+        assert res.status_code == 200
+        assert res.json() == PROFILE
+        assert len(requests) == 2
+        assert cache.stats.not_modified == 1
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from httpx import MockTransport, Request, Response
+
+from src.finnhub.finnhub_api_client import AsyncFinnHubApiClient, FinnHubApiClient
+from src.utils.single_flight import SingleFlight
+
+QUOTE = {"c": 1.0, "h": 2.0, "l": 0.5, "o": 1.5, "pc": 1.2, "t": 1700000000}
+
+
+class TestSingleFlight:
+    def test_coalesce_threads(self) -> None:
+        calls = 0
+        lock = threading.Lock()
+
+        def handler(request: Request) -> Response:
+            nonlocal calls
+            with lock:
+                calls += 1
+            time.sleep(0.1)
+            return Response(200, json=QUOTE)
+
+        single_flight = SingleFlight()
+        client = FinnHubApiClient(
+            transport=MockTransport(handler), single_flight=single_flight
+        )
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(client.get_quote, ["AAPL"] * 8))
+
+        assert all(res.json() == QUOTE for res in responses)
+        assert calls == 1
+        assert single_flight.stats.coalesced == 7
+
+    def test_coalesce_tasks_and_share_exception(self) -> None:
+        calls = 0
+
+        async def handler(request: Request) -> Response:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            raise TimeoutError("upstream timeout")
+
+        single_flight = SingleFlight()
+
+        async def run() -> list[BaseException | Response]:
+            client = AsyncFinnHubApiClient(
+                transport=MockTransport(handler), single_flight=single_flight
+            )
+            results = await asyncio.gather(
+                *(client.get_quote("AAPL") for _ in range(5)),
+                return_exceptions=True,
+            )
+            await client.aclose()
+            return results
+
+        results = asyncio.run(run())
+        assert all(isinstance(result, TimeoutError) for result in results)
+        assert calls == 1
+        assert single_flight.stats.coalesced == 4
+
+    def test_cancelled_leader_does_not_cancel_followers(self) -> None:
+        calls = 0
+
+        async def fetch() -> str:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "result"
+
+        single_flight = SingleFlight()
+
+        async def run() -> list[str]:
+            leader = asyncio.create_task(single_flight.do_async("key", fetch))
+            await asyncio.sleep(0)
+            followers = [
+                asyncio.create_task(single_flight.do_async("key", fetch))
+                for _ in range(3)
+            ]
+            await asyncio.sleep(0)
+            leader.cancel()
+            results = await asyncio.gather(*followers)
+            assert leader.cancelled()
+            return results
+
+        assert asyncio.run(run()) == ["result"] * 3
+        assert calls == 1
+
+    def test_all_callers_cancelled_cancels_call(self) -> None:
+        cancelled = False
+
+        async def fetch() -> None:
+            nonlocal cancelled
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+
+        single_flight = SingleFlight()
+
+        async def run() -> None:
+            tasks = [
+                asyncio.create_task(single_flight.do_async("key", fetch))
+                for _ in range(2)
+            ]
+            await asyncio.sleep(0)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.sleep(0)
+
+        asyncio.run(asyncio.wait_for(run(), 1))
+        assert cancelled
+
+    def test_different_auth_headers_are_not_coalesced(self) -> None:
+        key = SingleFlight.make_key(
+            "GET", "http://localhost", {"symbol": "AAPL"}, {"X-Finnhub-Token": "a"}
+        )
+        other_key = SingleFlight.make_key(
+            "GET", "http://localhost", {"symbol": "AAPL"}, {"X-Finnhub-Token": "b"}
+        )
+        assert key != other_key
@@ -11,3 +11,13 @@ class TestHelperFuncs:
             HelperFuncs.url_join("https://localhost", "/user")
             == "https://localhost/user"
         )
+
+    def test_split_date_range(self) -> None:
+        assert HelperFuncs.split_date_range("2025-04-01", "2025-04-10", 7) == [
+            ("2025-04-01", "2025-04-07"),
+            ("2025-04-08", "2025-04-10"),
+        ]
+        assert HelperFuncs.split_date_range("2025-04-01", "2025-04-01", 7) == [
+            ("2025-04-01", "2025-04-01")
+        ]
+        assert HelperFuncs.split_date_range("2025-04-02", "2025-04-01", 7) == []
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from httpx import MockTransport, Request, Response
+
+from src.constants import DriftKind
+from src.finnhub.finnhub_api_client import (
+    AsyncFinnHubApiClient,
+    FinnHubApiClient,
+    FinnHubRouter,
+)
+from src.finnhub.synthetic_data import SyntheticData
+from src.utils import validation_policy
+from src.utils.single_flight import SingleFlight
+from src.utils.validation_policy import DriftAlert, ValidationPolicy, collect_fields
+
+
+def dumps(payload: object) -> bytes:
+    return json.dumps(payload).encode()
+
+
+class TestValidationPolicy:
+    def test_collect_fields(self) -> None:
+        payload = {"count": 1, "result": [{"symbol": "AAPL", "type": None}]}
+        assert collect_fields(payload) == {
+            "count": {"number"},
+            "result": {"array"},
+            "result[]": {"object"},
+            "result[].symbol": {"string"},
+            "result[].type": {"null"},
+        }
+
+    def test_sample_after_warmup(self) -> None:
+        policy = ValidationPolicy(
+            FinnHubRouter.VALIDATE_MODELS,
+            sample_rate=0.1,
+            warmup=10,
+            sample_rates={"company_news": 1},
+            seed=1,
+        )
+        sampled = [policy.should_validate("quote") for _ in range(1010)]
+        assert all(sampled[:10])
+        assert 60 < sum(sampled[10:]) < 140
+        assert all(policy.should_validate("company_news") for _ in range(20))
+
+    def test_drift_alerts(self) -> None:
+        alerts: list[DriftAlert] = []
+        policy = ValidationPolicy(
+            FinnHubRouter.VALIDATE_MODELS, warmup=2, on_drift=alerts.append
+        )
+        quote = SyntheticData.quote("AAPL")
+        for _ in range(2):
+            assert policy.observe("quote", dumps(quote)) == []
+
+        changed = {k: v for k, v in quote.items() if k != "pc"}
+        changed |= {"c": "1.5", "v": 100}
+        policy.observe("quote", dumps(changed))
+        # Each drift is alerted once
+        policy.observe("quote", dumps(changed))
+        assert {(alert.kind, alert.path) for alert in alerts} == {
+            (DriftKind.NEW_FIELD, "v"),
+            (DriftKind.NEW_TYPE, "c"),
+            (DriftKind.MISSING_FIELD, "pc"),
+            (DriftKind.INVALID, "pc"),
+        }
+        stats = policy.get_stats()["quote"]
+        assert (stats.validated, stats.invalid, stats.alerts) == (4, 2, 4)
+        assert stats.fields["c"] == 4
+        assert stats.types["c"] == {"number": 2, "string": 2}
+
+    def test_on_drift_errors_are_logged(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        errors: list[str] = []
+        monkeypatch.setattr(validation_policy.log, "exception", errors.append)
+
+        def on_drift(alert: DriftAlert) -> None:
+            raise RuntimeError("alerting is down")
+
+        policy = ValidationPolicy(
+            FinnHubRouter.VALIDATE_MODELS, warmup=1, on_drift=on_drift
+        )
+        policy.observe("quote", dumps(SyntheticData.quote("AAPL")))
+        alerts = policy.observe("quote", dumps({"c": "1.5"}))
+        assert alerts
+        assert len(errors) == len(alerts)
+
+    def test_empty_lists_are_not_missing_fields(self) -> None:
+        alerts: list[DriftAlert] = []
+        policy = ValidationPolicy(
+            FinnHubRouter.VALIDATE_MODELS, warmup=1, on_drift=alerts.append
+        )
+        policy.observe("symbol_lookup", dumps(SyntheticData.symbol_lookup("apple")))
+        policy.observe("symbol_lookup", dumps({"count": 0, "result": []}))
+        policy.observe("company_news", dumps([]))
+        assert alerts == []
+
+    def test_client_observes_responses(self) -> None:
+        def handler(request: Request) -> Response:
+            if request.url.path.endswith("/quote"):
+                return Response(200, json={"c": 1})
+            return Response(500)
+
+        policy = ValidationPolicy(FinnHubRouter.VALIDATE_MODELS, warmup=5)
+        client = FinnHubApiClient(
+            transport=MockTransport(handler), validation_policy=policy
+        )
+        for _ in range(3):
+            assert client.get_quote("AAPL").status_code == 200
+        client.get_company_profile("AAPL")
+        client.close()
+        stats = policy.get_stats()
+        assert (stats["quote"].validated, stats["quote"].invalid) == (3, 3)
+        assert stats["company_profile"].responses == 0
+
+    def test_coalesced_responses_are_observed_once(self) -> None:
+        def handler(request: Request) -> Response:
+            time.sleep(0.1)
+            return Response(200, json=SyntheticData.quote("AAPL"))
+
+        policy = ValidationPolicy(FinnHubRouter.VALIDATE_MODELS, warmup=10)
+        client = FinnHubApiClient(
+            transport=MockTransport(handler),
+            single_flight=SingleFlight(),
+            validation_policy=policy,
+        )
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(client.get_quote, ["AAPL"] * 8))
+        client.close()
+        assert policy.get_stats()["quote"].responses == 1
+
+    def test_coalesced_responses_are_observed_once_async(self) -> None:
+        async def handler(request: Request) -> Response:
+            await asyncio.sleep(0.05)
+            return Response(200, json=SyntheticData.quote("AAPL"))
+
+        policy = ValidationPolicy(FinnHubRouter.VALIDATE_MODELS, warmup=10)
+
+        async def run() -> None:
+            client = AsyncFinnHubApiClient(
+                transport=MockTransport(handler),
+                single_flight=SingleFlight(),
+                validation_policy=policy,
+            )
+            await asyncio.gather(*(client.get_quote("AAPL") for _ in range(5)))
+            await client.aclose()
+
+        asyncio.run(run())
+        assert policy.get_stats()["quote"].responses == 1